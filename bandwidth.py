@@ -0,0 +1,175 @@
+import threading
+import time
+
+MB = 1024 * 1024
+
+
+def parse_rate(value):
+    """Bytes per second from a MB/s value; None for 0, blank or invalid"""
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rate * MB if rate > 0 else None
+
+
+def format_rate(rate):
+    if rate is None:
+        return "unlimited"
+    if rate >= MB:
+        return f"{rate / MB:.1f} MB/s"
+    return f"{rate / 1024:.0f} KB/s"
+
+
+class JobLimiter:
+    """Token bucket of one download, refilled at its allocated rate"""
+
+    def __init__(self, governor, cap=None, fixed=False):
+        self.governor = governor
+        self.cap = cap
+        self.fixed = fixed
+        self.allocated = None
+        self.actual = 0.0
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._last_bytes = {}
+        self._window_start = self._last_refill
+        self._window_bytes = 0
+
+    def hook(self, d):
+        """yt-dlp progress hook: account the new bytes and sleep if ahead.
+
+        Sleeping here blocks the downloading thread, which is what slows the
+        transfer down. Fragment downloads report per file, so bytes are
+        tracked by filename.
+        """
+        if d.get("status") != "downloading":
+            return
+        downloaded = d.get("downloaded_bytes")
+        if downloaded is None:
+            return
+        name = d.get("tmpfilename") or d.get("filename")
+        with self.governor._lock:
+            previous = self._last_bytes.get(name, 0)
+            self._last_bytes[name] = downloaded
+        self.consume(max(0, downloaded - previous))
+
+    def consume(self, nbytes):
+        with self.governor._lock:
+            now = time.monotonic()
+            self._measure(nbytes, now)
+            rate = self.allocated
+            if not rate or self.fixed:
+                return
+            # Allow at most half a second of burst
+            self._tokens = min(
+                rate / 2, self._tokens + (now - self._last_refill) * rate
+            )
+            self._last_refill = now
+            self._tokens -= nbytes
+            delay = -self._tokens / rate if self._tokens < 0 else 0
+        if delay:
+            time.sleep(min(delay, 5))
+
+    def report_speed(self, speed):
+        """Actual rate measured elsewhere, e.g. by the yt-dlp executable"""
+        with self.governor._lock:
+            self.actual = speed
+            self._window_start = time.monotonic()
+
+    def _measure(self, nbytes, now):
+        self._window_bytes += nbytes
+        elapsed = now - self._window_start
+        if elapsed >= 1:
+            self.actual = self._window_bytes / elapsed
+            self._window_start = now
+            self._window_bytes = 0
+
+    def limit_rate_arg(self):
+        """Value for yt-dlp --limit-rate, or None when unlimited"""
+        if not self.allocated:
+            return None
+        return str(int(self.allocated))
+
+
+class BandwidthGovernor:
+    """Process-wide bandwidth limit shared by every active download.
+
+    The global rate is split between active jobs max-min fairly: a job
+    capped below its fair share keeps its cap and the rest is divided
+    among the others. Rates are in bytes per second; None means unlimited.
+    In-process jobs are throttled from their progress hook and follow
+    changes at once; subprocess jobs get --limit-rate when they start and
+    keep that allocation until they finish.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.limiters = []
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """Change the global cap; running in-process jobs adapt at once"""
+        with self._lock:
+            self.rate = rate or None
+            self._allocate()
+
+    def set_cap(self, limiter, cap):
+        """Change the cap of one running job"""
+        with self._lock:
+            limiter.cap = cap or None
+            self._allocate()
+
+    def register(self, cap=None, fixed=False):
+        with self._lock:
+            limiter = JobLimiter(self, cap or None, fixed)
+            self.limiters.append(limiter)
+            self._allocate()
+        return limiter
+
+    def unregister(self, limiter):
+        with self._lock:
+            if limiter in self.limiters:
+                self.limiters.remove(limiter)
+            self._allocate()
+
+    def snapshot(self):
+        """(allocated, actual) bytes per second over all active jobs.
+
+        allocated is None when no limit applies to any active job.
+        """
+        with self._lock:
+            now = time.monotonic()
+            actual = 0.0
+            for limiter in self.limiters:
+                # A job that stopped reporting is not moving any bytes
+                if now - limiter._window_start < 3:
+                    actual += limiter.actual
+            allocations = [limiter.allocated for limiter in self.limiters]
+        if not allocations or None in allocations:
+            return None, actual
+        return sum(allocations), actual
+
+    def _allocate(self):
+        # Fixed (subprocess) jobs keep what they were given at start
+        fixed = [l for l in self.limiters if l.fixed and l.allocated]
+        flexible = [l for l in self.limiters if l not in fixed]
+        if self.rate is None:
+            for limiter in flexible:
+                limiter.allocated = limiter.cap
+            return
+
+        remaining = max(0, self.rate - sum(l.allocated for l in fixed))
+        # Water-filling: the smallest caps are served first
+        flexible.sort(key=lambda l: l.cap or float("inf"))
+        for position, limiter in enumerate(flexible):
+            share = remaining / (len(flexible) - position)
+            if limiter.cap is not None:
+                share = min(share, limiter.cap)
+            # Never stall a job completely
+            limiter.allocated = max(share, 16 * 1024)
+            remaining -= share
+
+
+# Shared by every window and download path
+default_governor = BandwidthGovernor()
@@ -0,0 +1,318 @@
+"""Large downloads split across several machines through a shared queue.
+
+A manifest is a JSONL file with one download per line:
+
+    {"url": "https://youtu.be/...", "kind": "audio", "audio_format": "mp3"}
+    {"url": "https://www.youtube.com/playlist?list=...", "range": "1-500"}
+
+Optional fields are platform, kind, audio_format, output, connections,
+use_cache, range and rate_limit, in MB/s like --job-limit-rate of the
+command line (0 = no cap of its own).
+
+Load it into a queue every node can reach, then start workers anywhere:
+
+    python -m Code.batch load manifest.jsonl --queue /shared/queue.db
+    python -m Code.batch work --queue /shared/queue.db -c 4
+    python -m Code.batch status --queue /shared/queue.db
+
+Workers claim one item at a time under a lease they keep renewing, so no
+item is downloaded twice and the items of a node that dies go to the
+others once its leases expire. A playlist line is listed by the node that
+claims it and queued again as one item per video.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from . import engine, url_classifier
+from .bandwidth import default_governor, parse_rate
+from .cli import JSONReporter
+from .lease_queue import DONE, FAILED, MemoryLeaseQueue, open_queue
+from .session_pool import default_pool
+from .worker_pool import DownloadJob, WorkerPool
+
+# Manifest fields passed on to the download of an item
+OPTION_KEYS = (
+    "platform",
+    "kind",
+    "audio_format",
+    "output",
+    "connections",
+    "rate_limit",
+    "use_cache",
+    "range",
+)
+
+DEFAULT_LEASE = 60.0
+
+
+class BatchReporter(JSONReporter):
+    """JSON lines like the CLI, labelled as batch work in the metrics"""
+
+    metrics_source = "batch"
+
+
+def parse_entry(entry):
+    """Queue item for one manifest entry; raises ValueError when invalid"""
+    if isinstance(entry, str):
+        entry = {"url": entry}
+    if not isinstance(entry, dict) or not isinstance(entry.get("url"), str):
+        raise ValueError('an entry needs a "url"')
+    unknown = set(entry) - set(OPTION_KEYS) - {"url", "playlist"}
+    if unknown:
+        raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
+    url = entry["url"].strip()
+    options = {key: entry[key] for key in OPTION_KEYS if key in entry}
+    if options.setdefault("kind", "video") not in ("video", "audio"):
+        raise ValueError('"kind" is "video" or "audio"')
+    if options.get("audio_format", "native") not in engine.AUDIO_FORMATS:
+        raise ValueError(f'"audio_format" is one of {engine.AUDIO_FORMATS}')
+    rate_limit = options.get("rate_limit", 0)
+    if isinstance(rate_limit, bool) or not isinstance(rate_limit, (int, float)):
+        raise ValueError('"rate_limit" is a number of MB/s')
+    if entry.get("playlist", url_classifier.is_playlist(url)):
+        options["playlist"] = True
+        engine.parse_ranges(options.setdefault("range", "1-"))
+    elif "range" in options:
+        raise ValueError('"range" only applies to playlists')
+    options.setdefault("platform", engine.detect_platform(url))
+    if options["platform"] is None:
+        raise ValueError("not a Facebook, Instagram, TikTok or YouTube URL")
+    return {"url": url, "options": options}
+
+
+def read_manifest(path):
+    """Queue items of a JSONL manifest; blank lines and # comments skipped"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                items.append(parse_entry(json.loads(line)))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}")
+    return items
+
+
+def expand_playlist(queue, item, reporter):
+    """List a playlist item and queue one item per selected video"""
+    options = item["options"]
+    intervals = engine.parse_ranges(options["range"])
+    use_cache = options.get("use_cache", True)
+    children = []
+    with default_pool.session({"quiet": True, "extract_flat": True}) as ydl:
+        info, entries = engine.open_playlist(ydl, item["url"], use_cache)
+        for index, entry in engine.iter_selected(entries, intervals, {}):
+            url = entry and (entry.get("url") or entry.get("webpage_url"))
+            if not url:
+                reporter.log_message(f"⚠️ Skipping unavailable video: {index}")
+                continue
+            child = {key: value for key, value in options.items() if key != "range"}
+            child["playlist"] = False
+            children.append({"url": url, "options": child})
+    added = queue.add(children)
+    reporter.log_message(
+        f"📋 {info.get('title', 'Untitled Playlist')}: "
+        f"{added} video(s) queued for every node"
+    )
+
+
+def work(queue, node, concurrency, output, reporter, lease=DEFAULT_LEASE, poll=5.0):
+    """Download items from queue until none is left; returns a summary.
+
+    Leases are renewed every lease / 3 seconds. A download whose lease was
+    lost, e.g. after the node could not reach the queue for too long, is
+    cancelled: another node owns it now. An item is only claimed when a
+    worker is free to start it, so idle nodes get their share.
+    """
+    pool = WorkerPool(concurrency)
+    held = {}
+    # Claimed items still downloading; ffmpeg work no longer holds a worker
+    downloading = set()
+    free = threading.Semaphore(pool.max_workers)
+    lock = threading.Lock()
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(lease / 3):
+            with lock:
+                leased = list(held.items())
+            for job, item in leased:
+                try:
+                    renewed = queue.renew(item["id"], item["token"], lease)
+                except Exception as e:
+                    reporter.log_message(f"⚠️ Could not renew leases: {e}")
+                    break
+                if not renewed and not job.cancelled:
+                    job.cancelled = True
+                    reporter.log_message(
+                        f"⚠️ Lost the lease on {job.title}: another node has it"
+                    )
+
+    def claimed_jobs():
+        while True:
+            free.acquire()
+            item = queue.claim(node, lease)
+            if item is None:
+                free.release()
+                counts = queue.counts()
+                if not counts.get("pending") and not counts.get("leased"):
+                    return
+                # Wait for running items, or for dead nodes' leases to expire
+                time.sleep(poll)
+                continue
+            options = item["options"]
+            job = DownloadJob(
+                item["id"],
+                item["url"],
+                platform=options.get("platform"),
+                kind=options.get("kind", "video"),
+            )
+            job.audio_format = options.get("audio_format", "native")
+            job.rate_limit = parse_rate(options.get("rate_limit"))
+            with lock:
+                held[job] = item
+                downloading.add(job)
+            yield job
+
+    def download(job):
+        item = held[job]
+        options = item["options"]
+        if options.get("playlist"):
+            return expand_playlist(queue, item, reporter)
+        folder = options.get("output") or output
+        os.makedirs(folder, exist_ok=True)
+        return engine.download_single(
+            job,
+            folder,
+            reporter,
+            options.get("use_cache", True),
+            engine.clamp_connections(options.get("connections", 1)),
+        )
+
+    def updated(job):
+        reporter.job_updated(job)
+        finished = job.state in DownloadJob.FINAL_STATES
+        if finished or job.state == DownloadJob.PROCESSING:
+            with lock:
+                if job in downloading:
+                    downloading.discard(job)
+                    free.release()
+        if not finished:
+            return
+        with lock:
+            item = held.pop(job)
+        if job.state == DownloadJob.CANCELLED:
+            # The lease was lost: the item belongs to another node now
+            return
+        state = FAILED if job.state == DownloadJob.FAILED else DONE
+        if not queue.complete(item["id"], item["token"], state, job.error):
+            reporter.log_message(f"⚠️ {job.title} was finished by another node")
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    reporter.log_message(f"🧩 Node {node} working on the queue")
+    try:
+        return pool.run(claimed_jobs(), download, updated)
+    finally:
+        stopped.set()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m Code.batch",
+        description="Split downloads from a manifest across several machines.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    queue_help = (
+        "shared queue: a SQLite file every node can open, " 'or "<backend>:<location>"'
+    )
+
+    load = commands.add_parser("load", help="queue the downloads of manifests")
+    load.add_argument("manifests", nargs="+", help="JSONL manifest files")
+    load.add_argument("--queue", required=True, help=queue_help)
+
+    run = commands.add_parser("work", help="download items until none is left")
+    run.add_argument("--queue", required=True, help=queue_help)
+    run.add_argument(
+        "--node",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="name of this node in the queue (default host-pid)",
+    )
+    run.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help=f"parallel downloads ({WorkerPool.MIN_WORKERS}-{WorkerPool.MAX_WORKERS})",
+    )
+    run.add_argument(
+        "-o",
+        "--output",
+        default="downloaded_items",
+        help="folder for items whose manifest entry names none",
+    )
+    run.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE,
+        help="seconds an item stays with a node that stopped renewing it",
+    )
+    run.add_argument(
+        "--limit-rate",
+        type=float,
+        default=0,
+        help="bandwidth in MB/s of this node (0 = unlimited)",
+    )
+
+    status = commands.add_parser("status", help="count the items per state")
+    status.add_argument("--queue", required=True, help=queue_help)
+
+    retry = commands.add_parser("retry", help="queue failed items again")
+    retry.add_argument("--queue", required=True, help=queue_help)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reporter = BatchReporter()
+    try:
+        queue = open_queue(args.queue)
+    except ValueError as e:
+        build_parser().error(str(e))
+    if isinstance(queue, MemoryLeaseQueue):
+        # Each command runs in its own process and would see an empty queue
+        build_parser().error("a memory queue only lives inside one process")
+
+    if args.command == "load":
+        items = []
+        for path in args.manifests:
+            try:
+                items += read_manifest(path)
+            except (OSError, ValueError) as e:
+                build_parser().error(str(e))
+        added = queue.add(items)
+        reporter.emit("loaded", items=len(items), added=added, **queue.counts())
+    elif args.command == "work":
+        default_governor.set_rate(parse_rate(args.limit_rate))
+        summary = work(
+            queue, args.node, args.concurrency, args.output, reporter, args.lease
+        )
+        reporter.emit("summary", node=args.node, **summary)
+        return 1 if summary["failed"] else 0
+    elif args.command == "status":
+        failures = [{"url": url, "error": error} for url, error in queue.failures()]
+        reporter.emit("status", failures=failures, **queue.counts())
+    elif args.command == "retry":
+        reporter.emit("retry", requeued=queue.retry_failed())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
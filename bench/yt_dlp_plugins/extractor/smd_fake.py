@@ -0,0 +1,61 @@
+"""yt-dlp extractors for the local fake platform (see fake_platform.py)"""
+
+from yt_dlp.extractor.common import InfoExtractor
+
+_BASE = r"(?P<base>https?://(?:localhost|127\.0\.0\.1):\d+)/smdfake"
+
+
+class SmdFakeIE(InfoExtractor):
+    IE_NAME = "smdfake"
+    _VALID_URL = _BASE + r"/video/(?P<id>[\w-]+)"
+
+    def _real_extract(self, url):
+        base, video_id = self._match_valid_url(url).group("base", "id")
+        meta = self._download_json(
+            f"{base}/smdfake/api/video/{video_id}.json", video_id
+        )
+        if meta["protocol"] == "m3u8":
+            formats = self._extract_m3u8_formats(
+                meta["url"], video_id, "mp4", entry_protocol="m3u8_native"
+            )
+            for f in formats:
+                f["height"] = meta["height"]
+        else:
+            formats = [
+                {
+                    "format_id": "progressive",
+                    "url": meta["url"],
+                    "ext": "mp4",
+                    "height": meta["height"],
+                    "filesize": meta["filesize"],
+                }
+            ]
+        return {"id": video_id, "title": meta["title"], "formats": formats}
+
+
+class SmdFakePlaylistIE(InfoExtractor):
+    IE_NAME = "smdfake:playlist"
+    _VALID_URL = _BASE + r"/playlist/(?P<id>[\w-]+)"
+
+    def _entries(self, base, playlist_id):
+        page = 0
+        while True:
+            data = self._download_json(
+                f"{base}/smdfake/api/playlist/{playlist_id}.json",
+                playlist_id,
+                note=f"Downloading page {page + 1}",
+                query={"page": page},
+            )
+            for entry in data["entries"]:
+                yield self.url_result(
+                    entry["url"], SmdFakeIE.ie_key(), entry["id"], entry["title"]
+                )
+            if not data["more"]:
+                return
+            page += 1
+
+    def _real_extract(self, url):
+        base, playlist_id = self._match_valid_url(url).group("base", "id")
+        return self.playlist_result(
+            self._entries(base, playlist_id), playlist_id, "Fake playlist"
+        )
@@ -0,0 +1,687 @@
+"""Performance benchmarks for the download engines.
+
+Run from the directory containing the package, e.g.:
+
+    python -m Code.benchmark first-byte URL
+    python -m Code.benchmark startup --budget 1.0
+    python -m Code.benchmark classify --count 100000
+    python -m Code.benchmark transfer --connections 8
+    python -m Code.benchmark offline [--save-baseline | --compare]
+    python -m Code.benchmark audio --seconds 600
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from . import engine, fake_platform, url_classifier
+from .worker_pool import DownloadJob, WorkerPool
+
+BASELINES = fake_platform.PLUGIN_DIR / "baselines.json"
+
+
+def first_byte_inprocess(url, output_dir):
+    """Seconds from start until the in-process engine receives media bytes"""
+    opts = engine.video_options(f"{output_dir}/%(id)s.%(ext)s", "best")
+    opts["nopart"] = True
+    started = time.perf_counter()
+    first_byte = []
+
+    class FirstByte(Exception):
+        pass
+
+    def hook(d):
+        if d["status"] == "downloading" and d.get("downloaded_bytes"):
+            first_byte.append(time.perf_counter() - started)
+            raise FirstByte()
+
+    opts["progress_hooks"] = [hook]
+    try:
+        with engine.yt_dlp().YoutubeDL(opts) as ydl:
+            ydl.download([url])
+    except FirstByte:
+        pass
+    except engine.yt_dlp().utils.DownloadError:
+        if not first_byte:
+            raise
+    return first_byte[0] if first_byte else None
+
+
+def first_byte_subprocess(url, output_dir):
+    """Seconds from start until the yt-dlp executable reports media bytes"""
+    cmd = engine.subprocess_command(f"{output_dir}/%(id)s.%(ext)s", "best")
+    cmd.append(url)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    try:
+        for line in process.stdout:
+            match = re.search(r"\[download\]\s+(\d+(?:\.\d+)?)%", line)
+            if match and float(match.group(1)) > 0:
+                return time.perf_counter() - started
+    finally:
+        process.kill()
+        process.wait()
+    return None
+
+
+def run_first_byte(args):
+    for name, measure in (
+        ("in-process", first_byte_inprocess),
+        ("subprocess", first_byte_subprocess),
+    ):
+        timings = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as output_dir:
+                timings.append(measure(args.url, output_dir))
+        timings = [t for t in timings if t is not None]
+        if timings:
+            best = min(timings)
+            mean = sum(timings) / len(timings)
+            print(f"{name:>11}: best {best:.3f}s  mean {mean:.3f}s")
+        else:
+            print(f"{name:>11}: no bytes received")
+
+
+# Runs in a fresh interpreter; prints the wall clock at each milestone
+STARTUP_SCRIPT = """
+import sys, time, tkinter as tk
+from {package}.social_media_downloader import SocialMediaDownloader
+imported = time.time()
+heavy = sorted(name for name in ("yt_dlp",) if name in sys.modules)
+root = tk.Tk()
+SocialMediaDownloader(root)
+root.update()
+print(imported, time.time(), ",".join(heavy) or "-")
+root.destroy()
+"""
+
+
+def startup_once(importtime=False):
+    """(import seconds, first-window seconds, eager modules, importtime log)"""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", STARTUP_SCRIPT.format(package=__package__)]
+    started = time.time()
+    result = subprocess.run(
+        cmd,
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    imported, drawn, heavy = result.stdout.split()[-3:]
+    return float(imported) - started, float(drawn) - started, heavy, result.stderr
+
+
+def slowest_imports(log, count):
+    """Top cumulative entries of a python -X importtime log"""
+    rows = []
+    for line in log.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (.*)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(3).strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def run_startup(args):
+    timings = []
+    for _ in range(args.repeat):
+        try:
+            timings.append(startup_once())
+        except RuntimeError as e:
+            print(f"startup failed: {e}")
+            return 1
+    imports = min(t[0] for t in timings)
+    drawn = min(t[1] for t in timings)
+    mean = sum(t[1] for t in timings) / len(timings)
+    print(f"      import: best {imports:.3f}s")
+    print(f"first window: best {drawn:.3f}s  mean {mean:.3f}s")
+    print(f"eager heavy modules: {timings[0][2]}")
+
+    if args.top:
+        log = startup_once(importtime=True)[3]
+        print("slowest imports (cumulative):")
+        for micros, name in slowest_imports(log, args.top):
+            print(f"  {micros / 1000:8.1f}ms  {name}")
+
+    if timings[0][2] != "-":
+        print("FAIL: heavy modules imported before the window was drawn")
+        return 1
+    if args.budget and drawn > args.budget:
+        print(f"FAIL: first window took longer than {args.budget:.3f}s")
+        return 1
+    return 0
+
+
+# Per-platform pattern lists the URL checks used before url_classifier
+LEGACY_PATTERNS = {
+    "facebook": [r"facebook\.com", r"fb\.watch", r"m\.facebook\.com"],
+    "instagram": [r"instagram\.com", r"instagr\.am"],
+    "tiktok": [
+        r"tiktok\.com",
+        r"vm\.tiktok\.com",
+        r"vt\.tiktok\.com",
+        r"m\.tiktok\.com",
+    ],
+}
+
+SAMPLE_URLS = [
+    "https://www.youtube.com/watch?v={yt}",
+    "https://youtu.be/{yt}?t=42",
+    "https://www.youtube.com/shorts/{yt}",
+    "https://www.youtube.com/playlist?list=PL{yt}",
+    "https://www.facebook.com/someone/videos/{num}/",
+    "https://fb.watch/{code}/",
+    "https://www.instagram.com/reel/{code}/",
+    "https://www.tiktok.com/@someone/video/{num}",
+    "https://vm.tiktok.com/{code}/",
+    "https://example.com/articles/{num}",
+]
+
+
+def legacy_detect(url):
+    for platform, patterns in LEGACY_PATTERNS.items():
+        if any(re.search(pattern, url, re.IGNORECASE) for pattern in patterns):
+            return platform
+    return None
+
+
+def sample_urls(count, seed=0):
+    """count pasted-looking URLs over every supported form"""
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-"
+    urls = []
+    for _ in range(count):
+        urls.append(
+            rng.choice(SAMPLE_URLS).format(
+                yt="".join(rng.choice(alphabet) for _ in range(11)),
+                num=rng.randrange(10**9, 10**19),
+                code="".join(rng.choice(alphabet) for _ in range(9)),
+            )
+        )
+    return urls
+
+
+def run_classify(args):
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        urls = sample_urls(args.count)
+
+    for name, classify in (
+        ("classifier", url_classifier.classify),
+        ("legacy", legacy_detect),
+    ):
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            for url in urls:
+                classify(url)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        per_ms = len(urls) / (best * 1000)
+        print(
+            f"{name:>10}: {per_ms:8.0f} URLs/ms  ({best * 1e6 / len(urls):.2f}us each)"
+        )
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    """Serves an HLS stream and a plain file, capping each connection.
+
+    The cap stands in for the per-connection limit of the real CDNs, so the
+    speedup from several connections shows up on localhost.
+    """
+
+    segments = 40
+    segment_size = 256 * 1024
+    rate = 2 * 1024 * 1024  # bytes per second per connection
+    payload = b""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/stream.m3u8":
+            lines = [
+                "#EXTM3U",
+                "#EXT-X-VERSION:3",
+                "#EXT-X-TARGETDURATION:2",
+                "#EXT-X-MEDIA-SEQUENCE:0",
+            ]
+            for i in range(self.segments):
+                lines += ["#EXTINF:2.0,", f"seg{i}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            self.send_body("\n".join(lines).encode(), "application/vnd.apple.mpegurl")
+        elif self.path.startswith("/seg"):
+            self.send_body(self.payload[: self.segment_size], "video/mp2t")
+        elif self.path == "/video.mp4":
+            self.send_file()
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type, status=200, headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        chunk = 16 * 1024
+        for start in range(0, len(body), chunk):
+            self.wfile.write(body[start : start + chunk])
+            time.sleep(chunk / self.rate)
+
+    def send_file(self):
+        body = self.payload
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if not match:
+            self.send_body(body, "video/mp4", headers=[("Accept-Ranges", "bytes")])
+            return
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(body) - 1
+        self.send_body(
+            body[start : end + 1],
+            "video/mp4",
+            206,
+            [
+                ("Accept-Ranges", "bytes"),
+                ("Content-Range", f"bytes {start}-{end}/{len(body)}"),
+            ],
+        )
+
+
+def transfer_once(url, connections):
+    """Seconds to download url with the given number of connections"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        opts = engine.video_options(
+            f"{output_dir}/%(id)s.%(ext)s", "best", connections=connections
+        )
+        started = time.perf_counter()
+        with engine.yt_dlp().YoutubeDL(opts) as ydl:
+            ydl.download([url])
+        return time.perf_counter() - started
+
+
+def run_transfer(args):
+    if engine.yt_dlp() is None:
+        print("transfer benchmark needs the yt_dlp module")
+        return 1
+    ThrottledHandler.segments = args.segments
+    ThrottledHandler.rate = args.rate * 1024 * 1024
+    ThrottledHandler.payload = os.urandom(args.segments * ThrottledHandler.segment_size)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottledHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    size = len(ThrottledHandler.payload) / (1024 * 1024)
+    print(f"{size:.0f} MB per run, {args.rate} MB/s per connection")
+
+    targets = [("HLS fragments", f"{base}/stream.m3u8")]
+    if shutil.which("aria2c"):
+        targets.append(("byte ranges", f"{base}/video.mp4"))
+    else:
+        print("aria2c not found: skipping the byte-range run")
+    try:
+        for name, url in targets:
+            single = min(transfer_once(url, 1) for _ in range(args.repeat))
+            fast = min(transfer_once(url, args.connections) for _ in range(args.repeat))
+            print(
+                f"{name:>13}: 1 connection {single:.2f}s, "
+                f"{args.connections} connections {fast:.2f}s "
+                f"({single / fast:.1f}x)"
+            )
+    finally:
+        server.shutdown()
+    return 0
+
+
+class BenchReporter(engine.Reporter):
+    """Collects time to first byte per job; everything else is dropped"""
+
+    def __init__(self):
+        self.started = {}
+        self.first_byte = {}
+
+    def job_updated(self, job):
+        if job.state == DownloadJob.RUNNING:
+            self.started.setdefault(job.index, time.perf_counter())
+
+    def hook(self, d, job):
+        if (
+            d["status"] == "downloading"
+            and d.get("downloaded_bytes")
+            and job.index not in self.first_byte
+        ):
+            started = self.started.get(job.index)
+            if started is not None:
+                self.first_byte[job.index] = time.perf_counter() - started
+
+
+def offline_child(args):
+    """One scenario in a fresh interpreter and data dir; prints JSON"""
+    import resource
+
+    reporter = BenchReporter()
+    with tempfile.TemporaryDirectory() as output_dir:
+        started = time.perf_counter()
+        if args.scenario == "single":
+            jobs = [
+                DownloadJob(i, f"{args.base}/smdfake/video/v{i}", platform="fake")
+                for i in range(1, args.items + 1)
+            ]
+            summary = WorkerPool(args.concurrency).run(
+                jobs,
+                lambda job: engine.download_single(
+                    job, output_dir, reporter, use_cache=False
+                ),
+                reporter.job_updated,
+            )
+        else:
+            summary = engine.download_playlist(
+                f"{args.base}/smdfake/playlist/p1",
+                output_dir,
+                "1-",
+                "video",
+                "720",
+                reporter,
+                args.concurrency,
+                use_cache=False,
+            )
+        elapsed = time.perf_counter() - started
+        size = sum(path.stat().st_size for path in Path(output_dir).iterdir())
+
+    ttfb = sorted(reporter.first_byte.values())
+    print(
+        json.dumps(
+            {
+                "completed": summary["completed"],
+                "failed": summary["failed"],
+                "seconds": elapsed,
+                "items_per_s": summary["completed"] / elapsed,
+                "mb_per_s": size / (1024 * 1024) / elapsed,
+                "ttfb_median_s": ttfb[len(ttfb) // 2] if ttfb else None,
+                # ru_maxrss is in kilobytes on Linux
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+        )
+    )
+
+
+def run_offline(args):
+    if engine.yt_dlp() is None:
+        print("offline benchmark needs the yt_dlp module")
+        return 1
+
+    results = {}
+    for mode in args.modes:
+        server = fake_platform.start_server(
+            items=args.items,
+            item_size=int(args.size * 1024 * 1024),
+            mode=mode,
+            latency=args.latency / 1000,
+            rate=args.rate * 1024 * 1024 if args.rate else None,
+        )
+        try:
+            for scenario in args.scenarios:
+                with tempfile.TemporaryDirectory() as data:
+                    env = dict(
+                        os.environ,
+                        SMD_DATA_DIR=data,
+                        PYTHONPATH=os.pathsep.join(
+                            filter(
+                                None,
+                                [
+                                    str(fake_platform.PLUGIN_DIR),
+                                    os.environ.get("PYTHONPATH"),
+                                ],
+                            )
+                        ),
+                    )
+                    cmd = [
+                        sys.executable,
+                        "-m",
+                        f"{__package__}.benchmark",
+                        "offline-child",
+                        server.base_url,
+                        scenario,
+                        "--items",
+                        str(args.items),
+                        "--concurrency",
+                        str(args.concurrency),
+                    ]
+                    result = subprocess.run(
+                        cmd,
+                        cwd=Path(__file__).resolve().parent.parent,
+                        env=env,
+                        capture_output=True,
+                        text=True,
+                    )
+                name = f"{scenario}-{mode}"
+                if result.returncode != 0:
+                    print(f"{name}: failed\n{result.stderr.strip()}")
+                    return 1
+                results[name] = json.loads(result.stdout.strip().splitlines()[-1])
+        finally:
+            server.shutdown()
+
+    baselines = {}
+    if BASELINES.exists():
+        with open(BASELINES, encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    regressions = []
+    for name, result in results.items():
+        ttfb = result["ttfb_median_s"]
+        print(
+            f"{name:>20}: {result['items_per_s']:6.2f} items/s  "
+            f"{result['mb_per_s']:7.1f} MB/s  "
+            f"TTFB {ttfb * 1000 if ttfb is not None else float('nan'):6.0f}ms  "
+            f"RSS {result['peak_rss_mb']:6.1f}MB  "
+            f"({result['completed']} ok, {result['failed']} failed)"
+        )
+        base = baselines.get(name)
+        if args.compare and not base:
+            regressions.append(f"{name}: no baseline in {BASELINES.name}")
+        elif args.compare:
+            for key, higher_is_better in (
+                ("items_per_s", True),
+                ("mb_per_s", True),
+                ("peak_rss_mb", False),
+            ):
+                change = (result[key] - base[key]) / base[key] if base[key] else 0
+                if not higher_is_better:
+                    change = -change
+                if change < -args.tolerance:
+                    regressions.append(
+                        f"{name} {key}: {base[key]:.2f} -> {result[key]:.2f}"
+                    )
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(BASELINES, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baselines saved to {BASELINES}")
+    if regressions:
+        print("FAIL: regressions beyond the tolerance or missing baselines:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+# Audio as platforms serve it: AAC in m4a and Opus in webm
+AUDIO_SOURCES = [
+    ("m4a (AAC)", "m4a", ["-c:a", "aac", "-b:a", "128k"]),
+    ("webm (Opus)", "webm", ["-c:a", "libopus", "-b:a", "128k"]),
+]
+
+
+def make_audio(ffmpeg, path, seconds, codec_args):
+    """Encode seconds of synthetic stereo audio to path"""
+    subprocess.run(
+        [ffmpeg, "-v", "error", "-y", "-f", "lavfi"]
+        + ["-i", f"sine=frequency=440:duration={seconds}:sample_rate=48000"]
+        + ["-ac", "2", *codec_args, "-vn", str(path)],
+        check=True,
+    )
+
+
+def audio_cpu_seconds(ydl, source, ext, audio_format):
+    """CPU seconds ffmpeg spends on a copy of source for audio_format.
+
+    Runs the same FFmpegExtractAudio post-processor the downloads use.
+    """
+    options = dict(engine.audio_postprocessor(audio_format))
+    postprocessor = engine.yt_dlp().postprocessor.get_postprocessor(options.pop("key"))(
+        ydl, **options
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, f"audio.{ext}")
+        shutil.copy(source, path)
+        before = os.times()
+        postprocessor.run({"filepath": path, "ext": ext})
+        after = os.times()
+    return (after.children_user + after.children_system) - (
+        before.children_user + before.children_system
+    )
+
+
+def run_audio(args):
+    ffmpeg = shutil.which("ffmpeg")
+    if engine.yt_dlp() is None or not ffmpeg:
+        print("audio benchmark needs the yt_dlp module and ffmpeg")
+        return 1
+    if sys.platform == "win32":
+        print("audio benchmark needs child CPU times, which Windows does not report")
+        return 1
+
+    print(f"{args.seconds:.0f}s of audio per run, best of {args.repeat}")
+    print(f"{'source':<12} {'mode':<7} {'CPU-s per hour of audio':>24}")
+    with tempfile.TemporaryDirectory() as folder:
+        ydl = engine.yt_dlp().YoutubeDL({"quiet": True, "ffmpeg_location": ffmpeg})
+        for name, ext, codec_args in AUDIO_SOURCES:
+            source = os.path.join(folder, f"source.{ext}")
+            make_audio(ffmpeg, source, args.seconds, codec_args)
+            for audio_format in engine.AUDIO_FORMATS:
+                cpu = min(
+                    audio_cpu_seconds(ydl, source, ext, audio_format)
+                    for _ in range(args.repeat)
+                )
+                per_hour = cpu * 3600 / args.seconds
+                print(f"{name:<12} {audio_format:<7} {per_hour:>24.1f}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Code.benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    first_byte = commands.add_parser(
+        "first-byte", help="startup-to-first-byte, in-process vs subprocess"
+    )
+    first_byte.add_argument("url")
+    first_byte.add_argument("--repeat", type=int, default=3)
+    first_byte.set_defaults(func=run_first_byte)
+
+    startup = commands.add_parser(
+        "startup", help="cold start to first drawn window of the main GUI"
+    )
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.add_argument(
+        "--budget", type=float, help="fail when the best run is slower (seconds)"
+    )
+    startup.add_argument(
+        "--top", type=int, default=10, help="show the N slowest imports"
+    )
+    startup.set_defaults(func=run_startup)
+
+    classify = commands.add_parser(
+        "classify", help="URL classification throughput vs the old regex lists"
+    )
+    classify.add_argument("--count", type=int, default=100000)
+    classify.add_argument("--file", help="classify the URLs in this file instead")
+    classify.add_argument("--repeat", type=int, default=3)
+    classify.set_defaults(func=run_classify)
+
+    transfer = commands.add_parser(
+        "transfer", help="fast transfer speedup against a throttled local server"
+    )
+    transfer.add_argument("--connections", type=int, default=engine.FAST_CONNECTIONS)
+    transfer.add_argument("--segments", type=int, default=40)
+    transfer.add_argument(
+        "--rate", type=float, default=2, help="MB/s cap per connection"
+    )
+    transfer.add_argument("--repeat", type=int, default=1)
+    transfer.set_defaults(func=run_transfer)
+
+    offline = commands.add_parser(
+        "offline", help="end-to-end runs against a local fake platform"
+    )
+    offline.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=["single", "playlist"],
+        choices=["single", "playlist"],
+    )
+    offline.add_argument(
+        "--modes",
+        nargs="+",
+        default=["progressive", "hls"],
+        choices=["progressive", "hls"],
+    )
+    offline.add_argument("--items", type=int, default=20)
+    offline.add_argument("--size", type=float, default=4, help="MB per item")
+    offline.add_argument("--latency", type=float, default=20, help="ms per request")
+    offline.add_argument(
+        "--rate", type=float, default=0, help="MB/s per connection (0 = unlimited)"
+    )
+    offline.add_argument("--concurrency", type=int, default=4)
+    offline.add_argument(
+        "--compare",
+        action="store_true",
+        help="fail on regressions vs baselines, or when a scenario has none",
+    )
+    offline.add_argument(
+        "--tolerance", type=float, default=0.15, help="allowed relative slowdown"
+    )
+    offline.add_argument("--save-baseline", action="store_true")
+    offline.set_defaults(func=run_offline)
+
+    audio = commands.add_parser(
+        "audio", help="ffmpeg CPU time of native vs MP3 audio downloads"
+    )
+    audio.add_argument(
+        "--seconds", type=float, default=600, help="length of the test audio"
+    )
+    audio.add_argument("--repeat", type=int, default=3)
+    audio.set_defaults(func=run_audio)
+
+    # Internal: one scenario in a child interpreter
+    child = commands.add_parser("offline-child")
+    child.add_argument("base")
+    child.add_argument("scenario", choices=["single", "playlist"])
+    child.add_argument("--items", type=int, default=20)
+    child.add_argument("--concurrency", type=int, default=4)
+    child.set_defaults(func=offline_child)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
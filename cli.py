@@ -0,0 +1,320 @@
+"""Headless command line entry point.
+
+Runs the same engine as the GUIs without importing tkinter and prints one
+JSON object per line on stdout, e.g.:
+
+    python -m Code.cli URL [URL ...] --audio
+    python -m Code.cli --file urls.txt --concurrency 4
+    python -m Code.cli --playlist URL --range 1-10 --quality 720
+    python -m Code.cli --resume
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+from . import engine, url_classifier
+from .bandwidth import default_governor, parse_rate
+from .journal import default_journal
+from .metrics import default_metrics
+from .worker_pool import DownloadJob, WorkerPool
+
+
+class JSONReporter(engine.Reporter):
+    """Print engine events as JSON lines"""
+
+    metrics_source = "cli"
+
+    def __init__(self, stream=sys.stdout, progress_interval=0.5):
+        self.stream = stream
+        self.progress_interval = progress_interval
+        self._last_progress = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        fields["time"] = round(time.time(), 3)
+        line = json.dumps(fields, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def log_message(self, message, tick=False):
+        if not tick:
+            self.emit("log", message=message)
+
+    def set_status(self, text):
+        self.emit("status", message=text)
+
+    def hook(self, d, job):
+        if d["status"] == "downloading":
+            percent = engine.progress_percent(d)
+            if percent is not None:
+                job.progress = percent
+            # Throttle per-tick events for each job
+            now = time.monotonic()
+            if now - self._last_progress.get(job.index, 0) < self.progress_interval:
+                return
+            self._last_progress[job.index] = now
+            self.emit(
+                "progress",
+                job=job.index,
+                url=job.url,
+                percent=percent,
+                downloaded_bytes=d.get("downloaded_bytes"),
+                total_bytes=d.get("total_bytes") or d.get("total_bytes_estimate"),
+                speed=d.get("speed"),
+                eta=d.get("eta"),
+                filename=d.get("filename"),
+            )
+        elif d["status"] == "finished":
+            self.emit(
+                "finished", job=job.index, url=job.url, filename=d.get("filename")
+            )
+
+    def job_updated(self, job):
+        self.emit(
+            "job",
+            job=job.index,
+            url=job.url,
+            title=job.title,
+            platform=job.platform,
+            state=job.state,
+            retries=job.retries,
+            error=job.error,
+        )
+
+    def playlist_loaded(self, info, jobs):
+        self.emit(
+            "playlist",
+            title=info.get("title"),
+            count=info.get("playlist_count"),
+        )
+
+    def job_metrics(self, record):
+        # Same record as the metrics file, see metrics.JobMetrics.record
+        self.emit("metrics", **record)
+
+
+def read_url_files(paths):
+    """URLs from text files, one per line; blank lines and # comments skipped"""
+    urls = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    urls.append(line)
+    return urls
+
+
+def download_jobs(jobs, options, concurrency, reporter):
+    """Download single-video jobs as one journaled run and return a summary"""
+    run = default_journal().start("single", options, reporter.metrics_source)
+    for job in jobs:
+        if job.state == DownloadJob.QUEUED:
+            job.run = run
+            default_journal().record(job)
+    output_dir = Path(options["output"])
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary = WorkerPool(concurrency).run(
+        jobs,
+        lambda job: engine.download_single(
+            job, output_dir, reporter, options["use_cache"], options["connections"]
+        ),
+        default_journal().track(reporter.job_updated),
+    )
+    default_journal().close(run)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m Code.cli",
+        description="Download Facebook, Instagram, TikTok, YouTube videos and "
+        "YouTube playlists without a GUI.",
+    )
+    parser.add_argument("urls", nargs="*", help="video or playlist URLs")
+    parser.add_argument(
+        "-f", "--file", action="append", default=[], help="file with one URL per line"
+    )
+    parser.add_argument(
+        "-p", "--playlist", action="append", default=[], help="YouTube playlist URL"
+    )
+    parser.add_argument(
+        "-r", "--range", default="1-", help="playlist range, e.g. 1-3,5,7-"
+    )
+    parser.add_argument(
+        "-q",
+        "--quality",
+        default="720",
+        choices=["1080", "720", "480", "360"],
+        help="playlist video quality",
+    )
+    parser.add_argument(
+        "-a", "--audio", action="store_true", help="download audio only"
+    )
+    parser.add_argument(
+        "--audio-format",
+        default="native",
+        choices=engine.AUDIO_FORMATS,
+        help="native keeps the source codec without re-encoding (default); "
+        "mp3 re-encodes to 192K MP3",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=4,
+        help=f"parallel downloads ({WorkerPool.MIN_WORKERS}-{WorkerPool.MAX_WORKERS})",
+    )
+    parser.add_argument(
+        "-o", "--output", default="downloaded_items", help="output folder"
+    )
+    parser.add_argument(
+        "-N",
+        "--connections",
+        type=int,
+        default=1,
+        help="fast transfer: fetch fragments and byte ranges over N "
+        f"connections (up to {engine.MAX_CONNECTIONS}, default 1 = off)",
+    )
+    parser.add_argument(
+        "--limit-rate",
+        type=float,
+        default=0,
+        help="total bandwidth in MB/s shared by all downloads (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--job-limit-rate",
+        type=float,
+        default=0,
+        help="bandwidth cap in MB/s of each download (0 = fair share only)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="ignore cached metadata"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="finish the downloads of earlier runs that were interrupted",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="append per-job stage timings as JSON lines here "
+        "(default: metrics.jsonl in the data folder)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        help="write Prometheus metrics here, e.g. into the node exporter "
+        "textfile directory (default: metrics.prom in the data folder)",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reporter = JSONReporter()
+    kind = "audio" if args.audio else "video"
+    use_cache = not args.no_cache
+    connections = engine.clamp_connections(args.connections)
+    default_governor.set_rate(parse_rate(args.limit_rate))
+    default_metrics.configure(args.metrics_file, args.metrics_textfile)
+    job_limit = parse_rate(args.job_limit_rate)
+
+    urls = list(args.urls) + read_url_files(args.file)
+    resumable = default_journal().unfinished([reporter.metrics_source])
+    if resumable and not args.resume:
+        reporter.log_message(
+            f"↩️ {len(resumable)} interrupted run(s) can be finished with --resume"
+        )
+    if not urls and not args.playlist and not args.resume:
+        build_parser().error("no URLs given")
+    try:
+        engine.parse_ranges(args.range)
+    except ValueError as e:
+        build_parser().error(f"invalid --range: {e}")
+
+    # Playlist links given as plain URLs go to the playlist pipeline
+    playlists = list(args.playlist)
+    playlists += [url for url in urls if url_classifier.is_playlist(url)]
+    urls = [url for url in urls if not url_classifier.is_playlist(url)]
+
+    failed = 0
+
+    for run in resumable if args.resume else ():
+        # A resumed run is journaled again as a new one
+        default_journal().close(run["id"])
+        if run["kind"] == "playlist":
+            options = dict(run["options"])
+            options["range_str"] = engine.resume_range(run, reporter)
+            if not options["range_str"]:
+                continue
+            try:
+                summary = engine.download_playlist(reporter=reporter, **options)
+            except Exception as e:
+                reporter.emit("error", url=options["playlist_url"], message=str(e))
+                failed += 1
+                continue
+            reporter.emit("summary", url=options["playlist_url"], **summary)
+        else:
+            jobs = engine.resume_jobs(run, reporter)
+            if not jobs:
+                continue
+            summary = download_jobs(jobs, run["options"], args.concurrency, reporter)
+            reporter.emit("summary", **summary)
+        failed += summary["failed"]
+
+    # Single videos share one worker pool
+    jobs = []
+    for index, url in enumerate(urls, 1):
+        platform = engine.detect_platform(url)
+        job = DownloadJob(index, url, platform=platform, kind=kind)
+        job.rate_limit = job_limit
+        job.audio_format = args.audio_format
+        if platform is None:
+            job.state = DownloadJob.FAILED
+            job.error = "Not a Facebook, Instagram, TikTok or YouTube URL"
+            reporter.job_updated(job)
+        jobs.append(job)
+
+    if jobs:
+        options = {
+            "output": str(Path(args.output).resolve()),
+            "use_cache": use_cache,
+            "connections": connections,
+        }
+        summary = download_jobs(jobs, options, args.concurrency, reporter)
+        reporter.emit("summary", **summary)
+        failed += summary["failed"]
+
+    for playlist_url in playlists:
+        try:
+            summary = engine.download_playlist(
+                playlist_url,
+                args.output,
+                args.range,
+                kind,
+                args.quality,
+                reporter,
+                args.concurrency,
+                use_cache,
+                connections,
+                job_limit,
+                args.audio_format,
+            )
+        except Exception as e:
+            reporter.emit("error", url=playlist_url, message=str(e))
+            failed += 1
+            continue
+        reporter.emit("summary", url=playlist_url, **summary)
+        failed += summary["failed"]
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,570 @@
+"""Local download service shared by every window and tool on this machine.
+
+    python -m Code.daemon [--port 8765] [--concurrency 4]
+
+One process owns the download queue, the metadata cache and the bandwidth
+budget. The GUIs find it through daemon.json in the data folder and become
+thin clients (see daemon_client.py); anything else can use the JSON API on
+127.0.0.1, sending the token from daemon.json as "Authorization: Bearer":
+
+    POST   /tasks         {"url": ...} or {"playlist": ..., "range": "1-10"}
+    GET    /tasks         every task with its jobs
+    GET    /tasks/<id>
+    DELETE /tasks/<id>    cancel a task
+    GET    /events        progress as server-sent events, ?task=<id> for one
+    GET    /settings      concurrency and bandwidth limit
+    PUT    /settings      {"concurrency": 4, "rate": 1048576}
+
+Rates are in bytes per second, null for unlimited. Events are the JSON
+objects of the command line (python -m Code.cli) with the task id added.
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import secrets
+import signal
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import engine, url_classifier
+from .bandwidth import default_governor, parse_rate
+from .cli import JSONReporter
+from .daemon_client import info_path
+from .journal import default_journal
+from .scheduler import JobScheduler
+from .worker_pool import DownloadJob, WorkerPool
+
+DEFAULT_PORT = 8765
+API_VERSION = 1
+
+# Events a slow client may lag behind before it is disconnected
+SUBSCRIBER_BACKLOG = 10000
+
+
+def byte_rate(value):
+    """Bytes per second from an API value; None for null or 0"""
+    try:
+        rate = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError("Rates are numbers of bytes per second")
+    return rate if rate > 0 else None
+
+
+class TaskReporter(JSONReporter):
+    """Engine reporter broadcasting the events of one task"""
+
+    metrics_source = "daemon"
+
+    def __init__(self, service, task):
+        super().__init__(stream=None)
+        self.service = service
+        self.task = task
+
+    def emit(self, event, **fields):
+        fields["event"] = event
+        fields["time"] = round(time.time(), 3)
+        fields["task"] = self.task.id
+        self.service.broadcast(fields)
+
+    def job_updated(self, job):
+        if self.task.cancelled and not job.cancelled:
+            # Videos still being listed when the playlist was cancelled
+            self.service.scheduler.cancel(job)
+        super().job_updated(job)
+
+    def playlist_loaded(self, info, jobs):
+        self.task.jobs = jobs
+        super().playlist_loaded(info, jobs)
+
+
+class Task:
+    """One submitted URL: a single video or a playlist"""
+
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    def __init__(self, task_id, request):
+        self.id = task_id
+        self.request = request
+        self.type = "playlist" if request.get("playlist") else "video"
+        self.state = self.RUNNING
+        self.cancelled = False
+        self.jobs = []
+        self.summary = None
+        self.error = None
+        self.created = time.time()
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "request": self.request,
+            "state": self.state,
+            "cancelled": self.cancelled,
+            "summary": self.summary,
+            "error": self.error,
+            "created": self.created,
+            "jobs": [
+                {
+                    "job": job.index,
+                    "url": job.url,
+                    "title": job.title,
+                    "platform": job.platform,
+                    "state": job.state,
+                    "progress": round(job.progress, 1),
+                    "retries": job.retries,
+                    "error": job.error,
+                }
+                for job in list(self.jobs)
+            ],
+        }
+
+
+class DownloadService:
+    """Queue of download tasks shared by every client of the service.
+
+    Single videos and the videos of playlists wait in one JobScheduler,
+    so concurrency and bandwidth are budgeted across all clients.
+    Every task is journaled; unfinished ones are resumed on start.
+    """
+
+    def __init__(self, concurrency=4, output="downloaded_items"):
+        self.output = os.path.abspath(output)
+        self.scheduler = JobScheduler(None, concurrency)
+        self.tasks = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def submit(self, request, resume_range=None):
+        """Start a task from an API request and return it.
+
+        Raises ValueError with a message for the client when the request
+        is not valid.
+        """
+        request = dict(request)
+        playlist = request.get("playlist")
+        url = request.get("url")
+        if bool(playlist) == bool(url):
+            raise ValueError('Give either "url" or "playlist"')
+        kind = request.setdefault("kind", "video")
+        if kind not in ("video", "audio"):
+            raise ValueError('"kind" is "video" or "audio"')
+        if request.setdefault("audio_format", "native") not in engine.AUDIO_FORMATS:
+            raise ValueError(f'"audio_format" is one of {engine.AUDIO_FORMATS}')
+        if request.setdefault("priority", "normal") not in JobScheduler.PRIORITIES:
+            raise ValueError('"priority" is "high", "normal" or "low"')
+        request["output"] = os.path.abspath(request.get("output") or self.output)
+        request.setdefault("use_cache", True)
+        request["connections"] = engine.clamp_connections(request.get("connections", 1))
+        request["rate_limit"] = byte_rate(request.get("rate_limit"))
+        if playlist:
+            request.setdefault("range", "1-")
+            request.setdefault("quality", "720")
+            engine.parse_ranges(request["range"])
+        elif engine.detect_platform(url) is None:
+            raise ValueError("Not a Facebook, Instagram, TikTok or YouTube URL")
+        elif url_classifier.is_playlist(url):
+            raise ValueError('Playlist and channel links go in "playlist"')
+
+        task_id = str(request.pop("id", None) or uuid.uuid4().hex)
+        if not re.fullmatch(r"[\w-]{1,64}", task_id):
+            raise ValueError('"id" may only hold letters, digits, "_" and "-"')
+        task = Task(task_id, request)
+        with self._lock:
+            if task_id in self.tasks:
+                raise ValueError(f"Task {task_id} exists already")
+            self.tasks[task_id] = task
+        self.broadcast_task(task)
+        if playlist:
+            thread = threading.Thread(
+                target=self.run_playlist, args=(task, resume_range), daemon=True
+            )
+            thread.start()
+        else:
+            self.run_video(task)
+        return task
+
+    def run_video(self, task):
+        request = task.request
+        reporter = TaskReporter(self, task)
+        job = DownloadJob(
+            1, request["url"], platform=engine.detect_platform(request["url"])
+        )
+        job.kind = request["kind"]
+        job.audio_format = request["audio_format"]
+        job.rate_limit = request["rate_limit"]
+        job.run = default_journal().start(
+            "single",
+            {
+                "output": request["output"],
+                "use_cache": request["use_cache"],
+                "connections": request["connections"],
+                "priority": request["priority"],
+            },
+            reporter.metrics_source,
+        )
+        task.jobs = [job]
+
+        def work(job):
+            os.makedirs(request["output"], exist_ok=True)
+            return engine.download_single(
+                job,
+                request["output"],
+                reporter,
+                request["use_cache"],
+                request["connections"],
+            )
+
+        def updated(job):
+            default_journal().record(job)
+            reporter.job_updated(job)
+            if job.state in DownloadJob.FINAL_STATES:
+                default_journal().close(job.run)
+                self.finish(task, reporter, summary=WorkerPool.summarize([job]))
+
+        self.scheduler.submit(
+            job, JobScheduler.PRIORITIES[request["priority"]], work, updated
+        )
+
+    def run_playlist(self, task, resume_range=None):
+        request = task.request
+        reporter = TaskReporter(self, task)
+        try:
+            os.makedirs(request["output"], exist_ok=True)
+            summary = engine.download_playlist(
+                request["playlist"],
+                request["output"],
+                resume_range or request["range"],
+                request["kind"],
+                request["quality"],
+                reporter,
+                use_cache=request["use_cache"],
+                connections=request["connections"],
+                rate_limit=request["rate_limit"],
+                audio_format=request["audio_format"],
+                scheduler=self.scheduler,
+            )
+        except Exception as e:
+            self.finish(task, reporter, error=str(e))
+        else:
+            self.finish(task, reporter, summary=summary)
+
+    def finish(self, task, reporter, summary=None, error=None):
+        task.summary = summary
+        task.error = error
+        task.state = Task.FAILED if error else Task.FINISHED
+        if error:
+            reporter.emit("error", url=task.request.get("playlist"), message=error)
+        else:
+            reporter.emit("summary", **summary)
+        self.broadcast_task(task)
+
+    def cancel(self, task_id):
+        """Cancel every job of a task; returns the task or None"""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        task.cancelled = True
+        for job in list(task.jobs):
+            self.scheduler.cancel(job)
+        self.broadcast_task(task)
+        return task
+
+    def resume(self):
+        """Submit again what the last run of the service left unfinished"""
+        for run in default_journal().unfinished([TaskReporter.metrics_source]):
+            default_journal().close(run["id"])
+            options = run["options"]
+            if run["kind"] == "playlist":
+                remaining = engine.resume_range(run)
+                if remaining:
+                    self.submit(
+                        {
+                            "playlist": options["playlist_url"],
+                            "output": options["folder_name"],
+                            "range": options["range_str"],
+                            "kind": options["kind"],
+                            "quality": options["quality"],
+                            "use_cache": options["use_cache"],
+                            "connections": options["connections"],
+                            "rate_limit": options["rate_limit"],
+                            "audio_format": options["audio_format"],
+                        },
+                        resume_range=remaining,
+                    )
+                continue
+            for job in engine.resume_jobs(run):
+                self.submit(
+                    {
+                        "url": job.url,
+                        "kind": job.kind,
+                        "audio_format": job.audio_format,
+                        "rate_limit": job.rate_limit,
+                        "output": options["output"],
+                        "use_cache": options["use_cache"],
+                        "connections": options["connections"],
+                        "priority": options.get("priority", "normal"),
+                    }
+                )
+
+    def settings(self):
+        return {
+            "concurrency": self.scheduler.max_concurrent,
+            "rate": default_governor.rate,
+        }
+
+    def update_settings(self, settings):
+        if "concurrency" in settings:
+            self.scheduler.set_concurrency(settings["concurrency"])
+        if "rate" in settings:
+            default_governor.set_rate(byte_rate(settings["rate"]))
+        self.broadcast({"event": "settings", **self.settings()})
+        return self.settings()
+
+    def status(self):
+        allocated, actual = default_governor.snapshot()
+        return {
+            "version": API_VERSION,
+            "pid": os.getpid(),
+            "busy": self.scheduler.busy(),
+            "tasks": len(self.tasks),
+            "allocated": allocated,
+            "actual": actual,
+        }
+
+    def broadcast_task(self, task):
+        event = {"event": "task", "time": round(time.time(), 3), "task": task.id}
+        self.broadcast(dict(event, **task.as_dict()))
+
+    def subscribe(self):
+        subscriber = queue.Queue(SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def broadcast(self, event):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait((event.get("task"), line))
+            except queue.Full:
+                # Too far behind: drop it, the client reconnects
+                self.unsubscribe(subscriber)
+                subscriber.put((None, None))
+
+    def report_bandwidth(self, interval=1.0):
+        """Broadcast the bandwidth in use every interval seconds"""
+        while True:
+            time.sleep(interval)
+            if self._subscribers:
+                allocated, actual = default_governor.snapshot()
+                self.broadcast(
+                    {"event": "bandwidth", "allocated": allocated, "actual": actual}
+                )
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+    token = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        if not secrets.compare_digest(
+            self.headers.get("Authorization", ""), f"Bearer {self.token}"
+        ):
+            # The body was not read, the connection cannot be reused
+            self.close_connection = True
+            return self.send_json({"error": "Missing or wrong token"}, 401)
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        service = self.service
+        try:
+            body = self.read_json() if method in ("POST", "PUT") else None
+            match = re.fullmatch(r"/tasks/([\w-]+)", path)
+            if path == "/status" and method == "GET":
+                return self.send_json(service.status())
+            if path == "/tasks" and method == "GET":
+                tasks = list(service.tasks.values())
+                return self.send_json([task.as_dict() for task in tasks])
+            if path == "/tasks" and method == "POST":
+                return self.send_json(service.submit(body).as_dict(), 201)
+            if match and method == "GET":
+                task = service.tasks.get(match.group(1))
+                if task is None:
+                    return self.send_json({"error": "No such task"}, 404)
+                return self.send_json(task.as_dict())
+            if match and method == "DELETE":
+                task = service.cancel(match.group(1))
+                if task is None:
+                    return self.send_json({"error": "No such task"}, 404)
+                return self.send_json(task.as_dict())
+            if path == "/settings" and method == "GET":
+                return self.send_json(service.settings())
+            if path == "/settings" and method == "PUT":
+                return self.send_json(service.update_settings(body))
+            if path == "/events" and method == "GET":
+                task_id = parse_qs(parts.query).get("task", [None])[0]
+                return self.stream_events(task_id)
+        except ValueError as e:
+            return self.send_json({"error": str(e)}, 400)
+        self.send_json({"error": "Not found"}, 404)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ValueError("The request body is not JSON")
+        if not isinstance(body, dict):
+            raise ValueError("The request body must be a JSON object")
+        return body
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, task_id=None):
+        """Server-sent events until the client goes away"""
+        subscriber = self.service.subscribe()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            # Tells the client every later event will reach it
+            self.write_event(json.dumps({"event": "hello", "version": API_VERSION}))
+            while True:
+                try:
+                    task, line = subscriber.get(timeout=15)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if line is None:
+                    return
+                if task_id is None or task == task_id:
+                    self.write_event(line)
+        except OSError:
+            pass
+        finally:
+            self.service.unsubscribe(subscriber)
+
+    def write_event(self, line):
+        self.wfile.write(f"data: {line}\n\n".encode())
+        self.wfile.flush()
+
+
+def serve(service, port=DEFAULT_PORT):
+    """Serve the API on 127.0.0.1:port until interrupted or terminated.
+
+    The address and a fresh token go into daemon.json, readable by the
+    current user only, and are removed again on exit.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    token = secrets.token_urlsafe(24)
+    handler = type("Handler", (ServiceHandler,), {"service": service, "token": token})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    path = info_path()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"url": url, "token": token, "pid": os.getpid()}, f)
+    threading.Thread(target=service.report_bandwidth, daemon=True).start()
+    print(f"🛰️ Download service listening on {url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m Code.daemon",
+        description="Run one local download service that the GUIs and other "
+        "tools submit jobs to over HTTP.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"port on 127.0.0.1 (default {DEFAULT_PORT}, 0 = any free port)",
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=4, help="parallel downloads"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="downloaded_items",
+        help="folder for tasks that do not name one",
+    )
+    parser.add_argument(
+        "--limit-rate",
+        type=float,
+        default=0,
+        help="total bandwidth in MB/s shared by all downloads (0 = unlimited)",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="do not restart the tasks an earlier run left unfinished",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    default_governor.set_rate(parse_rate(args.limit_rate))
+    service = DownloadService(args.concurrency, args.output)
+    if not args.no_resume:
+        service.resume()
+    serve(service, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
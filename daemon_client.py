@@ -0,0 +1,377 @@
+"""Client side of the local download service (python -m Code.daemon).
+
+With a service running, the windows hand their downloads to it and only
+mirror its events into local DownloadJob objects, so several windows on
+one machine share one queue and one bandwidth budget.
+"""
+
+import json
+import os
+import queue
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .bandwidth import format_rate
+from .paths import data_dir
+from .scheduler import JobScheduler
+from .worker_pool import DownloadJob, WorkerPool
+
+
+def info_path():
+    """Where a running service publishes its address and token"""
+    return data_dir() / "daemon.json"
+
+
+class DaemonClient:
+    """Talk to the service at url; events arrive on one background stream"""
+
+    def __init__(self, url, token, timeout=10):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        # Latest (allocated, actual) bandwidth reported by the service
+        self.bandwidth = (None, 0.0)
+        self._listeners = {}
+        self._stream = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def request(self, method, path, data=None, timeout=None):
+        """Call the API and return the decoded JSON answer.
+
+        Errors answered by the service raise RuntimeError with its message,
+        an unreachable service raises OSError.
+        """
+        body = None if data is None else json.dumps(data).encode()
+        req = urllib.request.Request(
+            self.url + path,
+            data=body,
+            method=method,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout or self.timeout) as r:
+                return json.load(r)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e)["error"]
+            except (ValueError, KeyError):
+                message = str(e)
+            raise RuntimeError(message)
+
+    def status(self, timeout=None):
+        return self.request("GET", "/status", timeout=timeout)
+
+    def submit(self, request):
+        """Start a task, see daemon.DownloadService.submit"""
+        return self.request("POST", "/tasks", request)
+
+    def cancel(self, task_id):
+        return self.request("DELETE", f"/tasks/{task_id}")
+
+    def settings(self):
+        return self.request("GET", "/settings")
+
+    def update_settings(self, **settings):
+        return self.request("PUT", "/settings", settings)
+
+    def listen(self, task_id, callback):
+        """Pass every event of task_id to callback(event), from the stream.
+
+        Listen before submitting the task so no event is missed. When the
+        stream breaks, callback receives {"event": "disconnected"}.
+        """
+        self.start_stream()
+        with self._lock:
+            self._listeners[task_id] = callback
+
+    def unlisten(self, task_id):
+        with self._lock:
+            self._listeners.pop(task_id, None)
+
+    def start_stream(self):
+        """Open the event stream unless it is open; waits until it is"""
+        with self._lock:
+            if self._stream is None or not self._stream.is_alive():
+                self._ready.clear()
+                self._stream = threading.Thread(target=self._read_events, daemon=True)
+                self._stream.start()
+        if not self._ready.wait(self.timeout):
+            raise RuntimeError("The download service does not answer")
+
+    def _read_events(self):
+        req = urllib.request.Request(
+            self.url + "/events", headers={"Authorization": f"Bearer {self.token}"}
+        )
+        try:
+            # The service sends a keep-alive comment every 15 seconds
+            with urllib.request.urlopen(req, timeout=60) as stream:
+                for raw in stream:
+                    if raw.startswith(b"data: "):
+                        self._dispatch(json.loads(raw[6:]))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                listeners = list(self._listeners.values())
+                self._listeners.clear()
+            for callback in listeners:
+                callback({"event": "disconnected"})
+
+    def _dispatch(self, event):
+        if event["event"] == "hello":
+            self._ready.set()
+        elif event["event"] == "bandwidth":
+            self.bandwidth = (event["allocated"], event["actual"])
+        callback = self._listeners.get(event.get("task"))
+        if callback:
+            callback(event)
+
+    def download_playlist(
+        self,
+        playlist_url,
+        folder_name,
+        range_str,
+        kind,
+        quality,
+        reporter,
+        concurrency=4,
+        use_cache=True,
+        connections=1,
+        rate_limit=None,
+        audio_format="native",
+    ):
+        """engine.download_playlist run by the service.
+
+        Blocks until the service is done and returns the same summary;
+        concurrency is the service's own.
+        """
+        events = queue.Queue()
+        task_id = uuid.uuid4().hex
+        self.listen(task_id, events.put)
+        try:
+            self.submit(
+                {
+                    "id": task_id,
+                    "playlist": playlist_url,
+                    "output": os.path.abspath(folder_name),
+                    "range": range_str,
+                    "kind": kind,
+                    "quality": quality,
+                    "use_cache": use_cache,
+                    "connections": connections,
+                    "rate_limit": rate_limit,
+                    "audio_format": audio_format,
+                }
+            )
+            jobs = {}
+            listed = []
+            while True:
+                event = events.get()
+                name = event["event"]
+                if name == "playlist":
+                    info = {"title": event["title"], "playlist_count": event["count"]}
+                    reporter.playlist_loaded(info, listed)
+                elif name in ("job", "progress", "finished"):
+                    job = jobs.get(event["job"])
+                    if job is None:
+                        job = jobs[event["job"]] = DownloadJob(
+                            event["job"], event["url"]
+                        )
+                        listed.append(job)
+                    mirror_event(event, job, reporter)
+                    if name == "job":
+                        reporter.job_updated(job)
+                elif name == "summary":
+                    return {
+                        key: event[key]
+                        for key in ("completed", "failed", "skipped", "total")
+                    }
+                elif name == "error":
+                    raise RuntimeError(event["message"])
+                elif name == "disconnected":
+                    raise RuntimeError("Lost the connection to the download service")
+                else:
+                    mirror_event(event, None, reporter)
+        finally:
+            self.unlisten(task_id)
+
+
+def mirror_event(event, job, reporter):
+    """Apply one event of the service to the local copy of its job"""
+    name = event["event"]
+    if name == "log":
+        reporter.log_message(event["message"])
+    elif name == "status":
+        reporter.set_status(event["message"])
+    elif name == "job":
+        job.url = event["url"]
+        job.title = event["title"] or job.url
+        job.platform = event["platform"] or job.platform
+        job.state = event["state"]
+        job.retries = event["retries"]
+        job.error = event["error"]
+        if job.state in (DownloadJob.PROCESSING, DownloadJob.DONE):
+            job.progress = 100.0
+    elif name == "progress":
+        if event["percent"] is not None:
+            job.progress = event["percent"]
+        d = {
+            "status": "downloading",
+            "filename": event["filename"],
+            "downloaded_bytes": event["downloaded_bytes"],
+            "total_bytes": event["total_bytes"],
+            "speed": event["speed"],
+            "eta": event["eta"],
+        }
+        if event["speed"]:
+            d["_speed_str"] = format_rate(event["speed"])
+        reporter.hook(d, job)
+    elif name == "finished":
+        reporter.hook({"status": "finished", "filename": event["filename"]}, job)
+
+
+class RemoteScheduler:
+    """JobScheduler stand-in that queues every job in the service.
+
+    options() gives the output folder of a job at the moment it is
+    submitted; job states come back as events. Requests to the service
+    are sent in order from one background thread, so a slow or dead
+    service never blocks the caller.
+    """
+
+    def __init__(self, client, reporter, options, on_update=None, on_idle=None):
+        self.client = client
+        self.reporter = reporter
+        self.options = options
+        self.on_update = on_update
+        self.on_idle = on_idle
+        self.jobs = []
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._requests = ThreadPoolExecutor(1, thread_name_prefix="service")
+        self.max_concurrent = client.settings()["concurrency"]
+        client.start_stream()
+
+    def submit(self, job, priority=JobScheduler.NORMAL):
+        task_id = uuid.uuid4().hex
+        with self._lock:
+            job.state = DownloadJob.QUEUED
+            self.jobs.append(job)
+            self._tasks[job] = task_id
+        self._notify(job)
+        names = {value: name for name, value in JobScheduler.PRIORITIES.items()}
+        request = {
+            "id": task_id,
+            "url": job.url,
+            "kind": job.kind,
+            "audio_format": job.audio_format,
+            "rate_limit": job.rate_limit,
+            "priority": names.get(priority, "normal"),
+            "use_cache": job.use_cache,
+            "connections": job.connections,
+        }
+        request.update(self.options())
+        self._requests.submit(self._send, job, task_id, request)
+
+    def _send(self, job, task_id, request):
+        try:
+            self.client.listen(task_id, lambda event: self._event(job, event))
+            self.client.submit(request)
+        except (OSError, RuntimeError) as e:
+            self.client.unlisten(task_id)
+            job.error = f"Download service: {e}"
+            job.state = DownloadJob.FAILED
+            self._ended(job)
+
+    def cancel(self, job):
+        task_id = self._tasks.get(job)
+        if task_id:
+            self._requests.submit(self._request, self.client.cancel, task_id)
+
+    def set_concurrency(self, max_concurrent):
+        """Change the concurrency of the service, for all of its clients"""
+        self.update_settings(concurrency=WorkerPool.clamp(max_concurrent))
+
+    def update_settings(self, **settings):
+        """Change settings of the service in the background"""
+        self._requests.submit(self._request, self._apply_settings, settings)
+
+    def _apply_settings(self, settings):
+        settings = self.client.update_settings(**settings)
+        self.max_concurrent = settings["concurrency"]
+
+    def _request(self, func, *args):
+        try:
+            func(*args)
+        except (OSError, RuntimeError) as e:
+            self.reporter.log_message(f"❌ Download service: {e}")
+
+    def busy(self):
+        with self._lock:
+            return any(job.state not in DownloadJob.FINAL_STATES for job in self.jobs)
+
+    def clear_finished(self):
+        """Forget jobs that are over"""
+        with self._lock:
+            finished = [
+                job for job in self.jobs if job.state in DownloadJob.FINAL_STATES
+            ]
+            self.jobs = [job for job in self.jobs if job not in finished]
+        return finished
+
+    def summary(self):
+        with self._lock:
+            return WorkerPool.summarize(self.jobs)
+
+    def _event(self, job, event):
+        if event["event"] == "disconnected":
+            if job.state not in DownloadJob.FINAL_STATES:
+                job.error = "Lost the connection to the download service"
+                job.state = DownloadJob.FAILED
+                self._ended(job)
+            return
+        if event["event"] in ("summary", "task", "error"):
+            return
+        mirror_event(event, job, self.reporter)
+        if event["event"] != "job":
+            return
+        if job.state in DownloadJob.FINAL_STATES:
+            self._ended(job)
+        else:
+            self._notify(job)
+
+    def _ended(self, job):
+        self.client.unlisten(self._tasks.get(job))
+        self._notify(job)
+        if not self.busy() and self.on_idle:
+            self.on_idle()
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+
+def connect(timeout=1.0):
+    """Client of the running service announced in daemon.json, or None"""
+    try:
+        with open(info_path(), encoding="utf-8") as f:
+            info = json.load(f)
+        client = DaemonClient(info["url"], info["token"])
+        client.status(timeout=timeout)
+    except (OSError, ValueError, KeyError, RuntimeError):
+        return None
+    return client
+
+
+def connect_async(callback):
+    """Run connect() on a daemon thread and pass the result to callback"""
+    thread = threading.Thread(target=lambda: callback(connect()), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,154 @@
+"""Probe and install the external tools downloads rely on.
+
+`yt-dlp --version` and `ffmpeg -version` each start a process, so their
+answers are cached in the data dir keyed by the binary's path and mtime.
+Later launches only run them again after a tool was installed, upgraded
+or moved. Everything here may block and is meant for a background thread.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from importlib import metadata
+
+from . import lazy_import
+from .paths import data_dir
+
+VERSION_COMMANDS = {
+    "yt-dlp": ["--version"],
+    "ffmpeg": ["-version"],
+}
+
+
+def cache_path():
+    return data_dir() / "dependencies.json"
+
+
+def load_cache():
+    try:
+        with open(cache_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    try:
+        with open(cache_path(), "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError:
+        pass
+
+
+def binary_version(name, cache):
+    """Version of executable name, from cache when the binary is unchanged"""
+    path = shutil.which(name)
+    if path is None:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    entry = cache.get(name)
+    if entry and entry.get("path") == path and entry.get("mtime") == mtime:
+        return entry["version"]
+
+    try:
+        result = subprocess.run(
+            [path] + VERSION_COMMANDS[name],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+
+    first_line = result.stdout.strip().splitlines()[0]
+    # "ffmpeg version 6.1.1-3ubuntu5 Copyright ..." -> "6.1.1-3ubuntu5"
+    if first_line.startswith(f"{name} version "):
+        first_line = first_line.split()[2]
+    cache[name] = {"path": path, "mtime": mtime, "version": first_line}
+    return first_line
+
+
+def module_version(distribution):
+    """Installed version of a Python distribution, without importing it"""
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def probe():
+    """Return {"yt-dlp": ..., "yt-dlp module": ..., "ffmpeg": ...} versions.
+
+    A value is None when the tool is missing; downloads work as long as
+    either the yt-dlp module or the yt-dlp executable is available.
+    """
+    cache = load_cache()
+    before = json.dumps(cache, sort_keys=True)
+    found = {
+        "yt-dlp module": module_version("yt-dlp"),
+        "yt-dlp": binary_version("yt-dlp", cache),
+        "ffmpeg": binary_version("ffmpeg", cache),
+    }
+    if json.dumps(cache, sort_keys=True) != before:
+        save_cache(cache)
+    return found
+
+
+def probe_async(callback):
+    """Run probe() on a daemon thread and pass the result to callback"""
+    thread = threading.Thread(target=lambda: callback(probe()), daemon=True)
+    thread.start()
+    return thread
+
+
+def install_ytdlp_async(on_line, on_done):
+    """pip install yt-dlp on a daemon thread.
+
+    on_line receives each line of pip output as it arrives, on_done
+    receives True on success. Both are called from the install thread.
+    """
+
+    def run():
+        cmd = [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "--upgrade",
+            "--progress-bar",
+            "off",
+            "yt-dlp",
+        ]
+        try:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+            )
+            for line in process.stdout:
+                line = line.strip()
+                if line:
+                    on_line(line)
+            success = process.wait() == 0
+        except OSError as e:
+            on_line(str(e))
+            success = False
+        if success:
+            # Let the next load() see the freshly installed module
+            lazy_import.forget("yt_dlp")
+        on_done(success)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import threading
+import time
+
+from . import url_classifier
+from .paths import data_dir
+
+
+class DownloadArchive:
+    """Persistent index of downloaded (extractor, video id, kind) entries.
+
+    The whole index is loaded into a dict on first use so lookups are O(1) and
+    never touch the network. Each entry remembers the output file and its
+    size; an entry whose file is gone or changed size no longer counts.
+    Kind is "video" or "audio" so one mode never hides the other.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path) if path else None
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _entries(self):
+        """The index, loaded from disk on first use"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load()
+            return self._index
+
+    def _load(self):
+        if self.path is None:
+            self.path = str(data_dir() / "archive.sqlite")
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS archive (
+                    extractor TEXT,
+                    video_id TEXT,
+                    kind TEXT,
+                    filepath TEXT,
+                    size INTEGER,
+                    added REAL,
+                    PRIMARY KEY (extractor, video_id, kind)
+                )"""
+            )
+            rows = conn.execute(
+                "SELECT extractor, video_id, kind, filepath, size FROM archive"
+            ).fetchall()
+        return {(e, v, k): (f, s) for e, v, k, f, s in rows}
+
+    @staticmethod
+    def make_key(extractor, video_id, kind):
+        return (str(extractor).lower(), str(video_id), kind)
+
+    def lookup(self, extractor, video_id, kind="video"):
+        """Return the archived file path if it is still on disk, else None"""
+        if not extractor or not video_id:
+            return None
+        entry = self._entries().get(self.make_key(extractor, video_id, kind))
+        if entry is None:
+            return None
+        filepath, size = entry
+        try:
+            if os.path.getsize(filepath) == size:
+                return filepath
+        except OSError:
+            pass
+        return None
+
+    def record(self, extractor, video_id, filepath, kind="video"):
+        """Remember that video_id was downloaded to filepath"""
+        if not extractor or not video_id or not filepath:
+            return
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            return
+        key = self.make_key(extractor, video_id, kind)
+        index = self._entries()
+        with self._lock:
+            index[key] = (filepath, size)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO archive VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, filepath, size, time.time()),
+                )
+
+    def record_info(self, info, kind="video"):
+        """Record a processed yt-dlp info dict"""
+        filepath = info.get("filepath") or info.get("_filename")
+        for download in info.get("requested_downloads") or ():
+            filepath = download.get("filepath") or filepath
+        self.record(info.get("extractor_key"), info.get("id"), filepath, kind)
+
+
+def url_archive_key(url):
+    """Guess (extractor, video id) for url without any network request.
+
+    Short links such as vm.tiktok.com carry no id: they are not looked up
+    here but extracted, and archived under the id yt-dlp reports.
+    """
+    return url_classifier.archive_key(url)
+
+
+# Shared by every window and download path
+default_archive = DownloadArchive()
@@ -0,0 +1,983 @@
+"""Download engine shared by the GUIs and the command line.
+
+Nothing in here may import tkinter: progress and log lines are reported
+through a Reporter, which the windows and the CLI implement.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from contextlib import nullcontext
+
+from . import url_classifier
+from .bandwidth import default_governor
+from .download_archive import default_archive, url_archive_key
+from .journal import FINISHED_STATES, default_journal
+from .lazy_import import yt_dlp
+from .metadata_cache import PLAYLIST_TTL, default_cache, extract_options
+from .metrics import default_metrics
+from .postprocess import default_postprocessors
+from .retry import default_retries
+from .session_pool import default_pool
+from .worker_pool import DownloadJob, WorkerPool
+
+
+class Reporter:
+    """Receives log lines and progress from the engine.
+
+    Every method may be called from a worker thread. The GUIs provide the
+    same methods themselves; the CLI subclasses this. metrics_source labels
+    the stage timings of jobs reported here.
+    """
+
+    metrics_source = "engine"
+
+    def log_message(self, message, tick=False):
+        pass
+
+    def set_status(self, text):
+        pass
+
+    def hook(self, d, job):
+        """yt-dlp style progress dict for job"""
+
+    def job_updated(self, job):
+        pass
+
+    def playlist_loaded(self, info, jobs):
+        pass
+
+    def job_metrics(self, record):
+        """Stage timings of a finished job, see metrics.JobMetrics.record"""
+
+
+def inprocess_available():
+    """True when downloads can run through the imported yt_dlp API"""
+    return yt_dlp() is not None
+
+
+def validate_url(url, platform):
+    """Validate if URL is from the given platform"""
+    return url_classifier.classify(url)[0] == platform
+
+
+def detect_platform(url):
+    """Return the platform a URL belongs to, or None"""
+    return url_classifier.classify(url)[0]
+
+
+def parse_ranges(range_str):
+    """Parse input like '1-3,5,7-' into sorted (start, end) intervals.
+
+    Indices are 1-based and inclusive; an open end ('7-') is None. Adjacent
+    intervals are merged. Reversed, overlapping or malformed parts raise
+    ValueError with a message meant for the user.
+    """
+    intervals = []
+    for part in range_str.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, dash, end = part.partition("-")
+        try:
+            start = int(start)
+            end = (int(end) if end.strip() else None) if dash else start
+        except ValueError:
+            raise ValueError(f"'{part}' is not a number or a range like 3-7")
+        if start < 1:
+            raise ValueError(f"'{part}': videos are numbered from 1")
+        if end is not None and end < start:
+            raise ValueError(f"'{part}' is reversed, did you mean {end}-{start}?")
+        intervals.append((start, end))
+
+    if not intervals:
+        raise ValueError("The range is empty")
+
+    intervals.sort(key=lambda interval: interval[0])
+    merged = [intervals[0]]
+    for start, end in intervals[1:]:
+        last_start, last_end = merged[-1]
+        if last_end is None or start <= last_end:
+            raise ValueError(
+                f"{format_interval(start, end)} overlaps "
+                f"{format_interval(last_start, last_end)}"
+            )
+        if start == last_end + 1:
+            merged[-1] = (last_start, end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def format_interval(start, end):
+    if end == start:
+        return str(start)
+    return f"{start}-{'' if end is None else end}"
+
+
+def remaining_range(range_str, finished):
+    """range_str without the indices in finished, "" when nothing is left"""
+    parts = []
+    for start, end in parse_ranges(range_str):
+        for index in sorted(finished):
+            if index < start or (end is not None and index > end):
+                continue
+            if index > start:
+                parts.append(format_interval(start, index - 1))
+            start = index + 1
+        if end is None or start <= end:
+            parts.append(format_interval(start, end))
+    return ",".join(parts)
+
+
+def progress_percent(d):
+    """Percentage from a yt-dlp progress dict, or None"""
+    total = d.get("total_bytes") or d.get("total_bytes_estimate")
+    if total and d.get("downloaded_bytes") is not None:
+        return d["downloaded_bytes"] * 100 / total
+    match = re.search(r"(\d+(?:\.\d+)?)%", d.get("_percent_str") or "")
+    return float(match.group(1)) if match else None
+
+
+def parse_speed(speed_str):
+    """Bytes per second from yt-dlp speed text such as '1.50MiB/s'"""
+    if not speed_str.endswith("/s"):
+        return 0.0
+    return parse_size(speed_str[:-2])
+
+
+def parse_size(size_str):
+    """Bytes from yt-dlp size text such as '5.00MiB'"""
+    match = re.match(r"(\d+(?:\.\d+)?)([KMG]?)iB$", size_str)
+    if not match:
+        return 0.0
+    scale = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}[match.group(2)]
+    return float(match.group(1)) * scale
+
+
+# yt-dlp executable output of post-processing steps
+POSTPROCESS_LINE = re.compile(
+    r"\[(?:Merger|ExtractAudio|Fixup\w+|Video\w+|Embed\w+|Metadata|MoveFiles)\]"
+)
+
+
+def single_format(platform, kind):
+    """Format selector for a single video from any supported platform"""
+    if kind == "audio":
+        return "bestaudio/best"
+    if platform == "tiktok":
+        return "best[height<=1080]/best"
+    return "best[height<=720]/best"
+
+
+# Audio downloads: "native" keeps the source codec (AAC, Opus, ...) and at
+# most remuxes it into an audio container; "mp3" re-encodes to 192K MP3
+AUDIO_FORMATS = ("native", "mp3")
+
+
+def audio_postprocessor(audio_format="native"):
+    """yt-dlp FFmpegExtractAudio settings for audio_format"""
+    if audio_format == "mp3":
+        return {
+            "key": "FFmpegExtractAudio",
+            "preferredcodec": "mp3",
+            "preferredquality": "192",
+        }
+    # "best" copies the stream; files already in an audio container are
+    # left alone without running ffmpeg at all
+    return {"key": "FFmpegExtractAudio", "preferredcodec": "best"}
+
+
+def audio_args(audio_format="native"):
+    """yt-dlp command line equivalent to audio_postprocessor"""
+    if audio_format == "mp3":
+        return ["--extract-audio", "--audio-format", "mp3", "--audio-quality", "192K"]
+    return ["--extract-audio", "--audio-format", "best"]
+
+
+def needs_audio_postprocessor(audio_format="native"):
+    """False when the downloaded audio is kept as it is.
+
+    Without ffmpeg native audio stays in the container it was served in;
+    MP3 was asked for explicitly, so it still fails loudly.
+    """
+    return audio_format == "mp3" or bool(shutil.which("ffmpeg"))
+
+
+def archive_kind(kind, audio_format="native"):
+    """Kind the download archive files a download under.
+
+    Plain "audio" entries predate the native format and are MP3 files.
+    """
+    if kind == "audio" and audio_format != "mp3":
+        return f"audio-{audio_format}"
+    return kind
+
+
+# Fast transfer: connections per download, as offered by the front ends
+FAST_CONNECTIONS = 8
+MAX_CONNECTIONS = 16
+
+
+def clamp_connections(value):
+    """Connections for fast transfer from user input; 1 turns it off"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(MAX_CONNECTIONS, value))
+
+
+def transfer_options(connections=1):
+    """yt-dlp API options for fast transfer over several connections.
+
+    HLS/DASH fragments are fetched connections at a time and written to the
+    output in order; single-file formats are split into byte ranges with
+    aria2c when it is installed.
+    """
+    if connections <= 1:
+        return {}
+    opts = {"concurrent_fragment_downloads": connections}
+    if shutil.which("aria2c"):
+        opts["external_downloader"] = {"http": "aria2c"}
+        opts["external_downloader_args"] = {"aria2c": aria2c_args(connections)}
+    return opts
+
+
+def transfer_args(connections=1):
+    """yt-dlp command line equivalent to transfer_options"""
+    if connections <= 1:
+        return []
+    args = ["--concurrent-fragments", str(connections)]
+    if shutil.which("aria2c"):
+        args += [
+            "--downloader",
+            "http:aria2c",
+            "--downloader-args",
+            "aria2c:" + " ".join(aria2c_args(connections)),
+        ]
+    return args
+
+
+def aria2c_args(connections):
+    return [
+        f"--max-connection-per-server={connections}",
+        f"--split={connections}",
+        "--min-split-size=1M",
+    ]
+
+
+def video_options(
+    output_template,
+    format_selector,
+    audio=False,
+    connections=1,
+    audio_format="native",
+):
+    """yt-dlp API options for a single video or audio download"""
+    opts = {
+        "outtmpl": output_template,
+        "format": format_selector,
+        "quiet": True,
+        "no_warnings": True,
+        # A watch?v=...&list=... link is one video, not its playlist
+        "noplaylist": True,
+    }
+    opts.update(transfer_options(connections))
+    if audio and needs_audio_postprocessor(audio_format):
+        opts["postprocessors"] = [audio_postprocessor(audio_format)]
+    return opts
+
+
+def subprocess_command(
+    output_template,
+    format_selector,
+    audio=False,
+    connections=1,
+    audio_format="native",
+):
+    """yt-dlp command line equivalent to video_options"""
+    cmd = [
+        "yt-dlp",
+        "--no-warnings",
+        "--newline",
+        "--no-playlist",
+        "-o",
+        output_template,
+        "-f",
+        format_selector,
+    ]
+    if audio and needs_audio_postprocessor(audio_format):
+        cmd.extend(audio_args(audio_format))
+    cmd.extend(transfer_args(connections))
+    return cmd
+
+
+def playlist_options(
+    folder_name,
+    kind,
+    quality,
+    ffmpeg_path=None,
+    connections=1,
+    audio_format="native",
+):
+    """yt-dlp API options shared by every video of a playlist"""
+    opts = {
+        "outtmpl": os.path.join(folder_name, "%(title)s.%(ext)s"),
+        "quiet": True,
+    }
+    opts.update(transfer_options(connections))
+
+    if ffmpeg_path:
+        opts["ffmpeg_location"] = ffmpeg_path
+
+    if kind == "audio":
+        opts["format"] = "bestaudio/best"
+        if ffmpeg_path:
+            opts["postprocessors"] = [audio_postprocessor(audio_format)]
+    else:
+        if ffmpeg_path:
+            opts["format"] = (
+                f"bestvideo[height<={quality}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={quality}]+bestaudio/best[height<={quality}]"
+            )
+        else:
+            opts["format"] = f"best[height<={quality}][ext=mp4]/best"
+    return opts
+
+
+def download_url(
+    ydl,
+    url,
+    use_cache=True,
+    platform=None,
+    archive_kind="video",
+    metrics=None,
+    captured=None,
+):
+    """Extract and download url in one pass, going through the metadata cache.
+
+    Returns the processed info dict; the result is stored in the cache and
+    the finished file is recorded in the download archive. When captured
+    is a list, post-processing is left in it for postprocess_later and the
+    archive is updated once that has run.
+    """
+    options = extract_options(ydl.params)
+    cached = default_cache.get(url, options) if use_cache else None
+    deferring = nullcontext()
+    if captured is not None:
+        deferring = default_postprocessors.deferred(ydl, captured)
+    try:
+        with deferring:
+            if cached:
+                info = ydl.process_ie_result(cached, download=True)
+            else:
+                info = ydl.extract_info(url, download=True)
+    except Exception:
+        # Cached media URLs may have expired
+        if cached:
+            default_cache.invalidate(url, options)
+        raise
+    if not info:
+        raise ValueError("Could not extract video information")
+    if metrics:
+        metrics.enter("finalize")
+    if not cached:
+        default_cache.put(url, ydl.sanitize_info(info), platform, options)
+    if not captured:
+        default_archive.record_info(info, archive_kind)
+    return info
+
+
+def cancel_hook(job):
+    """yt-dlp progress hook that aborts the download once job is cancelled"""
+
+    def hook(d):
+        if job.cancelled:
+            raise yt_dlp().utils.DownloadCancelled("Download cancelled")
+
+    return hook
+
+
+def postprocess_later(job, opts, captured, metrics, reporter):
+    """Hand the captured post-processing of job to the shared pool.
+
+    Returns the Future of the post-processing; the worker pool and the
+    scheduler keep the job in the processing state until it is done.
+    """
+
+    def finished(info):
+        metrics.enter("finalize")
+        default_archive.record_info(info, archive_kind(job.kind, job.audio_format))
+
+    metrics.enter("postprocess_wait")
+    reporter.log_message(f"⚙️ Processing in the background: {job.title}")
+    metrics.pending = default_postprocessors.submit(
+        opts, captured, [metrics.postprocessor_hook], finished
+    )
+    return metrics.pending
+
+
+def download_single(job, output_dir, reporter, use_cache=True, connections=1):
+    """Download one job into output_dir.
+
+    Marks the job as skipped when the archive already has it and raises
+    when the download fails. connections > 1 turns on fast transfer. When
+    ffmpeg has work left after the download, it runs on the shared
+    post-processing pool and its Future is returned.
+    """
+    url = job.url
+    stored_kind = archive_kind(job.kind, job.audio_format)
+
+    with default_metrics.track(job, reporter) as metrics:
+        # Skip everything when the archive already has this video
+        extractor, video_id = url_archive_key(url)
+        existing = default_archive.lookup(extractor, video_id, stored_kind)
+        if existing:
+            job.progress = 100.0
+            job.state = DownloadJob.SKIPPED
+            reporter.log_message(f"⏭️ Already downloaded: {existing}")
+            return
+
+        output_template = os.path.join(str(output_dir), "%(title)s.%(ext)s")
+        format_selector = single_format(job.platform, job.kind)
+        audio = job.kind == "audio"
+
+        def attempt():
+            metrics.enter("extract")
+            try:
+                if inprocess_available():
+                    return download_inprocess()
+                download_executable()
+            except Exception:
+                metrics.enter("backoff")
+                raise
+
+        def download_inprocess():
+            opts = video_options(
+                output_template, format_selector, audio, connections, job.audio_format
+            )
+            captured = [] if default_postprocessors.available(opts) else None
+            limiter = default_governor.register(job.rate_limit)
+            hooks = [
+                lambda d: reporter.hook(d, job),
+                limiter.hook,
+                metrics.hook,
+                default_journal().hook(job),
+                cancel_hook(job),
+            ]
+            try:
+                with default_pool.session(
+                    opts, hooks, [metrics.postprocessor_hook]
+                ) as ydl:
+                    info = download_url(
+                        ydl,
+                        url,
+                        use_cache,
+                        job.platform,
+                        stored_kind,
+                        metrics,
+                        captured,
+                    )
+            finally:
+                default_governor.unregister(limiter)
+            job.title = info.get("title", job.title)
+            if captured:
+                return postprocess_later(job, opts, captured, metrics, reporter)
+
+        def download_executable():
+            cmd = subprocess_command(
+                output_template, format_selector, audio, connections, job.audio_format
+            )
+            # Same cache entries as the in-process engine
+            cache_options = extract_options(
+                video_options(
+                    output_template,
+                    format_selector,
+                    audio,
+                    connections,
+                    job.audio_format,
+                )
+            )
+            limiter = default_governor.register(job.rate_limit, fixed=True)
+            job.error = None
+            try:
+                if not download_subprocess(
+                    job, cmd, reporter, use_cache, limiter, metrics, cache_options
+                ):
+                    raise RuntimeError(
+                        job.error or "Download failed! Check the log for details."
+                    )
+            finally:
+                default_governor.unregister(limiter)
+
+        return default_retries.run(job, attempt, reporter)
+
+
+def download_subprocess(
+    job, cmd, reporter, use_cache=True, limiter=None, metrics=None, cache_options=None
+):
+    """Fallback: run the yt-dlp executable and parse its output.
+
+    cache_options are the extract_options its metadata is cached under.
+    """
+    url = job.url
+
+    # The executable cannot be throttled from here: pass the allocation
+    limit_rate = limiter.limit_rate_arg() if limiter else None
+    if limit_rate:
+        cmd.extend(["--limit-rate", limit_rate])
+
+    # Report what was saved so it can be archived
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", delete=False, encoding="utf-8"
+    ) as f:
+        saved_file = f.name
+    cmd.extend(
+        [
+            "--print-to-file",
+            "after_move:%(extractor_key)s\t%(id)s\t%(filepath)s",
+            saved_file,
+        ]
+    )
+
+    # Skip extraction when fresh metadata is cached
+    cached = default_cache.get(url, cache_options) if use_cache else None
+    info_file = None
+    if cached:
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".info.json", delete=False, encoding="utf-8"
+        ) as f:
+            json.dump(cached, f)
+            info_file = f.name
+        cmd.extend(["--load-info-json", info_file])
+        reporter.log_message("♻️ Using cached video metadata")
+    else:
+        cmd.extend(["--write-info-json", url])
+
+    # Execute command
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        bufsize=1,
+    )
+
+    current_file = ""
+    destination = None
+    journal_hook = default_journal().hook(job)
+
+    for line in process.stdout:
+        if job.cancelled:
+            process.terminate()
+            job.error = "Download cancelled"
+            break
+        line = line.strip()
+        if line:
+            reporter.log_message(line, tick="%" in line and "ETA" in line)
+
+            # Parse progress information
+            if "[download]" in line:
+                if "Destination:" in line:
+                    # Extract filename
+                    destination = line.split("Destination:")[-1].strip()
+                    current_file = os.path.basename(destination)
+                    if metrics:
+                        metrics.enter("first_byte")
+
+                elif "%" in line and "ETA" in line:
+                    progress_match = re.search(r"(\d+(?:\.\d+)?)%", line)
+                    speed_match = re.search(r"(\d+(?:\.\d+)?(?:K|M|G)?iB/s)", line)
+                    size_match = re.search(r"of\s+~?\s*(\d+(?:\.\d+)?[KMG]?iB)", line)
+                    if limiter and speed_match:
+                        limiter.report_speed(parse_speed(speed_match.group(1)))
+                    d = {
+                        "status": "downloading",
+                        "filename": current_file,
+                        "_percent_str": (
+                            progress_match.group(0) if progress_match else ""
+                        ),
+                        "_speed_str": speed_match.group(1) if speed_match else "",
+                    }
+                    if progress_match and size_match:
+                        total = parse_size(size_match.group(1))
+                        d["total_bytes_estimate"] = total
+                        d["downloaded_bytes"] = int(
+                            total * float(progress_match.group(1)) / 100
+                        )
+                    if destination:
+                        d["tmpfilename"] = destination + ".part"
+                    reporter.hook(d, job)
+                    journal_hook(d)
+                    if metrics:
+                        metrics.hook(d)
+
+            elif POSTPROCESS_LINE.match(line):
+                if metrics:
+                    metrics.enter("postprocess")
+
+            elif "Writing video metadata as JSON to:" in line:
+                # Cache the metadata and keep the download folder clean
+                json_path = line.split("JSON to:")[-1].strip()
+                try:
+                    with open(json_path, encoding="utf-8") as f:
+                        default_cache.put(
+                            url, json.load(f), job.platform, cache_options
+                        )
+                    os.remove(json_path)
+                except (OSError, ValueError):
+                    pass
+
+            elif "has already been downloaded" in line:
+                job.progress = 100.0
+                reporter.set_status("Already downloaded! ✅")
+
+            elif "ERROR" in line:
+                job.error = line
+                reporter.set_status("Download failed! ❌")
+                reporter.log_message(f"❌ Error: {line}")
+
+    # Wait for process to complete
+    return_code = process.wait()
+    if metrics:
+        metrics.enter("finalize")
+    if info_file:
+        os.remove(info_file)
+        if return_code != 0:
+            # Cached media URLs may have expired
+            default_cache.invalidate(url, cache_options)
+    with open(saved_file, encoding="utf-8") as f:
+        for saved in f:
+            fields = saved.rstrip("\n").split("\t")
+            if len(fields) == 3:
+                default_archive.record(
+                    *fields, kind=archive_kind(job.kind, job.audio_format)
+                )
+    os.remove(saved_file)
+
+    return return_code == 0
+
+
+def open_playlist(ydl, playlist_url, use_cache=True):
+    """Return (info, entries) for a playlist without listing it up front.
+
+    entries is a list, a yt-dlp PagedList or a generator that fetches pages
+    from the site as it is consumed. A fresh listing from the metadata
+    cache is used when there is one, and a generator read to the end is
+    cached.
+    """
+    flat_options = {"extract_flat": True}
+    cached = default_cache.get(playlist_url, flat_options) if use_cache else None
+    if cached is not None and "entries" in cached:
+        return cached, cached["entries"]
+
+    info = ydl.extract_info(playlist_url, download=False, process=False)
+    # Follow redirects such as a channel URL pointing at its videos tab
+    while info and info.get("_type") in ("url", "url_transparent"):
+        info = ydl.extract_info(
+            info["url"], download=False, process=False, ie_key=info.get("ie_key")
+        )
+    if not info:
+        raise ValueError("Could not extract playlist information")
+
+    if "entries" not in info:
+        # A single video: download it through its page URL
+        entry = {
+            "url": info.get("webpage_url") or playlist_url,
+            "title": info.get("title"),
+            "id": info.get("id"),
+            "ie_key": info.get("extractor_key"),
+        }
+        return info, [entry]
+
+    entries = info["entries"]
+    if isinstance(entries, list) or hasattr(entries, "getslice"):
+        # Sliceable: only the selected pages are ever fetched
+        return info, entries
+
+    def cached_entries():
+        listed = []
+        for entry in entries or ():
+            listed.append(entry)
+            yield entry
+        default_cache.put(
+            playlist_url,
+            ydl.sanitize_info(dict(info, entries=listed)),
+            detect_platform(playlist_url),
+            flat_options,
+            ttl=PLAYLIST_TTL,
+        )
+
+    return info, cached_entries()
+
+
+def iter_selected(entries, intervals, listing, page_size=50):
+    """Yield (index, entry) for the entries inside intervals.
+
+    Lists and PagedList results are sliced so only the pages covering the
+    intervals are fetched; a plain generator is read up to the end of the
+    last interval. listing["short"] is set when the playlist ended before
+    a bounded interval did.
+    """
+    if isinstance(entries, list):
+        for start, end in intervals:
+            chunk = entries[start - 1 : end]
+            yield from enumerate(chunk, start)
+            if end is not None and start + len(chunk) <= end:
+                listing["short"] = True
+                return
+    elif hasattr(entries, "getslice"):
+        # PagedList: fetch one page at a time inside each interval
+        for start, end in intervals:
+            position = start - 1
+            while end is None or position < end:
+                stop = position + page_size
+                if end is not None:
+                    stop = min(stop, end)
+                page = entries.getslice(position, stop)
+                yield from enumerate(page, position + 1)
+                position += len(page)
+                if position < stop:
+                    listing["short"] = end is not None
+                    return
+    else:
+        pending = iter(intervals)
+        start, end = next(pending)
+        for index, entry in enumerate(entries or (), 1):
+            if end is not None and index > end:
+                start, end = next(pending)
+            if index >= start:
+                yield index, entry
+            if end is not None and index == end and intervals[-1] == (start, end):
+                return
+        listing["short"] = end is not None
+
+
+def download_playlist(
+    playlist_url,
+    folder_name,
+    range_str,
+    kind,
+    quality,
+    reporter,
+    concurrency=4,
+    use_cache=True,
+    connections=1,
+    rate_limit=None,
+    audio_format="native",
+    scheduler=None,
+):
+    """Download the selected videos of a playlist and return a summary.
+
+    Videos start downloading while the playlist is still being listed, and
+    only the entries inside the selected range are fetched. The run is
+    journaled until it is over, so an interrupted one can be resumed with
+    resume_range. Given a JobScheduler, the videos are queued there and
+    share its slots instead of running on a pool of concurrency workers.
+    """
+    os.makedirs(folder_name, exist_ok=True)
+
+    intervals = parse_ranges(range_str)
+    platform = detect_platform(playlist_url)
+    run = default_journal().start(
+        "playlist",
+        {
+            "playlist_url": playlist_url,
+            "folder_name": os.path.abspath(folder_name),
+            "range_str": range_str,
+            "kind": kind,
+            "quality": quality,
+            "concurrency": concurrency,
+            "use_cache": use_cache,
+            "connections": connections,
+            "rate_limit": rate_limit,
+            "audio_format": audio_format,
+        },
+        reporter.metrics_source,
+    )
+
+    ffmpeg_path = shutil.which("ffmpeg")
+    stored_kind = archive_kind(kind, audio_format)
+    jobs = []
+    listing = {}
+
+    def selected_jobs(entries):
+        """Yield one job per selected entry as the listing arrives"""
+        for index, entry in iter_selected(entries, intervals, listing):
+            job = DownloadJob(index, None, platform=platform, kind=kind)
+            job.rate_limit = rate_limit
+            job.audio_format = audio_format
+            job.run = run
+            jobs.append(job)
+            if not entry:
+                job.state = DownloadJob.SKIPPED
+                reporter.log_message(f"⚠️ Skipping unavailable video: {index}")
+                default_journal().record(job)
+                yield job
+                continue
+
+            job.url = entry.get("url") or entry.get("webpage_url")
+            job.title = entry.get("title") or job.url
+            if not job.url:
+                job.state = DownloadJob.SKIPPED
+                reporter.log_message(f"⚠️ Could not get URL for video: {index}")
+            elif default_archive.lookup(
+                entry.get("ie_key") or entry.get("extractor_key"),
+                entry.get("id"),
+                stored_kind,
+            ):
+                job.state = DownloadJob.SKIPPED
+                job.progress = 100.0
+                reporter.log_message(f"⏭️ Already downloaded: {job.title}")
+            default_journal().record(job)
+            reporter.job_updated(job)
+            yield job
+
+    # Configure download options shared by every video
+    base_opts = playlist_options(
+        folder_name, kind, quality, ffmpeg_path, connections, audio_format
+    )
+    pipelined = default_postprocessors.available(base_opts)
+
+    def download_job(job):
+        reporter.set_status(f"⬇️ Downloading: {job.title}")
+        reporter.log_message(f"Starting download: {job.title}")
+
+        with default_metrics.track(job, reporter) as metrics:
+
+            def attempt():
+                # Extract and download in a single pass
+                metrics.enter("extract")
+                captured = [] if pipelined else None
+                limiter = default_governor.register(job.rate_limit)
+                hooks = [
+                    lambda d: reporter.hook(d, job),
+                    limiter.hook,
+                    metrics.hook,
+                    default_journal().hook(job),
+                    cancel_hook(job),
+                ]
+                try:
+                    with default_pool.session(
+                        base_opts, hooks, [metrics.postprocessor_hook]
+                    ) as download_ydl:
+                        info = download_url(
+                            download_ydl,
+                            job.url,
+                            use_cache,
+                            platform,
+                            stored_kind,
+                            metrics,
+                            captured,
+                        )
+                except Exception:
+                    metrics.enter("backoff")
+                    raise
+                finally:
+                    default_governor.unregister(limiter)
+                return info, captured
+
+            video_info, captured = default_retries.run(job, attempt, reporter)
+            job.title = video_info.get("title", job.title)
+            if captured:
+                # The next video downloads while ffmpeg works on this one
+                return postprocess_later(job, base_opts, captured, metrics, reporter)
+
+    def job_updated(job):
+        if job.state == DownloadJob.DONE:
+            reporter.log_message(f"✅ Downloaded: {job.title}")
+        elif job.state == DownloadJob.FAILED:
+            reporter.log_message(
+                f"⚠️ Failed to download video {job.index}: {job.error}"
+            )
+        reporter.job_updated(job)
+
+    pool = scheduler or WorkerPool(concurrency)
+    try:
+        with default_pool.session({"quiet": True, "extract_flat": True}) as ydl:
+            info, entries = open_playlist(ydl, playlist_url, use_cache)
+            reporter.log_message(f"Playlist: {info.get('title', 'Untitled Playlist')}")
+            if info.get("playlist_count"):
+                reporter.log_message(f"Total videos: {info['playlist_count']}")
+            reporter.playlist_loaded(info, jobs)
+
+            # Download on a bounded worker pool while the listing continues
+            reporter.log_message(f"Parallel downloads: {pool.max_workers}")
+            if connections > 1:
+                reporter.log_message(f"⚡ Fast transfer: {connections} connections")
+            if pipelined:
+                reporter.log_message(
+                    f"⚙️ ffmpeg runs alongside the downloads, up to "
+                    f"{default_postprocessors.max_workers} at a time"
+                )
+            summary = pool.run(
+                selected_jobs(entries),
+                download_job,
+                default_journal().track(job_updated),
+            )
+    except Exception:
+        # A run that failed as a whole is not offered for resuming; an
+        # interrupted one (killed, Ctrl+C) stays open
+        default_journal().close(run)
+        raise
+    default_journal().close(run)
+
+    if not jobs:
+        raise ValueError("No videos found in the selected range")
+    if listing.get("short"):
+        reporter.log_message(
+            "⚠️ The playlist ended before the selected range; "
+            "indices past the end were skipped"
+        )
+    reporter.log_message(default_cache.stats())
+
+    reporter.log_message(
+        f"📋 Summary: {summary['completed']} completed, "
+        f"{summary['failed']} failed, {summary['skipped']} skipped"
+    )
+    return summary
+
+
+def resume_jobs(run, reporter=None):
+    """Fresh jobs for what a journaled run of single videos left undone.
+
+    Downloads that had started continue from their .part file: the output
+    name is the same, and yt-dlp resumes partial files by default.
+    """
+    jobs = []
+    for item in run["items"]:
+        if item["state"] in FINISHED_STATES:
+            continue
+        job = DownloadJob(
+            item["item"], item["url"], item["title"], item["platform"], item["kind"]
+        )
+        job.audio_format = item["audio_format"] or "native"
+        job.rate_limit = item["rate_limit"]
+        if reporter:
+            report_partial(item, reporter)
+        jobs.append(job)
+    return jobs
+
+
+def resume_range(run, reporter=None):
+    """The part of a journaled playlist run's range still to download"""
+    finished = set()
+    for item in run["items"]:
+        if item["state"] in FINISHED_STATES:
+            finished.add(item["item"])
+        elif reporter:
+            report_partial(item, reporter)
+    return remaining_range(run["options"]["range_str"], finished)
+
+
+def report_partial(item, reporter):
+    try:
+        size = os.path.getsize(item["partial"])
+    except (OSError, TypeError):
+        return
+    reporter.log_message(
+        f"↩️ Continuing {item['title']} from {size / 1024**2:.1f} MiB on disk"
+    )
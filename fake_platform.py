@@ -0,0 +1,171 @@
+"""Local stand-in for a video platform, used by the offline benchmarks.
+
+Serves synthetic videos as progressive MP4 files or HLS fragments, plus a
+paged playlist API, with a configurable latency per request and bandwidth
+per connection. The matching yt-dlp extractor lives in
+bench/yt_dlp_plugins/extractor/smd_fake.py.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# Put this on sys.path (PYTHONPATH) so yt-dlp finds the extractor plugin
+PLUGIN_DIR = Path(__file__).resolve().parent / "bench"
+
+PAGE_SIZE = 50
+
+
+class FakePlatformHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        config = self.config
+        time.sleep(config["latency"])
+        parts = urlsplit(self.path)
+        path = parts.path
+
+        match = re.fullmatch(r"/smdfake/api/video/([\w-]+)\.json", path)
+        if match:
+            return self.send_json(self.video_metadata(match.group(1)))
+
+        match = re.fullmatch(r"/smdfake/api/playlist/([\w-]+)\.json", path)
+        if match:
+            page = int(parse_qs(parts.query).get("page", ["0"])[0])
+            start = page * PAGE_SIZE
+            end = min(start + PAGE_SIZE, config["items"])
+            entries = [
+                {
+                    "id": f"v{i}",
+                    "title": f"Video {i}",
+                    "url": f"{self.base_url()}/smdfake/video/v{i}",
+                }
+                for i in range(start + 1, end + 1)
+            ]
+            return self.send_json(
+                {
+                    "title": "Fake playlist",
+                    "entries": entries,
+                    "more": end < config["items"],
+                }
+            )
+
+        match = re.fullmatch(r"/media/([\w-]+)\.mp4", path)
+        if match:
+            return self.send_media(config["payload"], "video/mp4", ranges=True)
+
+        match = re.fullmatch(r"/media/([\w-]+)/index\.m3u8", path)
+        if match:
+            lines = [
+                "#EXTM3U",
+                "#EXT-X-VERSION:3",
+                "#EXT-X-TARGETDURATION:2",
+                "#EXT-X-MEDIA-SEQUENCE:0",
+            ]
+            for i in range(self.segment_count()):
+                lines += ["#EXTINF:2.0,", f"seg{i}.ts"]
+            lines.append("#EXT-X-ENDLIST")
+            body = "\n".join(lines).encode()
+            return self.send_media(body, "application/vnd.apple.mpegurl")
+
+        match = re.fullmatch(r"/media/([\w-]+)/seg(\d+)\.ts", path)
+        if match:
+            size = config["segment_size"]
+            start = int(match.group(2)) * size
+            return self.send_media(
+                config["payload"][start : start + size], "video/mp2t"
+            )
+
+        self.send_error(404)
+
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def segment_count(self):
+        size = self.config["segment_size"]
+        return -(-len(self.config["payload"]) // size)
+
+    def video_metadata(self, video_id):
+        base = self.base_url()
+        if self.config["mode"] == "hls":
+            media = {"protocol": "m3u8", "url": f"{base}/media/{video_id}/index.m3u8"}
+        else:
+            media = {
+                "protocol": "https",
+                "url": f"{base}/media/{video_id}.mp4",
+                "filesize": len(self.config["payload"]),
+            }
+        return {"id": video_id, "title": f"Video {video_id}", "height": 720, **media}
+
+    def send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_media(self, body, content_type, ranges=False):
+        status = 200
+        headers = []
+        if ranges:
+            headers.append(("Accept-Ranges", "bytes"))
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if match:
+                start = int(match.group(1))
+                end = int(match.group(2)) if match.group(2) else len(body) - 1
+                headers.append(("Content-Range", f"bytes {start}-{end}/{len(body)}"))
+                body = body[start : end + 1]
+                status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+        # Pace the body to the per-connection bandwidth
+        rate = self.config["rate"]
+        chunk = 64 * 1024
+        view = memoryview(body)
+        for start in range(0, len(body), chunk):
+            self.wfile.write(view[start : start + chunk])
+            if rate:
+                time.sleep(len(view[start : start + chunk]) / rate)
+
+
+def start_server(
+    items=20,
+    item_size=4 * 1024 * 1024,
+    mode="progressive",
+    latency=0.02,
+    rate=None,
+    segment_size=512 * 1024,
+):
+    """Start the fake platform on a free localhost port; returns the server.
+
+    rate is bytes per second per connection (None = unthrottled), latency
+    is added to every request in seconds.
+    """
+    config = {
+        "items": items,
+        "payload": bytes(range(256)) * (item_size // 256),
+        "mode": mode,
+        "latency": latency,
+        "rate": rate,
+        "segment_size": segment_size,
+    }
+    handler = type("Handler", (FakePlatformHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    return server
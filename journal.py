@@ -0,0 +1,205 @@
+import json
+import sqlite3
+import threading
+import time
+
+from .paths import data_dir
+from .worker_pool import DownloadJob
+
+# Item states that need no further work after a restart
+FINISHED_STATES = (DownloadJob.DONE, DownloadJob.SKIPPED, DownloadJob.CANCELLED)
+
+# Closed runs are forgotten after a week
+KEEP_CLOSED = 7 * 24 * 3600
+
+
+class JobJournal:
+    """Append-only log of download runs that survives a crash.
+
+    A run is one batch of single videos or one playlist download, started
+    with the options needed to start it again. Every state change of its
+    jobs appends a snapshot row, including the .part file being written,
+    so after the app was closed or crashed unfinished() tells what is left.
+    The database is in WAL mode: an append costs one small write and never
+    blocks readers. Journaling errors are ignored; they must not stop a
+    download.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or data_dir() / "journal.sqlite")
+        self._lock = threading.Lock()
+        self._partials = {}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT,
+                    source TEXT,
+                    options TEXT,
+                    started REAL
+                )""")
+            # item is the job index, NULL for the event closing the run
+            conn.execute("""CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run INTEGER,
+                    item INTEGER,
+                    state TEXT,
+                    url TEXT,
+                    title TEXT,
+                    platform TEXT,
+                    kind TEXT,
+                    audio_format TEXT,
+                    rate_limit REAL,
+                    partial TEXT,
+                    error TEXT,
+                    time REAL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS events_run ON events (run, item)")
+            self._prune(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Durable across an app crash; only a power cut may lose the tail
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _prune(self, conn):
+        cutoff = time.time() - KEEP_CLOSED
+        conn.execute(
+            "DELETE FROM events WHERE run IN "
+            "(SELECT run FROM events WHERE item IS NULL AND time < ?)",
+            (cutoff,),
+        )
+        conn.execute(
+            "DELETE FROM runs WHERE started < ? AND id NOT IN "
+            "(SELECT run FROM events)",
+            (cutoff,),
+        )
+
+    def start(self, kind, options, source=None):
+        """Open a run of kind "single" or "playlist" and return its id"""
+        try:
+            with self._lock, self._connect() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (kind, source, options, started) "
+                    "VALUES (?, ?, ?, ?)",
+                    (kind, source, json.dumps(options, default=str), time.time()),
+                )
+                return cursor.lastrowid
+        except sqlite3.Error:
+            return None
+
+    def record(self, job):
+        """Append the current state of job to its run"""
+        if job.run is None:
+            return
+        partial = self._partials.get((job.run, job.index))
+        if job.state in DownloadJob.FINAL_STATES:
+            self._partials.pop((job.run, job.index), None)
+        self._append(
+            (
+                job.run,
+                job.index,
+                job.state,
+                job.url,
+                job.title,
+                job.platform,
+                job.kind,
+                job.audio_format,
+                job.rate_limit,
+                partial,
+                job.error,
+                time.time(),
+            )
+        )
+
+    def hook(self, job):
+        """yt-dlp progress hook recording the partial file of job"""
+
+        def hook(d):
+            if job.run is None or d["status"] != "downloading":
+                return
+            partial = d.get("tmpfilename") or d.get("filename")
+            key = (job.run, job.index)
+            if partial and self._partials.get(key) != partial:
+                self._partials[key] = partial
+                self.record(job)
+
+        return hook
+
+    def track(self, on_update=None):
+        """Wrap a worker pool on_update callback to journal every change"""
+
+        def updated(job):
+            self.record(job)
+            if on_update:
+                on_update(job)
+
+        return updated
+
+    def close(self, run):
+        """Mark run as finished: it is not offered for resuming any more"""
+        if run is None:
+            return
+        self._append((run, None, "closed", *[None] * 8, time.time()))
+
+    def _append(self, row):
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO events (run, item, state, url, title, platform, "
+                    "kind, audio_format, rate_limit, partial, error, time) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+        except sqlite3.Error:
+            pass
+
+    def unfinished(self, sources=None):
+        """Runs that were never closed, oldest first.
+
+        Each run is a dict with id, kind, source, options, started and
+        items: the last recorded snapshot of every job, as dicts, in index
+        order. sources limits the result to runs started from those front
+        ends.
+        """
+        try:
+            with self._lock, self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                rows = conn.execute(
+                    "SELECT * FROM runs WHERE id NOT IN "
+                    "(SELECT run FROM events WHERE item IS NULL) ORDER BY id"
+                ).fetchall()
+                runs = []
+                for row in rows:
+                    if sources is not None and row["source"] not in sources:
+                        continue
+                    items = conn.execute(
+                        "SELECT * FROM events WHERE seq IN (SELECT MAX(seq) "
+                        "FROM events WHERE run = ? AND item IS NOT NULL "
+                        "GROUP BY item) ORDER BY item",
+                        (row["id"],),
+                    ).fetchall()
+                    run = dict(row)
+                    run["options"] = json.loads(row["options"])
+                    run["items"] = [dict(item) for item in items]
+                    runs.append(run)
+        except sqlite3.Error:
+            return []
+        return runs
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_journal():
+    """The journal shared by every window and download path.
+
+    It is opened on first use, so importing this module touches no file.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = JobJournal()
+        return _default
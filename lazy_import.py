@@ -0,0 +1,48 @@
+"""Heavy dependencies, imported on first use.
+
+Importing yt_dlp loads its extractor registry, which takes longer than
+drawing a window, so no module imports it at the top level. Code that needs
+it calls yt_dlp(); the GUIs call warm_up() once their window is on screen
+so the import has usually finished before the first download starts.
+"""
+
+import importlib
+import threading
+
+_modules = {}
+_lock = threading.Lock()
+
+
+def load(name):
+    """Import module name once; None when it is not installed"""
+    with _lock:
+        if name not in _modules:
+            try:
+                _modules[name] = importlib.import_module(name)
+            except ImportError:
+                _modules[name] = None
+        return _modules[name]
+
+
+def forget(name):
+    """Drop the cached result for name so the next load() tries again"""
+    with _lock:
+        _modules.pop(name, None)
+    importlib.invalidate_caches()
+
+
+def yt_dlp():
+    """The yt_dlp module, or None when only the executable is installed"""
+    return load("yt_dlp")
+
+
+def warm_up(*names):
+    """Import names (default: yt_dlp) on a daemon thread"""
+
+    def run():
+        for name in names or ("yt_dlp",):
+            load(name)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,354 @@
+"""Work queues shared by several download nodes.
+
+Items are handed out under a lease: the node that claimed one renews it
+while it works (the heartbeat) and completes it at the end. A node that
+dies stops renewing, its lease expires and the item goes to the next node
+that asks. Every claim gets a fresh token, so a node that lost its lease
+can neither renew nor complete the item any more.
+
+Backends are picked by open_queue from a spec such as "sqlite:/mnt/q.db"
+and can be added to BACKENDS.
+"""
+
+import hashlib
+import itertools
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from .metadata_cache import normalize_url
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Leases that may expire on one item before it counts as failed: an item
+# that keeps killing its node must not take every node down in turn
+MAX_ATTEMPTS = 3
+
+
+def item_key(url, options):
+    """Identity of an item: adding the same URL and options again is a no-op"""
+    data = json.dumps([normalize_url(url), options], sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class LeaseQueue(ABC):
+    """Interface of the queue backends.
+
+    Items are dicts with id, url, options, attempts and, once claimed,
+    the token of the lease.
+    """
+
+    @abstractmethod
+    def add(self, items):
+        """Queue {"url", "options"} dicts; returns how many were new"""
+
+    @abstractmethod
+    def claim(self, node, lease):
+        """Lease the next pending or expired item for lease seconds, or None"""
+
+    @abstractmethod
+    def renew(self, item_id, token, lease):
+        """Extend a lease; False when it was lost.
+
+        A lease past its expiry is still held until another node claims it.
+        """
+
+    @abstractmethod
+    def complete(self, item_id, token, state, error=None):
+        """End a lease with DONE or FAILED; False when it was lost"""
+
+    @abstractmethod
+    def retry_failed(self):
+        """Make failed items pending again; returns how many"""
+
+    @abstractmethod
+    def counts(self):
+        """Number of items per state"""
+
+    @abstractmethod
+    def failures(self, limit=100):
+        """(url, error) of failed items"""
+
+
+class SQLiteLeaseQueue(LeaseQueue):
+    """Queue in a SQLite file that every node can open, e.g. on NFS or SMB.
+
+    Claims run in an IMMEDIATE transaction, so two nodes never lease the
+    same item. The rollback journal is kept: WAL needs shared memory that
+    network file systems do not provide. Lease expiry compares wall clock
+    times of different nodes, which should be kept in sync (NTP).
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT UNIQUE,
+                    url TEXT,
+                    options TEXT,
+                    state TEXT,
+                    owner TEXT,
+                    token TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER,
+                    error TEXT,
+                    updated REAL
+                )""")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60)
+
+    def add(self, items):
+        now = time.time()
+        rows = [
+            (
+                item_key(item["url"], item["options"]),
+                item["url"],
+                json.dumps(item["options"], sort_keys=True),
+                PENDING,
+                0,
+                now,
+            )
+            for item in items
+        ]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO items "
+                "(key, url, options, state, attempts, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return conn.total_changes - before
+
+    def claim(self, node, lease):
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT id, url, options, state, attempts FROM items "
+                    "WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                    "ORDER BY id LIMIT 1",
+                    (PENDING, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                item_id, url, options, state, attempts = row
+                if state == LEASED and attempts >= MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE items SET state = ?, owner = NULL, token = NULL, "
+                        "error = ?, updated = ? WHERE id = ?",
+                        (FAILED, f"Lease expired {attempts} times", now, item_id),
+                    )
+                    continue
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE items SET state = ?, owner = ?, token = ?, "
+                    "lease_expires = ?, attempts = attempts + 1, updated = ? "
+                    "WHERE id = ?",
+                    (LEASED, node, token, now + lease, now, item_id),
+                )
+                conn.execute("COMMIT")
+                return {
+                    "id": item_id,
+                    "url": url,
+                    "options": json.loads(options),
+                    "attempts": attempts + 1,
+                    "token": token,
+                }
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def renew(self, item_id, token, lease):
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET lease_expires = ?, updated = ? "
+                "WHERE id = ? AND token = ? AND state = ?",
+                (now + lease, now, item_id, token, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, item_id, token, state, error=None):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET state = ?, token = NULL, error = ?, updated = ? "
+                "WHERE id = ? AND token = ? AND state = ?",
+                (state, error, time.time(), item_id, token, LEASED),
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE items SET state = ?, attempts = 0, error = NULL, "
+                "updated = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED),
+            )
+            return cursor.rowcount
+
+    def counts(self):
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT CASE WHEN state = ? AND lease_expires < ? THEN 'expired' "
+                "ELSE state END, COUNT(*) FROM items GROUP BY 1",
+                (LEASED, now),
+            ).fetchall()
+        return dict(rows)
+
+    def failures(self, limit=100):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT url, error FROM items WHERE state = ? ORDER BY id LIMIT ?",
+                (FAILED, limit),
+            ).fetchall()
+
+
+class MemoryLeaseQueue(LeaseQueue):
+    """In-process stand-in with the same semantics, for tests.
+
+    Every node has to run in the same process, e.g. as threads; the queue
+    is gone when the process exits.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self._keys = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, items):
+        added = 0
+        with self._lock:
+            for item in items:
+                key = item_key(item["url"], item["options"])
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                item_id = next(self._ids)
+                self.items[item_id] = {
+                    "id": item_id,
+                    "url": item["url"],
+                    "options": json.loads(json.dumps(item["options"])),
+                    "state": PENDING,
+                    "owner": None,
+                    "token": None,
+                    "lease_expires": 0.0,
+                    "attempts": 0,
+                    "error": None,
+                }
+                added += 1
+        return added
+
+    def claim(self, node, lease):
+        with self._lock:
+            now = time.time()
+            for item in self.items.values():
+                expired = item["state"] == LEASED and item["lease_expires"] < now
+                if item["state"] != PENDING and not expired:
+                    continue
+                if expired and item["attempts"] >= MAX_ATTEMPTS:
+                    item.update(
+                        state=FAILED,
+                        owner=None,
+                        token=None,
+                        error=f"Lease expired {item['attempts']} times",
+                    )
+                    continue
+                item.update(
+                    state=LEASED,
+                    owner=node,
+                    token=uuid.uuid4().hex,
+                    lease_expires=now + lease,
+                    attempts=item["attempts"] + 1,
+                )
+                return {
+                    key: item[key]
+                    for key in ("id", "url", "options", "attempts", "token")
+                }
+        return None
+
+    def _leased(self, item_id, token):
+        item = self.items.get(item_id)
+        if item and item["state"] == LEASED and item["token"] == token:
+            return item
+        return None
+
+    def renew(self, item_id, token, lease):
+        with self._lock:
+            item = self._leased(item_id, token)
+            if item is None:
+                return False
+            item["lease_expires"] = time.time() + lease
+            return True
+
+    def complete(self, item_id, token, state, error=None):
+        with self._lock:
+            item = self._leased(item_id, token)
+            if item is None:
+                return False
+            item.update(state=state, token=None, error=error)
+            return True
+
+    def retry_failed(self):
+        with self._lock:
+            failed = [item for item in self.items.values() if item["state"] == FAILED]
+            for item in failed:
+                item.update(state=PENDING, attempts=0, error=None)
+            return len(failed)
+
+    def counts(self):
+        counts = {}
+        now = time.time()
+        with self._lock:
+            for item in self.items.values():
+                state = item["state"]
+                if state == LEASED and item["lease_expires"] < now:
+                    state = "expired"
+                counts[state] = counts.get(state, 0) + 1
+        return counts
+
+    def failures(self, limit=100):
+        with self._lock:
+            return [
+                (item["url"], item["error"])
+                for item in self.items.values()
+                if item["state"] == FAILED
+            ][:limit]
+
+
+# Queue spec scheme -> factory taking the rest of the spec. "memory" is
+# in-process only: python -m Code.batch refuses it
+BACKENDS = {
+    "sqlite": SQLiteLeaseQueue,
+    "memory": lambda rest: MemoryLeaseQueue(),
+}
+
+
+def open_queue(spec):
+    """Queue for a spec like "sqlite:/shared/queue.db"; a bare path is SQLite"""
+    scheme, colon, rest = spec.partition(":")
+    if colon and scheme in BACKENDS:
+        return BACKENDS[scheme](rest)
+    if colon and len(scheme) > 1 and scheme.isalpha():
+        raise ValueError(f"Unknown queue backend '{scheme}'")
+    return SQLiteLeaseQueue(spec)
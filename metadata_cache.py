@@ -0,0 +1,186 @@
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .paths import data_dir
+
+# Seconds a cached info dict stays valid. Full info dicts carry signed media
+# URLs that expire quickly, flat playlist listings change slowly.
+PLATFORM_TTL = {
+    "youtube": 3 * 3600,
+    "facebook": 30 * 60,
+    "instagram": 30 * 60,
+    "tiktok": 30 * 60,
+}
+PLAYLIST_TTL = 6 * 3600
+DEFAULT_TTL = 30 * 60
+
+# Bulky fields that are never needed to resume a download
+TRIMMED_KEYS = (
+    "automatic_captions",
+    "subtitles",
+    "requested_subtitles",
+    "thumbnails",
+    "heatmap",
+    "comments",
+    "description",
+    "requested_downloads",
+    "requested_formats",
+    "_filename",
+    "filepath",
+)
+ENTRY_KEYS = ("_type", "ie_key", "id", "url", "webpage_url", "title", "duration")
+
+TRACKING_PARAMS = ("si", "feature", "fbclid", "igshid", "igsh", "is_from_webapp")
+
+# yt-dlp options that change the info dict of a URL; entries extracted
+# under different values are cached apart
+EXTRACT_OPTIONS = (
+    "format",
+    "noplaylist",
+    "extract_flat",
+    "extractor_args",
+    "cookiefile",
+    "cookiesfrombrowser",
+)
+
+
+def normalize_url(url):
+    """Canonical form of a URL used as cache key"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query)
+        if k not in TRACKING_PARAMS and not k.startswith("utm_")
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), "")
+    )
+
+
+def extract_options(params):
+    """The options of a yt-dlp options dict that take part in cache keys"""
+    return {k: params[k] for k in EXTRACT_OPTIONS if params.get(k) is not None}
+
+
+def trim_info(info):
+    """Drop bulky fields from an info dict before caching it"""
+    trimmed = {k: v for k, v in info.items() if k not in TRIMMED_KEYS}
+    entries = trimmed.get("entries")
+    if entries is not None:
+        trimmed["entries"] = [
+            {k: v for k, v in entry.items() if k in ENTRY_KEYS} if entry else None
+            for entry in entries
+        ]
+    return trimmed
+
+
+class MetadataCache:
+    """On-disk cache of extract_info results with TTL and LRU eviction.
+
+    The database (and the data dir) is only created on first use.
+    """
+
+    def __init__(self, path=None, max_bytes=64 * 1024 * 1024, enabled=True):
+        self.path = str(path) if path else None
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._created = False
+
+    def _connect(self):
+        if self.path is None:
+            self.path = str(data_dir() / "metadata.sqlite")
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._created:
+            with conn:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS info (
+                        key TEXT PRIMARY KEY,
+                        platform TEXT,
+                        data TEXT,
+                        size INTEGER,
+                        expires REAL,
+                        last_access REAL
+                    )"""
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS info_last_access ON info (last_access)"
+                )
+            self._created = True
+        return conn
+
+    @staticmethod
+    def make_key(url, options=None):
+        """Cache key built from the normalized URL and extract_options"""
+        return json.dumps([normalize_url(url), options or {}], sort_keys=True)
+
+    def get(self, url, options=None):
+        """Return the cached info dict for url, or None"""
+        if not self.enabled:
+            return None
+        key = self.make_key(url, options)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT data, expires FROM info WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    conn.execute("DELETE FROM info WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE info SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, url, info, platform=None, options=None, ttl=None):
+        """Store a trimmed copy of info and evict least recently used rows"""
+        if not self.enabled or not info:
+            return
+        if ttl is None:
+            ttl = PLATFORM_TTL.get(platform, DEFAULT_TTL)
+        data = json.dumps(trim_info(info), default=str)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO info VALUES (?, ?, ?, ?, ?, ?)",
+                (self.make_key(url, options), platform, data, len(data), now + ttl, now),
+            )
+            self._evict(conn)
+
+    def invalidate(self, url, options=None):
+        """Forget the cached entry for url"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "DELETE FROM info WHERE key = ?", (self.make_key(url, options),)
+            )
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM info WHERE expires < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM info ORDER BY last_access")
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM info WHERE key = ?", doomed)
+
+    def stats(self):
+        """Human readable hit/miss counters"""
+        return f"Metadata cache: {self.hits} hit(s), {self.misses} miss(es)"
+
+
+# Shared by every window and download path
+default_cache = MetadataCache()
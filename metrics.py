@@ -0,0 +1,284 @@
+"""Per-job stage timings, exported as JSON lines and a Prometheus textfile.
+
+Every job run by the engine is timed through the stages below, whichever
+front end started it, and one record per job is appended to
+metrics.jsonl. Totals over that file are written to metrics.prom in the
+Prometheus text format, ready for the node exporter textfile collector.
+Both paths can be moved with SMD_METRICS_FILE and SMD_METRICS_TEXTFILE.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .paths import data_dir
+from .session_pool import DOWNLOAD_START
+
+# probe: archive and cache lookups before anything is requested
+# extract: metadata extraction up to the first download request
+# first_byte: from the download request to the first byte received
+# transfer: receiving the media
+# postprocess_wait: waiting for a free slot on the post-processing pool
+# postprocess: merging, transcoding and fixups by ffmpeg
+# finalize: recording the result in the archive and cache
+# backoff: waiting before a retry
+STAGES = (
+    "probe",
+    "extract",
+    "first_byte",
+    "transfer",
+    "postprocess_wait",
+    "postprocess",
+    "finalize",
+    "backoff",
+)
+
+SCHEMA_VERSION = 1
+
+
+class JobMetrics:
+    """Stage timer of one job; hook and postprocessor_hook follow yt-dlp"""
+
+    def __init__(self, job, source):
+        self.job = job
+        self.source = source
+        self.started = time.time()
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.stage = None
+        self._since = time.monotonic()
+        self._start = self._since
+        self._file_bytes = {}
+        self._lock = threading.Lock()
+        # Future of post-processing still running after the download
+        self.pending = None
+        self.enter("probe")
+
+    def enter(self, stage):
+        """Close the current stage and start stage (None stops the clock)"""
+        with self._lock:
+            self._enter(stage)
+
+    def _enter(self, stage):
+        now = time.monotonic()
+        if self.stage:
+            self.stages[self.stage] += now - self._since
+        self.stage = stage
+        self._since = now
+
+    def hook(self, d):
+        """yt-dlp progress hook"""
+        # Fragment downloads report their .part file only while downloading
+        name = d.get("filename")
+        with self._lock:
+            if d.get("status") == "downloading":
+                downloaded = d.get("downloaded_bytes") or 0
+                self._file_bytes[name] = max(self._file_bytes.get(name, 0), downloaded)
+                if self.stage not in ("first_byte", "transfer"):
+                    self._enter("first_byte")
+                if downloaded and self.stage == "first_byte":
+                    self._enter("transfer")
+            elif d.get("status") == "finished":
+                total = d.get("total_bytes") or d.get("downloaded_bytes")
+                if total:
+                    self._file_bytes[name] = total
+
+    def postprocessor_hook(self, d):
+        """yt-dlp postprocessor hook"""
+        if d.get("status") != "started":
+            return
+        if d.get("postprocessor") == DOWNLOAD_START:
+            self.enter("first_byte")
+        else:
+            self.enter("postprocess")
+
+    @property
+    def bytes(self):
+        return sum(self._file_bytes.values())
+
+    def record(self, state, error=None):
+        """The finished job as a JSON-ready dict"""
+        self.enter(None)
+        job = self.job
+        return {
+            "schema": SCHEMA_VERSION,
+            "source": self.source,
+            "job": job.index,
+            "url": job.url,
+            "title": job.title,
+            "platform": job.platform,
+            "kind": job.kind,
+            "state": state,
+            "error": error,
+            "started": round(self.started, 3),
+            "seconds": round(time.monotonic() - self._start, 3),
+            "stages": {stage: round(value, 3) for stage, value in self.stages.items()},
+            "bytes": self.bytes,
+            "retries": job.retries,
+        }
+
+
+class MetricsRecorder:
+    """Append job records to the JSONL file and keep the textfile current.
+
+    The textfile totals are folded from the JSONL file itself, so windows
+    and command line runs writing to the same file add up instead of
+    overwriting each other.
+    """
+
+    def __init__(self, jsonl_path=None, textfile_path=None):
+        self.jsonl_path = jsonl_path
+        self.textfile_path = textfile_path
+        self._offset = 0
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def configure(self, jsonl_path=None, textfile_path=None):
+        """Change where records and totals are written"""
+        with self._lock:
+            if jsonl_path:
+                self.jsonl_path = jsonl_path
+                self._offset = 0
+                self._totals = {}
+            if textfile_path:
+                self.textfile_path = textfile_path
+
+    def _paths(self):
+        jsonl = self.jsonl_path or os.environ.get("SMD_METRICS_FILE")
+        textfile = self.textfile_path or os.environ.get("SMD_METRICS_TEXTFILE")
+        if not jsonl or not textfile:
+            folder = data_dir()
+            jsonl = jsonl or folder / "metrics.jsonl"
+            textfile = textfile or folder / "metrics.prom"
+        return jsonl, textfile
+
+    @contextmanager
+    def track(self, job, reporter):
+        """Time job for the duration of the block and record the outcome.
+
+        When the block leaves metrics.pending set, the record is written once
+        that Future is done instead.
+
+        The source label comes from reporter.metrics_source. The record is
+        also passed to reporter.job_metrics when the reporter has it.
+        """
+        metrics = JobMetrics(job, getattr(reporter, "metrics_source", "engine"))
+        try:
+            yield metrics
+        except Exception as e:
+            self.finish(metrics, reporter, job.FAILED, str(e))
+            raise
+        if metrics.pending is None:
+            state = job.SKIPPED if job.state == job.SKIPPED else job.DONE
+            self.finish(metrics, reporter, state)
+            return
+
+        def processed(future):
+            error = future.exception()
+            if error:
+                self.finish(metrics, reporter, job.FAILED, str(error))
+            else:
+                self.finish(metrics, reporter, job.DONE)
+
+        metrics.pending.add_done_callback(processed)
+
+    def finish(self, metrics, reporter, state, error=None):
+        record = metrics.record(state, error)
+        self.write(record)
+        job_metrics = getattr(reporter, "job_metrics", None)
+        if job_metrics:
+            job_metrics(record)
+
+    def write(self, record):
+        line = json.dumps(
+            dict(record, event="metrics", time=round(time.time(), 3)),
+            ensure_ascii=False,
+        )
+        with self._lock:
+            jsonl, textfile = self._paths()
+            try:
+                with open(jsonl, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                self._fold(jsonl)
+                self._write_textfile(textfile)
+            except OSError:
+                # Metrics must never break a download
+                pass
+
+    def _fold(self, jsonl):
+        """Add the records appended since the last call to the totals"""
+        with open(jsonl, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("event") != "metrics":
+                continue
+            labels = (record.get("source") or "", record.get("platform") or "")
+            totals = self._totals.setdefault(
+                labels,
+                {"states": {}, "stages": dict.fromkeys(STAGES, 0.0)},
+            )
+            state = record.get("state")
+            totals["states"][state] = totals["states"].get(state, 0) + 1
+            for stage, seconds in (record.get("stages") or {}).items():
+                totals["stages"][stage] = totals["stages"].get(stage, 0.0) + seconds
+            totals["bytes"] = totals.get("bytes", 0) + (record.get("bytes") or 0)
+            totals["retries"] = totals.get("retries", 0) + (record.get("retries") or 0)
+
+    def _write_textfile(self, textfile):
+        lines = [
+            "# HELP smd_jobs_total Download jobs finished, by outcome.",
+            "# TYPE smd_jobs_total counter",
+        ]
+        for labels, totals in sorted(self._totals.items()):
+            for state, count in sorted(totals["states"].items()):
+                lines.append(
+                    f"smd_jobs_total{format_labels(labels, state=state)} {count}"
+                )
+        lines += [
+            "# HELP smd_stage_seconds_total Seconds spent in each stage of a job.",
+            "# TYPE smd_stage_seconds_total counter",
+        ]
+        for labels, totals in sorted(self._totals.items()):
+            for stage, seconds in totals["stages"].items():
+                lines.append(
+                    f"smd_stage_seconds_total{format_labels(labels, stage=stage)} "
+                    f"{seconds:.3f}"
+                )
+        for name, key, help_text in (
+            ("smd_bytes_total", "bytes", "Bytes downloaded."),
+            ("smd_retries_total", "retries", "Download attempts retried."),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for labels, totals in sorted(self._totals.items()):
+                lines.append(f"{name}{format_labels(labels)} {totals.get(key, 0)}")
+
+        # Write then rename so the collector never reads half a file
+        temporary = f"{textfile}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary, textfile)
+
+
+def format_labels(labels, **extra):
+    source, platform = labels
+    pairs = {"source": source, "platform": platform, **extra}
+    body = ",".join(f'{name}="{escape(value)}"' for name, value in pairs.items())
+    return "{" + body + "}"
+
+
+def escape(value):
+    """Escape a Prometheus label value"""
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return value.replace("\n", "\\n")
+
+
+# Shared by every window and download path
+default_metrics = MetricsRecorder()
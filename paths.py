@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+
+def data_dir():
+    """Directory holding caches, indexes and logs shared by all windows"""
+    path = Path(
+        os.environ.get("SMD_DATA_DIR", Path.home() / ".social_media_downloader")
+    )
+    path.mkdir(parents=True, exist_ok=True)
+    return path
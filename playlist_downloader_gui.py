@@ -2,12 +2,18 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
 import os
-import yt_dlp
-import shutil
+from . import daemon_client, engine
+from .bandwidth import default_governor, format_rate
+from .lazy_import import warm_up
+from .ui_channel import UIChannel
+from .worker_pool import DownloadJob, WorkerPool
 
 
 class PlaylistDownloaderGUI:
-    def __init__(self, root):
+    # Labels the stage timings of jobs started from this window
+    metrics_source = "playlist"
+
+    def __init__(self, root, playlist_url=None):
         self.root = root
         self.root.title("YouTube Playlist Downloader")
         self.root.geometry("800x700")
@@ -29,8 +35,30 @@ class PlaylistDownloaderGUI:
         self.status_var = tk.StringVar(value="Ready to download 🚀")
         self.download_type = tk.StringVar(value="v")
         self.quality = tk.StringVar(value="720")
+        self.audio_mp3 = tk.BooleanVar(value=False)
+        self.concurrency = tk.StringVar(value="4")
+        self.use_cache = tk.BooleanVar(value=True)
+        self.fast_transfer = tk.BooleanVar(value=False)
+        self.connections = tk.StringVar(value=str(engine.FAST_CONNECTIONS))
+        self.show_ticks_var = tk.BooleanVar(value=False)
+        self.jobs = []
+        self.playlist_url = playlist_url
+        # Client of the local download service when one is running
+        self.daemon = None
 
         self.setup_ui()
+        self.root.after_idle(warm_up)
+        self.refresh_bandwidth()
+        daemon_client.connect_async(
+            lambda client: self.ui.call(self.daemon_found, client)
+        )
+
+    def daemon_found(self, client):
+        """Let the local download service run the playlists from now on"""
+        if client is None:
+            return
+        self.daemon = client
+        self.log_message(f"🛰️ Using the download service at {client.url}")
 
     def setup_ui(self):
         # Main container
@@ -71,6 +99,8 @@ class PlaylistDownloaderGUI:
         )
         self.url_entry = ttk.Entry(input_frame, font=("Arial", 11))
         self.url_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
+        if self.playlist_url:
+            self.url_entry.insert(0, self.playlist_url)
 
         # Folder Entry
         ttk.Label(input_frame, text="Folder name:").grid(
@@ -80,12 +110,46 @@ class PlaylistDownloaderGUI:
         self.folder_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
 
         # Range Entry
-        ttk.Label(input_frame, text="Video range (1-3,5):").grid(
+        ttk.Label(input_frame, text="Video range (1-3,5,7-):").grid(
             row=2, column=0, sticky="w", pady=5
         )
         self.range_entry = ttk.Entry(input_frame, font=("Arial", 11))
         self.range_entry.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
 
+        # Concurrency
+        ttk.Label(input_frame, text="Parallel downloads:").grid(
+            row=3, column=0, sticky="w", pady=5
+        )
+        self.concurrency_spin = ttk.Spinbox(
+            input_frame,
+            from_=WorkerPool.MIN_WORKERS,
+            to=WorkerPool.MAX_WORKERS,
+            textvariable=self.concurrency,
+            width=5,
+        )
+        self.concurrency_spin.grid(row=3, column=1, sticky="w", padx=5, pady=5)
+
+        # Metadata cache switch
+        ttk.Checkbutton(
+            input_frame,
+            text="♻️ Reuse cached playlist and video metadata",
+            variable=self.use_cache,
+        ).grid(row=4, column=0, columnspan=2, sticky="w", pady=5)
+
+        # Fast transfer: fragments and byte ranges over several connections
+        ttk.Checkbutton(
+            input_frame,
+            text="⚡ Fast transfer, connections:",
+            variable=self.fast_transfer,
+        ).grid(row=5, column=0, sticky="w", pady=5)
+        ttk.Spinbox(
+            input_frame,
+            from_=2,
+            to=engine.MAX_CONNECTIONS,
+            textvariable=self.connections,
+            width=5,
+        ).grid(row=5, column=1, sticky="w", padx=5, pady=5)
+
         # Options frame
         options_frame = ttk.Frame(main_container)
         options_frame.pack(fill="x", pady=(0, 15))
@@ -111,6 +175,9 @@ class PlaylistDownloaderGUI:
             value="a",
             command=self.toggle_quality,
         ).pack(side="left", padx=10)
+        ttk.Checkbutton(
+            type_frame, text="as MP3 (re-encode)", variable=self.audio_mp3
+        ).pack(side="left", padx=10)
 
         # Quality selection
         self.quality_frame = ttk.LabelFrame(
@@ -178,6 +245,16 @@ class PlaylistDownloaderGUI:
         )
         self.speed_label.pack(side="left")
 
+        # Shared with the main window, whose limit applies here too
+        self.bandwidth_label = tk.Label(
+            self.info_frame,
+            text="Bandwidth: --",
+            font=("Arial", 9),
+            bg=self.bg_color,
+            fg="#666666",
+        )
+        self.bandwidth_label.pack(side="left", padx=(15, 0))
+
         self.filename_label = tk.Label(
             self.info_frame,
             text="File: --",
@@ -202,6 +279,7 @@ class PlaylistDownloaderGUI:
             borderwidth=1,
         )
         self.log_text.pack(fill="both", expand=True)
+        self.ui = UIChannel(self.root, self.log_text, "playlist_downloader")
 
         # Clear log button
         clear_btn = tk.Button(
@@ -217,19 +295,41 @@ class PlaylistDownloaderGUI:
         )
         clear_btn.pack(pady=(10, 0))
 
+        ticks_check = tk.Checkbutton(
+            log_frame,
+            text="Show per-tick progress lines",
+            variable=self.show_ticks_var,
+            command=self.toggle_ticks,
+            font=("Arial", 9),
+            bg=self.bg_color,
+        )
+        ticks_check.pack(pady=(5, 0))
+
         # Configure grid weights for resizing
         main_container.columnconfigure(0, weight=1)
         main_container.rowconfigure(1, weight=1)
 
-    def log_message(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+    def log_message(self, message, tick=False):
+        """Add message to log (safe from any thread)"""
+        self.ui.log(message, tick)
 
     def clear_log(self):
         """Clear the log text"""
-        self.log_text.delete(1.0, tk.END)
+        self.ui.clear_log()
+
+    def toggle_ticks(self):
+        """Show or hide per-tick progress lines in the log"""
+        self.ui.show_ticks = self.show_ticks_var.get()
+
+    def set_status(self, text):
+        """Show text in the status label (safe from any thread)"""
+        self.ui.update("status", self.status_var.set, text)
+
+    def refresh_progress(self):
+        """Redraw the overall progress on the next UI tick"""
+        self.ui.update(
+            "progress", lambda: self.progress_var.set(self.overall_progress())
+        )
 
     def toggle_quality(self):
         """Toggle quality options visibility"""
@@ -238,48 +338,92 @@ class PlaylistDownloaderGUI:
         else:
             self.quality_frame.grid(row=0, column=1, sticky="ew", padx=(5, 0))
 
+    def refresh_bandwidth(self):
+        """Show actual vs allocated throughput, once per second"""
+        if self.daemon is None:
+            allocated, actual = default_governor.snapshot()
+        else:
+            allocated, actual = self.daemon.bandwidth
+        try:
+            self.bandwidth_label.config(
+                text=f"Bandwidth: {format_rate(actual)} of {format_rate(allocated)}"
+            )
+        except tk.TclError:
+            return
+        self.root.after(1000, self.refresh_bandwidth)
+
     def parse_ranges(self, range_str):
-        """Parse input like '1-3,5,7-9' and return a list of indices (0-based)."""
-        result = set()
-        for part in range_str.split(","):
-            if "-" in part:
-                start, end = map(int, part.split("-"))
-                result.update(range(start, end + 1))
-            else:
-                result.add(int(part))
-        return sorted([i - 1 for i in result])  # 0-based indexing
+        """Parse input like '1-3,5,7-' into (start, end) intervals"""
+        return engine.parse_ranges(range_str)
 
-    def hook(self, d):
+    def hook(self, d, job=None):
         """Progress hook for yt-dlp"""
         if d["status"] == "downloading":
             # Update progress
-            percent = d.get("_percent_str", "0%").strip("%")
-            try:
-                self.progress_var.set(float(percent))
-            except ValueError:
-                pass
+            percent = engine.progress_percent(d)
+            if percent is not None:
+                if job is not None:
+                    job.progress = percent
+                    self.refresh_progress()
+                else:
+                    self.ui.update("progress", self.progress_var.set, percent)
 
             # Update status
+            percent = f"{percent:.1f}" if percent is not None else "--"
             speed = d.get("_speed_str", "N/A")
             eta = d.get("_eta_str", "N/A")
-            filename = d.get("filename", "N/A").split("/")[-1]
+            filename = (d.get("filename") or "N/A").split("/")[-1]
 
-            self.status_var.set(f"Downloading {filename}... {percent}%")
-            self.speed_label.config(text=f"Speed: {speed}")
-            self.filename_label.config(text=f"File: {filename}")
+            self.set_status(f"Downloading {filename}... {percent}%")
+            self.ui.update("speed", self.speed_label.config, text=f"Speed: {speed}")
+            self.ui.update(
+                "filename", self.filename_label.config, text=f"File: {filename}"
+            )
 
             self.log_message(
-                f"Downloading: {filename} | {percent}% | Speed: {speed} | ETA: {eta}"
+                f"Downloading: {filename} | {percent}% | Speed: {speed} | ETA: {eta}",
+                tick=True,
             )
 
         elif d["status"] == "finished":
-            filename = d.get("filename", "N/A").split("/")[-1]
-            self.status_var.set(f"Finished: {filename}")
-            self.progress_var.set(100)
+            filename = (d.get("filename") or "N/A").split("/")[-1]
+            self.set_status(f"Finished: {filename}")
+            if job is None:
+                self.ui.update("progress", self.progress_var.set, 100)
             self.log_message(f"✅ Download complete: {filename}")
 
+    def playlist_loaded(self, info, jobs):
+        """Track the jobs of the current run for the overall progress"""
+        self.jobs = jobs
+
+    def job_updated(self, job):
+        self.refresh_progress()
+
+    def overall_progress(self):
+        """Average progress over all jobs of the current run"""
+        jobs = [job for job in self.jobs if job.state != DownloadJob.SKIPPED]
+        if not jobs:
+            return 0
+        return sum(job.progress for job in jobs) / len(jobs)
+
     def start_download(self):
         """Start the download process"""
+        playlist_url = self.url_entry.get().strip()
+        folder_name = self.folder_entry.get().strip()
+        range_str = self.range_entry.get().strip()
+        download_type = self.download_type.get()
+        quality = self.quality.get() if download_type == "v" else None
+
+        if not all([playlist_url, folder_name, range_str]):
+            messagebox.showerror("Error", "Please fill in all fields")
+            return
+
+        try:
+            self.parse_ranges(range_str)
+        except ValueError as e:
+            messagebox.showerror("Invalid range", str(e))
+            return
+
         # Disable button during download
         self.download_btn.config(state="disabled", text="⏳ Downloading...")
 
@@ -289,149 +433,120 @@ class PlaylistDownloaderGUI:
         self.clear_log()
 
         # Start download in thread
-        thread = threading.Thread(target=self.download_playlist)
+        thread = threading.Thread(
+            target=self.download_playlist,
+            args=(
+                playlist_url,
+                folder_name,
+                range_str,
+                download_type,
+                quality,
+                self.concurrency.get(),
+                self.use_cache.get(),
+                (
+                    engine.clamp_connections(self.connections.get())
+                    if self.fast_transfer.get()
+                    else 1
+                ),
+                "mp3" if self.audio_mp3.get() else "native",
+            ),
+        )
         thread.daemon = True
         thread.start()
 
-    def download_playlist(self):
+    def resume(self, options, range_str):
+        """Fill in an interrupted playlist download and start it again"""
+        for entry, value in (
+            (self.url_entry, options["playlist_url"]),
+            (self.folder_entry, options["folder_name"]),
+            (self.range_entry, range_str),
+        ):
+            entry.delete(0, tk.END)
+            entry.insert(0, value)
+        self.download_type.set("a" if options["kind"] == "audio" else "v")
+        if options["quality"]:
+            self.quality.set(options["quality"])
+        self.toggle_quality()
+        self.audio_mp3.set(options["audio_format"] == "mp3")
+        self.concurrency.set(str(options["concurrency"]))
+        self.use_cache.set(options["use_cache"])
+        if options["connections"] > 1:
+            self.fast_transfer.set(True)
+            self.connections.set(str(options["connections"]))
+        self.start_download()
+
+    def download_playlist(
+        self,
+        playlist_url,
+        folder_name,
+        range_str,
+        download_type,
+        quality,
+        concurrency,
+        use_cache,
+        connections,
+        audio_format,
+    ):
         """Download the playlist videos"""
         try:
-            playlist_url = self.url_entry.get().strip()
-            folder_name = self.folder_entry.get().strip()
-            range_str = self.range_entry.get().strip()
-            download_type = self.download_type.get()
-            quality = self.quality.get() if download_type == "v" else None
-
-            if not all([playlist_url, folder_name, range_str]):
-                messagebox.showerror("Error", "Please fill in all fields")
-                return
-
             # Create folder first
             try:
                 os.makedirs(folder_name, exist_ok=True)
                 self.log_message(f"Created folder: {folder_name}")
             except Exception as e:
-                messagebox.showerror("Error", f"Failed to create folder: {str(e)}")
+                self.ui.call(
+                    messagebox.showerror, "Error", f"Failed to create folder: {str(e)}"
+                )
                 return
 
-            selected_indices = self.parse_ranges(range_str)
-
-            ffmpeg_path = shutil.which("ffmpeg")
-
-            # First, get playlist info
-            with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True}) as ydl:
-                try:
-                    info = ydl.extract_info(playlist_url, download=False)
-                    if not info:
-                        raise ValueError("Could not extract playlist information")
-
-                    # Handle both playlist and single video cases
-                    if "entries" in info:
-                        entries = info["entries"]
-                    else:
-                        entries = [info]
-
-                    if not entries:
-                        raise ValueError("No videos found in the playlist")
-
-                    self.log_message(
-                        f"Playlist: {info.get('title', 'Untitled Playlist')}"
-                    )
-                    self.log_message(f"Total videos: {len(entries)}")
-
-                    # Create a list of URLs to download
-                    urls_to_download = []
-                    for i in selected_indices:
-                        if i < 0 or i >= len(entries):
-                            self.log_message(f"⚠️ Skipping invalid video index: {i+1}")
-                            continue
-
-                        entry = entries[i]
-                        if not entry:
-                            self.log_message(f"⚠️ Skipping unavailable video: {i+1}")
-                            continue
-
-                        video_url = entry.get("url") or entry.get("webpage_url")
-                        if not video_url:
-                            self.log_message(f"⚠️ Could not get URL for video: {i+1}")
-                            continue
-
-                        urls_to_download.append(video_url)
-
-                    if not urls_to_download:
-                        raise ValueError("No valid videos to download")
-
-                    # Now download each video individually
-                    for url in urls_to_download:
-                        try:
-                            # Configure download options for this video
-                            video_opts = {
-                                "outtmpl": os.path.join(
-                                    folder_name, "%(title)s.%(ext)s"
-                                ),
-                                "quiet": True,
-                                "progress_hooks": [self.hook],
-                            }
-
-                            if ffmpeg_path:
-                                video_opts["ffmpeg_location"] = ffmpeg_path
-
-                            if download_type == "a":
-                                video_opts["format"] = "bestaudio/best"
-                                if ffmpeg_path:
-                                    video_opts["postprocessors"] = [
-                                        {
-                                            "key": "FFmpegExtractAudio",
-                                            "preferredcodec": "mp3",
-                                            "preferredquality": "192",
-                                        }
-                                    ]
-                            else:
-                                if ffmpeg_path:
-                                    video_opts["format"] = (
-                                        f"bestvideo[height<={quality}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={quality}]+bestaudio/best[height<={quality}]"
-                                    )
-                                else:
-                                    video_opts["format"] = (
-                                        f"best[height<={quality}][ext=mp4]/best"
-                                    )
-
-                            # Get video info first
-                            with yt_dlp.YoutubeDL({"quiet": True}) as info_ydl:
-                                video_info = info_ydl.extract_info(url, download=False)
-                                if video_info:
-                                    video_title = video_info.get(
-                                        "title", "Unknown Title"
-                                    )
-                                    self.status_var.set(f"⬇️ Downloading: {video_title}")
-                                    self.log_message(
-                                        f"Starting download: {video_title}"
-                                    )
-
-                                    # Download the video
-                                    with yt_dlp.YoutubeDL(video_opts) as download_ydl:
-                                        download_ydl.download([url])
-                                        self.log_message(
-                                            f"✅ Downloaded: {video_title}"
-                                        )
-
-                        except Exception as e:
-                            self.log_message(f"⚠️ Failed to download video: {str(e)}")
-                            continue
-
-                    self.status_var.set("✅ All downloads completed!")
-                    self.log_message("🎉 All downloads completed successfully!")
-                    messagebox.showinfo(
-                        "Success",
-                        f"All downloads completed!\nFiles saved in: {os.path.abspath(folder_name)}",
-                    )
-
-                except Exception as e:
-                    raise Exception(f"Error processing playlist: {str(e)}")
+            kind = "audio" if download_type == "a" else "video"
+            if self.daemon is not None:
+                # Same arguments, but the service downloads
+                download = self.daemon.download_playlist
+            else:
+                download = engine.download_playlist
+            try:
+                summary = download(
+                    playlist_url,
+                    folder_name,
+                    range_str,
+                    kind,
+                    quality,
+                    self,
+                    concurrency,
+                    use_cache,
+                    connections,
+                    audio_format=audio_format,
+                )
+            except Exception as e:
+                raise Exception(f"Error processing playlist: {str(e)}")
+
+            if summary["failed"]:
+                self.set_status(
+                    f"⚠️ Finished with {summary['failed']} failed download(s)"
+                )
+                self.ui.call(
+                    messagebox.showwarning,
+                    "Finished with errors",
+                    f"Completed: {summary['completed']}\n"
+                    f"Failed: {summary['failed']}\n"
+                    f"Skipped: {summary['skipped']}\n"
+                    f"Files saved in: {os.path.abspath(folder_name)}",
+                )
+            else:
+                self.set_status("✅ All downloads completed!")
+                self.log_message("🎉 All downloads completed successfully!")
+                self.ui.call(
+                    messagebox.showinfo,
+                    "Success",
+                    f"All downloads completed!\nFiles saved in: {os.path.abspath(folder_name)}",
+                )
 
         except Exception as e:
-            self.status_var.set("Download failed! ❌")
+            self.set_status("Download failed! ❌")
             self.log_message(f"❌ Error: {str(e)}")
-            messagebox.showerror("Error", str(e))
+            self.ui.call(messagebox.showerror, "Error", str(e))
         finally:
-            self.download_btn.config(state="normal", text="⬇️ Download Now!")
+            self.ui.call(
+                self.download_btn.config, state="normal", text="⬇️ Download Now!"
+            )
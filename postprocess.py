@@ -0,0 +1,97 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .session_pool import default_pool
+
+
+class PostProcessPool:
+    """Run yt-dlp post-processing off the download workers.
+
+    Merges, audio transcodes and fixups are ffmpeg runs that keep a CPU
+    core busy while the network sits idle. Downloads made inside
+    deferred() only record what is left to do; submit() then runs it here
+    while the download worker moves on to the next item. ffmpeg is its own
+    process, so the worker threads below bound how many run at once: one
+    per CPU core. At most two tasks per worker wait for a slot; past that
+    submit() blocks, so unprocessed files cannot pile up on disk.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._slots = threading.BoundedSemaphore(self.max_workers * 3)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available(opts):
+        """True when downloads made with opts can have ffmpeg work to defer"""
+        return bool(opts.get("ffmpeg_location") or shutil.which("ffmpeg"))
+
+    @staticmethod
+    @contextmanager
+    def deferred(ydl, captured):
+        """Append the post-processing of ydl downloads to captured instead.
+
+        Each entry is the (filename, info, files_to_move) that yt-dlp would
+        have passed to YoutubeDL.post_process.
+        """
+
+        def post_process(filename, info, files_to_move=None):
+            # yt-dlp trims the dict it passed in once the download returns
+            captured.append((filename, dict(info), files_to_move))
+            info["filepath"] = filename
+            return info
+
+        ydl.post_process = post_process
+        try:
+            yield captured
+        finally:
+            del ydl.post_process
+
+    def submit(self, opts, captured, postprocessor_hooks=(), on_done=None):
+        """Post-process captured downloads; returns a Future of the last info.
+
+        on_done(info) runs on the pool after each file is finished.
+        """
+        self._slots.acquire()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="postprocess"
+                )
+        try:
+            return self._executor.submit(
+                self._run, opts, captured, postprocessor_hooks, on_done
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, opts, captured, postprocessor_hooks, on_done):
+        try:
+            info = None
+            with default_pool.session(
+                opts, postprocessor_hooks=postprocessor_hooks
+            ) as ydl:
+                for filename, info, files_to_move in captured:
+                    for pp in info.get("__postprocessors") or ():
+                        # Move the merger and fixups over to this session
+                        # so their events reach this job's hooks only
+                        old_hooks = getattr(pp._downloader, "_postprocessor_hooks", [])
+                        pp._progress_hooks = [
+                            hook for hook in pp._progress_hooks if hook not in old_hooks
+                        ]
+                        pp.set_downloader(ydl)
+                    info = ydl.post_process(filename, info, files_to_move)
+                    if on_done:
+                        on_done(info)
+            return info
+        finally:
+            self._slots.release()
+
+
+# Shared by every window and download path
+default_postprocessors = PostProcessPool()
@@ -0,0 +1,188 @@
+import random
+import re
+import threading
+import time
+
+# Errors worth another attempt: rate limiting, server errors, network hiccups
+TRANSIENT_PATTERNS = re.compile(
+    r"HTTP Error (?:429|5\d\d)|Too Many Requests|timed? ?out|"
+    r"Connection (?:reset|refused|aborted)|Remote end closed|IncompleteRead|"
+    r"Temporary failure|temporarily unavailable|Network is unreachable|"
+    r"urlopen error|Got error: |Unable to download (?:webpage|JSON metadata)",
+    re.IGNORECASE,
+)
+
+# Errors that will not go away by themselves, even if they look transient
+PERMANENT_PATTERNS = re.compile(
+    r"HTTP Error (?:400|401|403|404|410)|Private video|Video unavailable|"
+    r"not available|Unsupported URL|Sign in|login required|copyright|"
+    r"has been removed|does not exist",
+    re.IGNORECASE,
+)
+
+
+def is_transient(error):
+    """True when error (an exception or message) is worth retrying"""
+    message = str(error)
+    if PERMANENT_PATTERNS.search(message):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return bool(TRANSIENT_PATTERNS.search(message))
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, attempts=4, base_delay=2.0, max_delay=60.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        """Seconds to wait before retry number retry (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    """Stop sending requests to a platform that keeps failing.
+
+    After threshold transient failures in a row the breaker opens and every
+    job for the platform waits. Once reset_timeout has passed one job is
+    let through as a probe (half-open): its success closes the breaker, its
+    failure opens it again for twice as long, up to max_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, threshold=5, reset_timeout=30.0, max_timeout=600.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_timeout = max_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probing = False
+        self._condition = threading.Condition()
+
+    def acquire(self, on_change=None):
+        """Block while the breaker is open; may turn this call into the probe"""
+        with self._condition:
+            while True:
+                if self.state == self.CLOSED:
+                    return
+                if self.state == self.OPEN:
+                    wait = self._opened_at + self._timeout - time.monotonic()
+                    if wait > 0:
+                        self._condition.wait(wait)
+                        continue
+                    self._set_state(self.HALF_OPEN, on_change)
+                if not self._probing:
+                    self._probing = True
+                    return
+                # Another job is probing, wait for its result
+                self._condition.wait()
+
+    def record_success(self, on_change=None):
+        with self._condition:
+            self.failures = 0
+            self._timeout = self.reset_timeout
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED, on_change)
+            self._condition.notify_all()
+
+    def record_failure(self, on_change=None):
+        """Count a transient failure"""
+        with self._condition:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self._timeout = min(self.max_timeout, self._timeout * 2)
+                self._open(on_change)
+            elif self.state == self.CLOSED and self.failures >= self.threshold:
+                self._open(on_change)
+            self._probing = False
+            self._condition.notify_all()
+
+    def release(self):
+        """End a call that neither succeeded nor failed transiently"""
+        with self._condition:
+            self._probing = False
+            self._condition.notify_all()
+
+    def _open(self, on_change):
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN, on_change)
+
+    def _set_state(self, state, on_change):
+        self.state = state
+        if on_change:
+            on_change(self, state)
+
+
+class RetryManager:
+    """Run downloads with retries and one circuit breaker per platform"""
+
+    def __init__(self, policy=None, **breaker_options):
+        self.policy = policy or RetryPolicy()
+        self.breaker_options = breaker_options
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, platform):
+        with self._lock:
+            if platform not in self.breakers:
+                self.breakers[platform] = CircuitBreaker(
+                    platform or "unknown", **self.breaker_options
+                )
+            return self.breakers[platform]
+
+    def run(self, job, work, reporter):
+        """Call work() for job, retrying transient errors.
+
+        Retries and breaker changes are logged through reporter and counted
+        in job.retries; the last error is raised when every attempt failed.
+        """
+        breaker = self.breaker(job.platform)
+
+        def on_change(breaker, state):
+            if state == CircuitBreaker.OPEN:
+                reporter.log_message(
+                    f"🚧 Too many errors from {breaker.name}: pausing its "
+                    f"downloads for {breaker._timeout:.0f}s"
+                )
+            elif state == CircuitBreaker.HALF_OPEN:
+                reporter.log_message(f"🔎 Probing {breaker.name} again...")
+            else:
+                reporter.log_message(f"✅ {breaker.name} is responding again")
+
+        for attempt in range(1, self.policy.attempts + 1):
+            breaker.acquire(on_change)
+            try:
+                result = work()
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure(on_change)
+                if attempt == self.policy.attempts:
+                    raise
+                delay = self.policy.delay(attempt)
+                job.retries = attempt
+                reporter.log_message(
+                    f"🔁 Retry {attempt}/{self.policy.attempts - 1} for "
+                    f"{job.title} in {delay:.1f}s: {e}"
+                )
+                reporter.job_updated(job)
+                time.sleep(delay)
+            else:
+                breaker.record_success(on_change)
+                return result
+
+
+# Shared by every window and download path
+default_retries = RetryManager()
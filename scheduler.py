@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+
+from .worker_pool import DownloadJob, WorkerPool
+
+
+class JobScheduler:
+    """Priority queue of download jobs run with a concurrency limit.
+
+    Jobs can be submitted at any time; whenever a slot is free the queued
+    job with the best (lowest) priority starts on its own worker thread,
+    first-come first-served within a priority.
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+    PRIORITIES = {"high": HIGH, "normal": NORMAL, "low": LOW}
+
+    def __init__(self, work, max_concurrent=2, on_update=None, on_idle=None):
+        self.work = work
+        self.max_concurrent = WorkerPool.clamp(max_concurrent)
+        self.on_update = on_update
+        self.on_idle = on_idle
+        self.jobs = []
+        self._queue = []
+        self._counter = itertools.count()
+        self._running = 0
+        self._processing = 0
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        """max_concurrent, for code written against WorkerPool"""
+        return self.max_concurrent
+
+    def submit(self, job, priority=NORMAL, work=None, on_update=None):
+        """Queue job; it starts as soon as a slot is free.
+
+        work(job) replaces the scheduler's work for this job, and
+        on_update(job) is called on its state changes before the
+        scheduler's own on_update. A job cancelled before it got here is
+        not queued.
+        """
+        with self._lock:
+            self.jobs.append(job)
+            if on_update:
+                self._listeners[job] = on_update
+            if job.cancelled:
+                job.state = DownloadJob.CANCELLED
+            else:
+                job.state = DownloadJob.QUEUED
+                heapq.heappush(
+                    self._queue,
+                    (priority, next(self._counter), job, work or self.work),
+                )
+        self._notify(job)
+        self._dispatch()
+
+    def run(self, jobs, work, on_update=None, priority=NORMAL):
+        """WorkerPool.run on this queue: the jobs share its slots.
+
+        Blocks until every submitted job is over and returns the summary.
+        At most two jobs per slot are taken from jobs ahead of time.
+        """
+        seen = []
+        slots = threading.BoundedSemaphore(self.max_concurrent * 2)
+        ended = threading.Semaphore(0)
+        released = set()
+
+        def updated(job):
+            if on_update:
+                on_update(job)
+            if job.state in (DownloadJob.QUEUED, DownloadJob.RUNNING):
+                return
+            if job not in released:
+                released.add(job)
+                slots.release()
+            if job.state != DownloadJob.PROCESSING:
+                ended.release()
+
+        submitted = 0
+        for job in jobs:
+            seen.append(job)
+            if job.state != DownloadJob.QUEUED:
+                continue
+            slots.acquire()
+            submitted += 1
+            self.submit(job, priority, work, updated)
+        for _ in range(submitted):
+            ended.acquire()
+        return WorkerPool.summarize(seen)
+
+    def cancel(self, job):
+        """Drop job from the queue, or stop its download if it is running.
+
+        ffmpeg work that already started is left to finish.
+        """
+        with self._lock:
+            job.cancelled = True
+            if job.state != DownloadJob.QUEUED:
+                return
+            self._queue = [entry for entry in self._queue if entry[2] is not job]
+            heapq.heapify(self._queue)
+            job.state = DownloadJob.CANCELLED
+            idle = self._idle()
+        self._notify(job)
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def set_concurrency(self, max_concurrent):
+        """Change the concurrency limit, starting more jobs if allowed"""
+        with self._lock:
+            self.max_concurrent = WorkerPool.clamp(max_concurrent)
+        self._dispatch()
+
+    def busy(self):
+        with self._lock:
+            return bool(self._running or self._processing or self._queue)
+
+    def clear_finished(self):
+        """Forget jobs that are done, failed or skipped"""
+        with self._lock:
+            finished = [
+                job
+                for job in self.jobs
+                if job.state
+                not in (DownloadJob.QUEUED, DownloadJob.RUNNING, DownloadJob.PROCESSING)
+            ]
+            self.jobs = [job for job in self.jobs if job not in finished]
+        return finished
+
+    def summary(self):
+        with self._lock:
+            return WorkerPool.summarize(self.jobs)
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            while self._queue and self._running < self.max_concurrent:
+                _, _, job, work = heapq.heappop(self._queue)
+                job.state = DownloadJob.RUNNING
+                self._running += 1
+                started.append((job, work))
+        for job, work in started:
+            self._notify(job)
+            thread = threading.Thread(target=self._run, args=(job, work))
+            thread.daemon = True
+            thread.start()
+
+    def _run(self, job, work):
+        try:
+            result = work(job)
+        except Exception as e:
+            job.error = str(e)
+            job.state = DownloadJob.CANCELLED if job.cancelled else DownloadJob.FAILED
+        else:
+            if job.state == DownloadJob.RUNNING:
+                job.progress = 100.0
+                if isinstance(result, Future):
+                    # The slot is free for the next download while ffmpeg runs
+                    with self._lock:
+                        self._processing += 1
+                    job.state = DownloadJob.PROCESSING
+                    result.add_done_callback(
+                        lambda future: self._processed(job, future)
+                    )
+                else:
+                    job.state = DownloadJob.DONE
+        self._notify(job)
+
+        with self._lock:
+            self._running -= 1
+            idle = self._idle()
+        self._dispatch()
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def _processed(self, job, future):
+        error = future.exception()
+        if error:
+            job.error = str(error)
+            job.state = DownloadJob.FAILED
+        else:
+            job.state = DownloadJob.DONE
+        self._notify(job)
+        with self._lock:
+            self._processing -= 1
+            idle = self._idle()
+        if idle and self.on_idle:
+            self.on_idle()
+
+    def _idle(self):
+        return not self._running and not self._processing and not self._queue
+
+    def _notify(self, job):
+        if job.state in DownloadJob.FINAL_STATES:
+            listener = self._listeners.pop(job, None)
+        else:
+            listener = self._listeners.get(job)
+        if listener:
+            listener(job)
+        if self.on_update:
+            self.on_update(job)
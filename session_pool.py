@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from .lazy_import import yt_dlp
+
+# Post-processor key reported to postprocessor hooks as a download starts
+DOWNLOAD_START = "DownloadStart"
+
+
+def download_start_postprocessor():
+    """A no-op post-processor that runs right before every download.
+
+    Its "started" event tells the postprocessor hooks that extraction is
+    over and the download request is about to go out.
+    """
+
+    class DownloadStartPP(yt_dlp().postprocessor.PostProcessor):
+        def run(self, info):
+            return [], info
+
+    return DownloadStartPP()
+
+
+class PooledSession:
+    """A YoutubeDL instance plus the progress hooks of the job using it"""
+
+    def __init__(self, key, opts):
+        self.key = key
+        self.hooks = []
+        self.postprocessor_hooks = []
+        self.last_used = time.monotonic()
+        opts = dict(opts)
+        opts["progress_hooks"] = [self.dispatch]
+        opts["postprocessor_hooks"] = [self.dispatch_postprocessor]
+        self.ydl = yt_dlp().YoutubeDL(opts)
+        self.ydl.add_post_processor(download_start_postprocessor(), "before_dl")
+
+    def dispatch(self, d):
+        """Forward yt-dlp progress to the hooks of the current job"""
+        for hook in list(self.hooks):
+            hook(d)
+
+    def dispatch_postprocessor(self, d):
+        for hook in list(self.postprocessor_hooks):
+            hook(d)
+
+    def close(self):
+        try:
+            self.ydl.close()
+        except Exception:
+            pass
+
+
+class SessionPool:
+    """Keep YoutubeDL sessions alive and reuse them across downloads.
+
+    Sessions are keyed by their options (format, postprocessors, output
+    template, ...) so extractors, cookies and keep-alive connections carry
+    over between items and between playlist runs. A session is lent to one
+    job at a time; at most max_size sessions are kept and sessions idle for
+    longer than idle_timeout seconds are closed.
+    """
+
+    def __init__(self, max_size=8, idle_timeout=300):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(opts):
+        """Build a pool key from every option except the hooks"""
+        relevant = {
+            k: v
+            for k, v in opts.items()
+            if k not in ("progress_hooks", "postprocessor_hooks")
+        }
+        return json.dumps(relevant, sort_keys=True, default=str)
+
+    @contextmanager
+    def session(self, opts, hooks=(), postprocessor_hooks=()):
+        """Lend a YoutubeDL for opts with hooks attached for this job only"""
+        session, pooled = self._checkout(opts)
+        session.hooks = list(hooks) + list(opts.get("progress_hooks", []))
+        session.postprocessor_hooks = list(postprocessor_hooks) + list(
+            opts.get("postprocessor_hooks", [])
+        )
+        try:
+            yield session.ydl
+        finally:
+            session.hooks = []
+            session.postprocessor_hooks = []
+            self._checkin(session, pooled)
+
+    def _checkout(self, opts):
+        key = self.key_for(opts)
+        with self._lock:
+            expired = self._evict_expired()
+            session = None
+            for candidate in reversed(self._idle):
+                if candidate.key == key:
+                    session = candidate
+                    self._idle.remove(candidate)
+                    break
+            if session is None and len(self._idle) + self._busy >= self.max_size:
+                # Make room by dropping the least recently used idle session
+                if self._idle:
+                    expired.append(self._idle.pop(0))
+            pooled = len(self._idle) + self._busy < self.max_size
+            if pooled:
+                self._busy += 1
+
+        for old in expired:
+            old.close()
+        if session is None:
+            session = PooledSession(key, opts)
+        return session, pooled
+
+    def _checkin(self, session, pooled):
+        session.last_used = time.monotonic()
+        if not pooled:
+            session.close()
+            return
+        with self._lock:
+            self._busy -= 1
+            self._idle.append(session)
+            expired = self._evict_expired()
+        for old in expired:
+            old.close()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [s for s in self._idle if now - s.last_used > self.idle_timeout]
+        for session in expired:
+            self._idle.remove(session)
+        return expired
+
+    def close(self):
+        """Close every idle session"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+# Shared by every window so sessions survive across playlist runs
+default_pool = SessionPool()
@@ -1,987 +1,878 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import threading
-import os
-import re
-import subprocess
-import sys
-from pathlib import Path
-import shutil
-from .playlist_downloader_gui import PlaylistDownloaderGUI
-import yt_dlp
-
-
-class SocialMediaDownloader:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("🎬 Social Media Video Downloader")
-        self.root.geometry("600x700")
-        self.root.minsize(500, 600)
-
-        # Configure style
-        style = ttk.Style()
-        style.theme_use("clam")
-
-        # Configure colors
-        self.bg_color = "#f0f0f0"
-        self.primary_color = "#4267B2"
-        self.secondary_color = "#E1306C"
-        self.success_color = "#42B883"
-        self.error_color = "#E74C3C"
-
-        self.root.configure(bg=self.bg_color)
-
-        # Variables
-        self.url_var = tk.StringVar()
-        self.platform_var = tk.StringVar(value="facebook")
-        self.download_type_var = tk.StringVar(value="video")
-        self.progress_var = tk.DoubleVar()
-        self.status_var = tk.StringVar(value="Ready to download 🚀")
-
-        # Create download directory
-        self.download_dir = Path("downloaded_items")
-        self.download_dir.mkdir(exist_ok=True)
-
-        self.setup_ui()
-        self.check_dependencies()
-
-    def setup_ui(self):
-        # Create main container
-        main_container = ttk.Frame(self.root)
-        main_container.pack(fill="both", expand=True, padx=10, pady=10)
-
-        # Create canvas and scrollbar
-        canvas = tk.Canvas(main_container, bg=self.bg_color, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(
-            main_container, orient="vertical", command=canvas.yview
-        )
-        self.scrollable_frame = ttk.Frame(canvas)
-
-        self.scrollable_frame.bind(
-            "<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # Grid layout for better resizing
-        canvas.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
-
-        main_container.grid_rowconfigure(0, weight=1)
-        main_container.grid_columnconfigure(0, weight=1)
-
-        # Bind mousewheel to canvas
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
-
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-
-        # Configure scrollable frame columns to expand
-        self.scrollable_frame.columnconfigure(0, weight=1)
-
-        # Header
-        header_frame = ttk.Frame(self.scrollable_frame)
-        header_frame.grid(row=0, column=0, sticky="ew", pady=(0, 20))
-        header_frame.columnconfigure(0, weight=1)
-
-        title_label = tk.Label(
-            header_frame,
-            text="🎬 Social Media Video Downloader",
-            font=("Arial", 18, "bold"),
-            fg=self.primary_color,
-            bg=self.bg_color,
-        )
-        title_label.pack()
-
-        subtitle_label = tk.Label(
-            header_frame,
-            text="Download videos from Facebook, Instagram & TikTok with ease! 📱✨",
-            font=("Arial", 10),
-            fg="#666666",
-            bg=self.bg_color,
-        )
-        subtitle_label.pack()
-
-        # URL Input Section
-        url_frame = ttk.LabelFrame(
-            self.scrollable_frame, text="🔗 Video URL", padding=15
-        )
-        url_frame.grid(row=1, column=0, sticky="ew", pady=(0, 15))
-        url_frame.columnconfigure(0, weight=1)
-
-        url_label = tk.Label(
-            url_frame,
-            text="Paste your Facebook, Instagram, or TikTok video link here:",
-            font=("Arial", 10),
-            bg=self.bg_color,
-        )
-        url_label.pack(anchor="w", pady=(0, 5))
-
-        self.url_entry = tk.Entry(
-            url_frame,
-            textvariable=self.url_var,
-            font=("Arial", 11),
-            width=60,
-            relief="solid",
-            borderwidth=1,
-        )
-        self.url_entry.pack(fill="x", expand=True, pady=(0, 5))
-        self.url_entry.bind("<Control-v>", self.paste_url)
-
-        # Platform Selection
-        platform_frame = ttk.LabelFrame(
-            self.scrollable_frame, text="📱 Select Platform", padding=15
-        )
-        platform_frame.grid(row=2, column=0, sticky="ew", pady=(0, 15))
-        platform_frame.columnconfigure(0, weight=1)
-
-        fb_radio = tk.Radiobutton(
-            platform_frame,
-            text="📘 Facebook",
-            variable=self.platform_var,
-            value="facebook",
-            font=("Arial", 11),
-            bg=self.bg_color,
-            fg=self.primary_color,
-            selectcolor="white",
-        )
-        fb_radio.pack(anchor="w", pady=2)
-
-        ig_radio = tk.Radiobutton(
-            platform_frame,
-            text="📸 Instagram",
-            variable=self.platform_var,
-            value="instagram",
-            font=("Arial", 11),
-            bg=self.bg_color,
-            fg=self.secondary_color,
-            selectcolor="white",
-        )
-        ig_radio.pack(anchor="w", pady=2)
-
-        tiktok_radio = tk.Radiobutton(
-            platform_frame,
-            text="🎵 TikTok",
-            variable=self.platform_var,
-            value="tiktok",
-            font=("Arial", 11),
-            bg=self.bg_color,
-            fg="#000000",
-            selectcolor="white",
-        )
-        tiktok_radio.pack(anchor="w", pady=2)
-
-        # Download Type Selection
-        type_frame = ttk.LabelFrame(
-            self.scrollable_frame, text="🎯 Download Type", padding=15
-        )
-        type_frame.grid(row=3, column=0, sticky="ew", pady=(0, 15))
-        type_frame.columnconfigure(0, weight=1)
-
-        video_radio = tk.Radiobutton(
-            type_frame,
-            text="🎬 Video with Audio (MP4)",
-            variable=self.download_type_var,
-            value="video",
-            font=("Arial", 11),
-            bg=self.bg_color,
-            selectcolor="white",
-        )
-        video_radio.pack(anchor="w", pady=2)
-
-        audio_radio = tk.Radiobutton(
-            type_frame,
-            text="🎵 Audio Only (MP3)",
-            variable=self.download_type_var,
-            value="audio",
-            font=("Arial", 11),
-            bg=self.bg_color,
-            selectcolor="white",
-        )
-        audio_radio.pack(anchor="w", pady=2)
-
-        # Buttons Frame
-        buttons_frame = ttk.Frame(self.scrollable_frame)
-        buttons_frame.grid(row=4, column=0, sticky="ew", pady=(0, 15))
-        buttons_frame.columnconfigure(0, weight=1)
-
-        # Download Button
-        self.download_btn = tk.Button(
-            buttons_frame,
-            text="⬇️ Download Now!",
-            command=self.start_download,
-            font=("Arial", 12, "bold"),
-            bg=self.success_color,
-            fg="white",
-            relief="flat",
-            padx=20,
-            pady=10,
-            cursor="hand2",
-        )
-        self.download_btn.pack(pady=10)
-
-        # YouTube Button
-        youtube_btn = tk.Button(
-            buttons_frame,
-            text="🎬 YouTube Playlist Downloader",
-            command=self.open_youtube_downloader,
-            font=("Arial", 11, "bold"),
-            bg="#FF0000",
-            fg="white",
-            relief="flat",
-            padx=20,
-            pady=8,
-            cursor="hand2",
-        )
-        youtube_btn.pack(pady=(5, 10))
-
-        # Progress Section
-        progress_frame = ttk.LabelFrame(
-            self.scrollable_frame, text="📊 Download Progress", padding=15
-        )
-        progress_frame.grid(row=5, column=0, sticky="ew", pady=(0, 15))
-        progress_frame.columnconfigure(0, weight=1)
-
-        # Status label
-        self.status_label = tk.Label(
-            progress_frame,
-            textvariable=self.status_var,
-            font=("Arial", 10),
-            bg=self.bg_color,
-            fg="#333333",
-        )
-        self.status_label.pack(anchor="w", pady=(0, 5))
-
-        # Progress bar
-        self.progress_bar = ttk.Progressbar(
-            progress_frame,
-            variable=self.progress_var,
-            maximum=100,
-            style="TProgressbar",
-        )
-        self.progress_bar.pack(fill="x", pady=(0, 10))
-
-        # Download info
-        self.info_frame = ttk.Frame(progress_frame)
-        self.info_frame.pack(fill="x")
-
-        self.speed_label = tk.Label(
-            self.info_frame,
-            text="Speed: -- KB/s",
-            font=("Arial", 9),
-            bg=self.bg_color,
-            fg="#666666",
-        )
-        self.speed_label.pack(side="left")
-
-        self.filename_label = tk.Label(
-            self.info_frame,
-            text="File: --",
-            font=("Arial", 9),
-            bg=self.bg_color,
-            fg="#666666",
-        )
-        self.filename_label.pack(side="right")
-
-        # Log Section
-        log_frame = ttk.LabelFrame(
-            self.scrollable_frame, text="📝 Download Log", padding=15
-        )
-        log_frame.grid(row=6, column=0, sticky="nsew", pady=(0, 15))
-        log_frame.columnconfigure(0, weight=1)
-        log_frame.rowconfigure(0, weight=1)
-
-        self.log_text = scrolledtext.ScrolledText(
-            log_frame,
-            height=8,
-            font=("Consolas", 9),
-            wrap=tk.WORD,
-            relief="solid",
-            borderwidth=1,
-        )
-        self.log_text.pack(fill="both", expand=True)
-
-        # Clear log button
-        clear_btn = tk.Button(
-            log_frame,
-            text="🗑️ Clear Log",
-            command=self.clear_log,
-            font=("Arial", 9),
-            bg="#95a5a6",
-            fg="white",
-            relief="flat",
-            padx=10,
-            pady=5,
-        )
-        clear_btn.pack(pady=(10, 0))
-
-        # Configure grid weights for resizing
-        self.scrollable_frame.rowconfigure(6, weight=1)
-
-    def paste_url(self, event):
-        """Handle Ctrl+V paste event"""
-        self.url_entry.event_generate("<<Paste>>")
-
-    def log_message(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-
-    def clear_log(self):
-        """Clear the log text"""
-        self.log_text.delete(1.0, tk.END)
-
-    def check_dependencies(self):
-        """Check if yt-dlp is installed"""
-        try:
-            subprocess.run(["yt-dlp", "--version"], capture_output=True, check=True)
-            self.log_message("✅ yt-dlp is ready!")
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            self.log_message("❌ yt-dlp not found!")
-            self.log_message("Installing yt-dlp...")
-            self.install_ytdlp()
-
-    def install_ytdlp(self):
-        """Install yt-dlp using pip"""
-        try:
-            subprocess.run(
-                [sys.executable, "-m", "pip", "install", "yt-dlp"], check=True
-            )
-            self.log_message("✅ yt-dlp installed successfully!")
-        except subprocess.CalledProcessError:
-            self.log_message("❌ Failed to install yt-dlp. Please install manually.")
-            messagebox.showerror(
-                "Error", "Please install yt-dlp manually:\npip install yt-dlp"
-            )
-
-    def validate_url(self, url):
-        """Validate if URL is from Facebook, Instagram, or TikTok"""
-        fb_patterns = [r"facebook\.com", r"fb\.watch", r"m\.facebook\.com"]
-
-        ig_patterns = [r"instagram\.com", r"instagr\.am"]
-
-        tiktok_patterns = [
-            r"tiktok\.com",
-            r"vm\.tiktok\.com",
-            r"vt\.tiktok\.com",
-            r"m\.tiktok\.com",
-        ]
-
-        if self.platform_var.get() == "facebook":
-            return any(
-                re.search(pattern, url, re.IGNORECASE) for pattern in fb_patterns
-            )
-        elif self.platform_var.get() == "instagram":
-            return any(
-                re.search(pattern, url, re.IGNORECASE) for pattern in ig_patterns
-            )
-        else:  # tiktok
-            return any(
-                re.search(pattern, url, re.IGNORECASE) for pattern in tiktok_patterns
-            )
-
-    def start_download(self):
-        """Start the download process"""
-        url = self.url_var.get().strip()
-
-        if not url:
-            messagebox.showerror("Error", "Please enter a video URL!")
-            return
-
-        if not self.validate_url(url):
-            platform = self.platform_var.get().title()
-            messagebox.showerror("Error", f"Please enter a valid {platform} URL!")
-            return
-
-        # Disable download button
-        self.download_btn.config(state="disabled", text="⏳ Downloading...")
-
-        # Reset progress
-        self.progress_var.set(0)
-        self.status_var.set("Starting download... 🚀")
-
-        # Clear previous info
-        self.speed_label.config(text="Speed: -- KB/s")
-        self.filename_label.config(text="File: --")
-
-        # Start download in separate thread
-        thread = threading.Thread(target=self.download_video, args=(url,))
-        thread.daemon = True
-        thread.start()
-
-    def download_video(self, url):
-        """Download video using yt-dlp"""
-        try:
-            # Prepare output template and format selector
-            if self.download_type_var.get() == "audio":
-                output_template = str(self.download_dir / "%(title)s.%(ext)s")
-                if self.platform_var.get() == "tiktok":
-                    format_selector = "bestaudio/best"
-                else:
-                    format_selector = "bestaudio/best"
-            else:
-                output_template = str(self.download_dir / "%(title)s.%(ext)s")
-                if self.platform_var.get() == "tiktok":
-                    format_selector = "best[height<=1080]/best"
-                else:
-                    format_selector = "best[height<=720]/best"
-
-            # Prepare command
-            cmd = [
-                "yt-dlp",
-                "--no-warnings",
-                "--newline",
-                "-o",
-                output_template,
-                "-f",
-                format_selector,
-            ]
-
-            # Add audio extraction for audio-only downloads
-            if self.download_type_var.get() == "audio":
-                cmd.extend(
-                    [
-                        "--extract-audio",
-                        "--audio-format",
-                        "mp3",
-                        "--audio-quality",
-                        "192K",
-                    ]
-                )
-
-            cmd.append(url)
-
-            self.log_message(
-                f"🎯 Starting download from {self.platform_var.get().title()}..."
-            )
-            self.log_message(f"📥 URL: {url}")
-            self.log_message(f"📁 Output: {self.download_dir}")
-
-            # Execute command
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1,
-            )
-
-            current_file = ""
-
-            for line in process.stdout:
-                line = line.strip()
-                if line:
-                    self.log_message(line)
-
-                    # Parse progress information
-                    if "[download]" in line:
-                        if "Destination:" in line:
-                            # Extract filename
-                            filename = line.split("Destination:")[-1].strip()
-                            current_file = os.path.basename(filename)
-                            self.filename_label.config(text=f"File: {current_file}")
-
-                        elif "%" in line and "ETA" in line:
-                            # Extract progress percentage
-                            try:
-                                progress_match = re.search(r"(\d+(?:\.\d+)?)%", line)
-                                if progress_match:
-                                    progress = float(progress_match.group(1))
-                                    self.progress_var.set(progress)
-                                    self.status_var.set(
-                                        f"Downloading... {progress:.1f}% 📥"
-                                    )
-
-                                # Extract speed
-                                speed_match = re.search(
-                                    r"(\d+(?:\.\d+)?(?:K|M|G)?iB/s)", line
-                                )
-                                if speed_match:
-                                    speed = speed_match.group(1)
-                                    self.speed_label.config(text=f"Speed: {speed}")
-                            except:
-                                pass
-
-                    elif "has already been downloaded" in line:
-                        self.progress_var.set(100)
-                        self.status_var.set("Already downloaded! ✅")
-
-                    elif "ERROR" in line:
-                        self.status_var.set("Download failed! ❌")
-                        self.log_message(f"❌ Error: {line}")
-
-            # Wait for process to complete
-            return_code = process.wait()
-
-            if return_code == 0:
-                self.progress_var.set(100)
-                self.status_var.set("Download completed! 🎉")
-                self.log_message("🎉 Download completed successfully!")
-                messagebox.showinfo(
-                    "Success",
-                    f"Video downloaded successfully!\nSaved to: {self.download_dir}",
-                )
-            else:
-                self.status_var.set("Download failed! ❌")
-                self.log_message("❌ Download failed!")
-                messagebox.showerror(
-                    "Error", "Download failed! Check the log for details."
-                )
-
-        except Exception as e:
-            self.status_var.set("Download failed! ❌")
-            self.log_message(f"❌ Error: {str(e)}")
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-
-        finally:
-            # Re-enable download button
-            self.download_btn.config(state="normal", text="⬇️ Download Now!")
-
-    def open_youtube_downloader(self):
-        """Open YouTube Playlist Downloader in a new window"""
-        youtube_window = tk.Toplevel(self.root)
-        youtube_window.transient(self.root)
-        PlaylistDownloaderGUI(youtube_window)
-
-
-class PlaylistDownloaderGUI:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("YouTube Playlist Downloader")
-        self.root.geometry("800x700")
-        self.root.minsize(700, 600)
-
-        # Configure style
-        style = ttk.Style()
-        style.theme_use("clam")
-
-        # Colors
-        self.bg_color = "#f0f0f0"
-        self.primary_color = "#FF0000"  # YouTube red
-        self.secondary_color = "#282828"
-
-        self.root.configure(bg=self.bg_color)
-
-        # Variables
-        self.progress_var = tk.DoubleVar()
-        self.status_var = tk.StringVar(value="Ready to download 🚀")
-        self.download_type = tk.StringVar(value="v")
-        self.quality = tk.StringVar(value="720")
-
-        self.setup_ui()
-
-    def setup_ui(self):
-        # Main container
-        main_container = ttk.Frame(self.root)
-        main_container.pack(fill="both", expand=True, padx=10, pady=10)
-
-        # Navbar
-        navbar = ttk.Frame(main_container, style="Navbar.TFrame")
-        navbar.pack(fill="x", pady=(0, 20))
-
-        # YouTube icon and title
-        icon_canvas = tk.Canvas(
-            navbar, width=50, height=50, bg=self.secondary_color, highlightthickness=0
-        )
-        icon_canvas.pack(side="left", padx=(10, 5))
-        icon_canvas.create_oval(5, 5, 45, 45, fill=self.primary_color, outline="")
-        icon_canvas.create_polygon(20, 15, 20, 35, 35, 25, fill="white")
-
-        title_label = tk.Label(
-            navbar,
-            text="YouTube Playlist Downloader",
-            font=("Arial", 18, "bold"),
-            fg="white",
-            bg=self.secondary_color,
-        )
-        title_label.pack(side="left", padx=10)
-
-        # Input frame
-        input_frame = ttk.LabelFrame(
-            main_container, text="🔗 Playlist Details", padding=15
-        )
-        input_frame.pack(fill="x", pady=(0, 15))
-        input_frame.columnconfigure(1, weight=1)
-
-        # URL Entry
-        ttk.Label(input_frame, text="Playlist URL:").grid(
-            row=0, column=0, sticky="w", pady=5
-        )
-        self.url_entry = ttk.Entry(input_frame, font=("Arial", 11))
-        self.url_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=5)
-
-        # Folder Entry
-        ttk.Label(input_frame, text="Folder name:").grid(
-            row=1, column=0, sticky="w", pady=5
-        )
-        self.folder_entry = ttk.Entry(input_frame, font=("Arial", 11))
-        self.folder_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=5)
-
-        # Range Entry
-        ttk.Label(input_frame, text="Video range (1-3,5):").grid(
-            row=2, column=0, sticky="w", pady=5
-        )
-        self.range_entry = ttk.Entry(input_frame, font=("Arial", 11))
-        self.range_entry.grid(row=2, column=1, sticky="ew", padx=5, pady=5)
-
-        # Options frame
-        options_frame = ttk.Frame(main_container)
-        options_frame.pack(fill="x", pady=(0, 15))
-        options_frame.columnconfigure(0, weight=1)
-        options_frame.columnconfigure(1, weight=1)
-
-        # Download type
-        type_frame = ttk.LabelFrame(options_frame, text="Download Type", padding=10)
-        type_frame.grid(row=0, column=0, sticky="ew", padx=(0, 5))
-        type_frame.columnconfigure(0, weight=1)
-
-        ttk.Radiobutton(
-            type_frame,
-            text="🎬 Video",
-            variable=self.download_type,
-            value="v",
-            command=self.toggle_quality,
-        ).pack(side="left", padx=10)
-        ttk.Radiobutton(
-            type_frame,
-            text="🎵 Audio",
-            variable=self.download_type,
-            value="a",
-            command=self.toggle_quality,
-        ).pack(side="left", padx=10)
-
-        # Quality selection
-        self.quality_frame = ttk.LabelFrame(
-            options_frame, text="Video Quality", padding=10
-        )
-        self.quality_frame.grid(row=0, column=1, sticky="ew", padx=(5, 0))
-        self.quality_frame.columnconfigure(0, weight=1)
-
-        qualities = ["1080", "720", "480", "360"]
-        for q in qualities:
-            ttk.Radiobutton(
-                self.quality_frame, text=f"{q}p", variable=self.quality, value=q
-            ).pack(side="left", padx=10)
-
-        # Download button
-        self.download_btn = tk.Button(
-            main_container,
-            text="⬇️ Download Now!",
-            command=self.start_download,
-            font=("Arial", 12, "bold"),
-            bg=self.primary_color,
-            fg="white",
-            relief="flat",
-            padx=20,
-            pady=10,
-            cursor="hand2",
-        )
-        self.download_btn.pack(pady=10)
-
-        # Progress Section
-        progress_frame = ttk.LabelFrame(
-            main_container, text="📊 Download Progress", padding=15
-        )
-        progress_frame.pack(fill="x", pady=(0, 15))
-        progress_frame.columnconfigure(0, weight=1)
-
-        # Status label
-        self.status_label = tk.Label(
-            progress_frame,
-            textvariable=self.status_var,
-            font=("Arial", 10),
-            bg=self.bg_color,
-            fg="#333333",
-        )
-        self.status_label.pack(anchor="w", pady=(0, 5))
-
-        # Progress bar
-        self.progress_bar = ttk.Progressbar(
-            progress_frame,
-            variable=self.progress_var,
-            maximum=100,
-        )
-        self.progress_bar.pack(fill="x", pady=(0, 10))
-
-        # Download info
-        self.info_frame = ttk.Frame(progress_frame)
-        self.info_frame.pack(fill="x")
-
-        self.speed_label = tk.Label(
-            self.info_frame,
-            text="Speed: -- KB/s",
-            font=("Arial", 9),
-            bg=self.bg_color,
-            fg="#666666",
-        )
-        self.speed_label.pack(side="left")
-
-        self.filename_label = tk.Label(
-            self.info_frame,
-            text="File: --",
-            font=("Arial", 9),
-            bg=self.bg_color,
-            fg="#666666",
-        )
-        self.filename_label.pack(side="right")
-
-        # Log Section
-        log_frame = ttk.LabelFrame(main_container, text="📝 Download Log", padding=15)
-        log_frame.pack(fill="both", expand=True, pady=(0, 15))
-        log_frame.columnconfigure(0, weight=1)
-        log_frame.rowconfigure(0, weight=1)
-
-        self.log_text = scrolledtext.ScrolledText(
-            log_frame,
-            height=10,
-            font=("Consolas", 9),
-            wrap=tk.WORD,
-            relief="solid",
-            borderwidth=1,
-        )
-        self.log_text.pack(fill="both", expand=True)
-
-        # Clear log button
-        clear_btn = tk.Button(
-            log_frame,
-            text="🗑️ Clear Log",
-            command=self.clear_log,
-            font=("Arial", 9),
-            bg="#95a5a6",
-            fg="white",
-            relief="flat",
-            padx=10,
-            pady=5,
-        )
-        clear_btn.pack(pady=(10, 0))
-
-        # Configure grid weights for resizing
-        main_container.columnconfigure(0, weight=1)
-        main_container.rowconfigure(1, weight=1)
-
-    def log_message(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-
-    def clear_log(self):
-        """Clear the log text"""
-        self.log_text.delete(1.0, tk.END)
-
-    def toggle_quality(self):
-        """Toggle quality options visibility"""
-        if self.download_type.get() == "a":
-            self.quality_frame.grid_remove()
-        else:
-            self.quality_frame.grid(row=0, column=1, sticky="ew", padx=(5, 0))
-
-    def parse_ranges(self, range_str):
-        """Parse input like '1-3,5,7-9' and return a list of indices (0-based)."""
-        result = set()
-        for part in range_str.split(","):
-            if "-" in part:
-                start, end = map(int, part.split("-"))
-                result.update(range(start, end + 1))
-            else:
-                result.add(int(part))
-        return sorted([i - 1 for i in result])  # 0-based indexing
-
-    def hook(self, d):
-        """Progress hook for yt-dlp"""
-        if d["status"] == "downloading":
-            # Update progress
-            percent = d.get("_percent_str", "0%").strip("%")
-            try:
-                self.progress_var.set(float(percent))
-            except ValueError:
-                pass
-
-            # Update status
-            speed = d.get("_speed_str", "N/A")
-            eta = d.get("_eta_str", "N/A")
-            filename = d.get("filename", "N/A").split("/")[-1]
-
-            self.status_var.set(f"Downloading {filename}... {percent}%")
-            self.speed_label.config(text=f"Speed: {speed}")
-            self.filename_label.config(text=f"File: {filename}")
-
-            self.log_message(
-                f"Downloading: {filename} | {percent}% | Speed: {speed} | ETA: {eta}"
-            )
-
-        elif d["status"] == "finished":
-            filename = d.get("filename", "N/A").split("/")[-1]
-            self.status_var.set(f"Finished: {filename}")
-            self.progress_var.set(100)
-            self.log_message(f"✅ Download complete: {filename}")
-
-    def start_download(self):
-        """Start the download process"""
-        # Disable button during download
-        self.download_btn.config(state="disabled", text="⏳ Downloading...")
-
-        # Reset progress
-        self.progress_var.set(0)
-        self.status_var.set("Starting download...")
-        self.clear_log()
-
-        # Start download in thread
-        thread = threading.Thread(target=self.download_playlist)
-        thread.daemon = True
-        thread.start()
-
-    def download_playlist(self):
-        """Download the playlist videos"""
-        try:
-            playlist_url = self.url_entry.get().strip()
-            folder_name = self.folder_entry.get().strip()
-            range_str = self.range_entry.get().strip()
-            download_type = self.download_type.get()
-            quality = self.quality.get() if download_type == "v" else None
-
-            if not all([playlist_url, folder_name, range_str]):
-                messagebox.showerror("Error", "Please fill in all fields")
-                return
-
-            # Create folder first
-            try:
-                os.makedirs(folder_name, exist_ok=True)
-                self.log_message(f"Created folder: {folder_name}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to create folder: {str(e)}")
-                return
-
-            selected_indices = self.parse_ranges(range_str)
-
-            ffmpeg_path = shutil.which("ffmpeg")
-
-            # First, get playlist info
-            with yt_dlp.YoutubeDL({"quiet": True, "extract_flat": True}) as ydl:
-                try:
-                    info = ydl.extract_info(playlist_url, download=False)
-                    if not info:
-                        raise ValueError("Could not extract playlist information")
-
-                    # Handle both playlist and single video cases
-                    if "entries" in info:
-                        entries = info["entries"]
-                    else:
-                        entries = [info]
-
-                    if not entries:
-                        raise ValueError("No videos found in the playlist")
-
-                    self.log_message(
-                        f"Playlist: {info.get('title', 'Untitled Playlist')}"
-                    )
-                    self.log_message(f"Total videos: {len(entries)}")
-
-                    # Create a list of URLs to download
-                    urls_to_download = []
-                    for i in selected_indices:
-                        if i < 0 or i >= len(entries):
-                            self.log_message(f"⚠️ Skipping invalid video index: {i+1}")
-                            continue
-
-                        entry = entries[i]
-                        if not entry:
-                            self.log_message(f"⚠️ Skipping unavailable video: {i+1}")
-                            continue
-
-                        video_url = entry.get("url") or entry.get("webpage_url")
-                        if not video_url:
-                            self.log_message(f"⚠️ Could not get URL for video: {i+1}")
-                            continue
-
-                        urls_to_download.append(video_url)
-
-                    if not urls_to_download:
-                        raise ValueError("No valid videos to download")
-
-                    # Now download each video individually
-                    for url in urls_to_download:
-                        try:
-                            # Configure download options for this video
-                            video_opts = {
-                                "outtmpl": os.path.join(
-                                    folder_name, "%(title)s.%(ext)s"
-                                ),
-                                "quiet": True,
-                                "progress_hooks": [self.hook],
-                            }
-
-                            if ffmpeg_path:
-                                video_opts["ffmpeg_location"] = ffmpeg_path
-
-                            if download_type == "a":
-                                video_opts["format"] = "bestaudio/best"
-                                if ffmpeg_path:
-                                    video_opts["postprocessors"] = [
-                                        {
-                                            "key": "FFmpegExtractAudio",
-                                            "preferredcodec": "mp3",
-                                            "preferredquality": "192",
-                                        }
-                                    ]
-                            else:
-                                if ffmpeg_path:
-                                    video_opts["format"] = (
-                                        f"bestvideo[height<={quality}][ext=mp4]+bestaudio[ext=m4a]/bestvideo[height<={quality}]+bestaudio/best[height<={quality}]"
-                                    )
-                                else:
-                                    video_opts["format"] = (
-                                        f"best[height<={quality}][ext=mp4]/best"
-                                    )
-
-                            # Get video info first
-                            with yt_dlp.YoutubeDL({"quiet": True}) as info_ydl:
-                                video_info = info_ydl.extract_info(url, download=False)
-                                if video_info:
-                                    video_title = video_info.get(
-                                        "title", "Unknown Title"
-                                    )
-                                    self.status_var.set(f"⬇️ Downloading: {video_title}")
-                                    self.log_message(
-                                        f"Starting download: {video_title}"
-                                    )
-
-                                    # Download the video
-                                    with yt_dlp.YoutubeDL(video_opts) as download_ydl:
-                                        download_ydl.download([url])
-                                        self.log_message(
-                                            f"✅ Downloaded: {video_title}"
-                                        )
-
-                        except Exception as e:
-                            self.log_message(f"⚠️ Failed to download video: {str(e)}")
-                            continue
-
-                    self.status_var.set("✅ All downloads completed!")
-                    self.log_message("🎉 All downloads completed successfully!")
-                    messagebox.showinfo(
-                        "Success",
-                        f"All downloads completed!\nFiles saved in: {os.path.abspath(folder_name)}",
-                    )
-
-                except Exception as e:
-                    raise Exception(f"Error processing playlist: {str(e)}")
-
-        except Exception as e:
-            self.status_var.set("Download failed! ❌")
-            self.log_message(f"❌ Error: {str(e)}")
-            messagebox.showerror("Error", str(e))
-        finally:
-            self.download_btn.config(state="normal", text="⬇️ Download Now!")
-
-
-def main():
-    root = tk.Tk()
-    app = SocialMediaDownloader(root)
-    root.mainloop()
-
-
-if __name__ == "__main__":
-    main()
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import itertools
+import os
+import threading
+from pathlib import Path
+from . import daemon_client, dependencies, engine, url_classifier
+from .bandwidth import default_governor, format_rate, parse_rate
+from .journal import default_journal
+from .lazy_import import warm_up
+from .metadata_cache import default_cache
+from .playlist_downloader_gui import PlaylistDownloaderGUI
+from .scheduler import JobScheduler
+from .ui_channel import UIChannel
+from .worker_pool import DownloadJob, WorkerPool
+
+
+class SocialMediaDownloader:
+    # Labels the stage timings of jobs started from this window
+    metrics_source = "gui"
+
+    def __init__(self, root):
+        self.root = root
+        self.root.title("🎬 Social Media Video Downloader")
+        self.root.geometry("600x700")
+        self.root.minsize(500, 600)
+
+        # Configure style
+        style = ttk.Style()
+        style.theme_use("clam")
+
+        # Configure colors
+        self.bg_color = "#f0f0f0"
+        self.primary_color = "#4267B2"
+        self.secondary_color = "#E1306C"
+        self.success_color = "#42B883"
+        self.error_color = "#E74C3C"
+
+        self.root.configure(bg=self.bg_color)
+
+        # Variables
+        self.priority_var = tk.StringVar(value="normal")
+        self.concurrency_var = tk.StringVar(value="2")
+        self.download_type_var = tk.StringVar(value="video")
+        self.audio_mp3_var = tk.BooleanVar(value=False)
+        self.progress_var = tk.DoubleVar()
+        self.status_var = tk.StringVar(value="Ready to download 🚀")
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.fast_transfer_var = tk.BooleanVar(value=False)
+        self.connections_var = tk.StringVar(value=str(engine.FAST_CONNECTIONS))
+        self.bandwidth_var = tk.StringVar(value="0")
+        self.job_limit_var = tk.StringVar(value="0")
+        self.show_ticks_var = tk.BooleanVar(value=False)
+
+        # Create download directory
+        self.download_dir = Path("downloaded_items")
+        self.download_dir.mkdir(exist_ok=True)
+
+        # Batch queue
+        self.scheduler = JobScheduler(
+            self.download_video,
+            max_concurrent=self.concurrency_var.get(),
+            on_update=default_journal().track(self.job_updated),
+            on_idle=self.queue_finished,
+        )
+        self.job_counter = itertools.count(1)
+        # Jobs queued since the queue was last idle, summarized when it is
+        self.batch = []
+        self.batch_lock = threading.Lock()
+        # Journal run of the jobs queued in this window, opened on first use
+        self.journal_run = None
+        # Client of the local download service when one is running
+        self.daemon = None
+        # Pending after() sending a bandwidth limit to the service
+        self.bandwidth_after = None
+
+        self.setup_ui()
+        self.check_dependencies()
+        # Import yt_dlp in the background once the window has been drawn
+        self.root.after_idle(warm_up)
+        self.refresh_bandwidth()
+        self.root.after_idle(self.offer_resume)
+        daemon_client.connect_async(self.daemon_connected)
+
+    def setup_ui(self):
+        # Create main container
+        main_container = ttk.Frame(self.root)
+        main_container.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Create canvas and scrollbar
+        canvas = tk.Canvas(main_container, bg=self.bg_color, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(
+            main_container, orient="vertical", command=canvas.yview
+        )
+        self.scrollable_frame = ttk.Frame(canvas)
+
+        self.scrollable_frame.bind(
+            "<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+
+        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+
+        # Grid layout for better resizing
+        canvas.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        main_container.grid_rowconfigure(0, weight=1)
+        main_container.grid_columnconfigure(0, weight=1)
+
+        # Bind mousewheel to canvas
+        def _on_mousewheel(event):
+            canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+
+        canvas.bind_all("<MouseWheel>", _on_mousewheel)
+
+        # Configure scrollable frame columns to expand
+        self.scrollable_frame.columnconfigure(0, weight=1)
+
+        # Header
+        header_frame = ttk.Frame(self.scrollable_frame)
+        header_frame.grid(row=0, column=0, sticky="ew", pady=(0, 20))
+        header_frame.columnconfigure(0, weight=1)
+
+        title_label = tk.Label(
+            header_frame,
+            text="🎬 Social Media Video Downloader",
+            font=("Arial", 18, "bold"),
+            fg=self.primary_color,
+            bg=self.bg_color,
+        )
+        title_label.pack()
+
+        subtitle_label = tk.Label(
+            header_frame,
+            text="Download videos from Facebook, Instagram, TikTok & YouTube with ease! 📱✨",
+            font=("Arial", 10),
+            fg="#666666",
+            bg=self.bg_color,
+        )
+        subtitle_label.pack()
+
+        # URL Input Section
+        url_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="🔗 Video URLs", padding=15
+        )
+        url_frame.grid(row=1, column=0, sticky="ew", pady=(0, 15))
+        url_frame.columnconfigure(0, weight=1)
+
+        url_label = tk.Label(
+            url_frame,
+            text="Paste Facebook, Instagram, TikTok or YouTube links here (one per line):",
+            font=("Arial", 10),
+            bg=self.bg_color,
+        )
+        url_label.pack(anchor="w", pady=(0, 5))
+
+        self.url_text = scrolledtext.ScrolledText(
+            url_frame,
+            height=5,
+            font=("Arial", 11),
+            width=60,
+            relief="solid",
+            borderwidth=1,
+        )
+        self.url_text.pack(fill="x", expand=True, pady=(0, 5))
+
+        import_btn = tk.Button(
+            url_frame,
+            text="📂 Import from file",
+            command=self.import_urls,
+            font=("Arial", 9),
+            bg="#95a5a6",
+            fg="white",
+            relief="flat",
+            padx=10,
+            pady=3,
+        )
+        import_btn.pack(anchor="e")
+
+        # Queue Options
+        queue_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="⚙️ Queue Options", padding=15
+        )
+        queue_frame.grid(row=2, column=0, sticky="ew", pady=(0, 15))
+
+        tk.Label(
+            queue_frame, text="Priority:", font=("Arial", 10), bg=self.bg_color
+        ).grid(row=0, column=0, sticky="w", pady=2)
+        ttk.Combobox(
+            queue_frame,
+            textvariable=self.priority_var,
+            values=list(JobScheduler.PRIORITIES),
+            state="readonly",
+            width=10,
+        ).grid(row=0, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Label(
+            queue_frame,
+            text="Parallel downloads:",
+            font=("Arial", 10),
+            bg=self.bg_color,
+        ).grid(row=1, column=0, sticky="w", pady=2)
+        ttk.Spinbox(
+            queue_frame,
+            from_=WorkerPool.MIN_WORKERS,
+            to=WorkerPool.MAX_WORKERS,
+            textvariable=self.concurrency_var,
+            command=self.update_concurrency,
+            width=5,
+        ).grid(row=1, column=1, sticky="w", padx=5, pady=2)
+
+        tk.Checkbutton(
+            queue_frame,
+            text="⚡ Fast transfer, connections:",
+            variable=self.fast_transfer_var,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            selectcolor="white",
+        ).grid(row=2, column=0, sticky="w", pady=2)
+        ttk.Spinbox(
+            queue_frame,
+            from_=2,
+            to=engine.MAX_CONNECTIONS,
+            textvariable=self.connections_var,
+            width=5,
+        ).grid(row=2, column=1, sticky="w", padx=5, pady=2)
+
+        # Bandwidth shared by every download of the app, 0 = unlimited
+        tk.Label(
+            queue_frame,
+            text="Max bandwidth (MB/s):",
+            font=("Arial", 10),
+            bg=self.bg_color,
+        ).grid(row=3, column=0, sticky="w", pady=2)
+        ttk.Spinbox(
+            queue_frame,
+            from_=0,
+            to=1000,
+            increment=0.5,
+            textvariable=self.bandwidth_var,
+            width=5,
+        ).grid(row=3, column=1, sticky="w", padx=5, pady=2)
+        self.bandwidth_var.trace_add("write", lambda *args: self.update_bandwidth())
+
+        tk.Label(
+            queue_frame,
+            text="Per-download cap (MB/s):",
+            font=("Arial", 10),
+            bg=self.bg_color,
+        ).grid(row=4, column=0, sticky="w", pady=2)
+        ttk.Spinbox(
+            queue_frame,
+            from_=0,
+            to=1000,
+            increment=0.5,
+            textvariable=self.job_limit_var,
+            width=5,
+        ).grid(row=4, column=1, sticky="w", padx=5, pady=2)
+
+        # Download Type Selection
+        type_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="🎯 Download Type", padding=15
+        )
+        type_frame.grid(row=3, column=0, sticky="ew", pady=(0, 15))
+        type_frame.columnconfigure(0, weight=1)
+
+        video_radio = tk.Radiobutton(
+            type_frame,
+            text="🎬 Video with Audio (MP4)",
+            variable=self.download_type_var,
+            value="video",
+            font=("Arial", 11),
+            bg=self.bg_color,
+            selectcolor="white",
+        )
+        video_radio.pack(anchor="w", pady=2)
+
+        audio_radio = tk.Radiobutton(
+            type_frame,
+            text="🎵 Audio Only (original format)",
+            variable=self.download_type_var,
+            value="audio",
+            font=("Arial", 11),
+            bg=self.bg_color,
+            selectcolor="white",
+        )
+        audio_radio.pack(anchor="w", pady=2)
+
+        mp3_check = tk.Checkbutton(
+            type_frame,
+            text="Convert audio to MP3 (re-encodes, slower)",
+            variable=self.audio_mp3_var,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            selectcolor="white",
+        )
+        mp3_check.pack(anchor="w", padx=(24, 0), pady=2)
+
+        cache_check = tk.Checkbutton(
+            type_frame,
+            text="♻️ Reuse cached video metadata",
+            variable=self.use_cache_var,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            selectcolor="white",
+        )
+        cache_check.pack(anchor="w", pady=(8, 2))
+
+        # Buttons Frame
+        buttons_frame = ttk.Frame(self.scrollable_frame)
+        buttons_frame.grid(row=4, column=0, sticky="ew", pady=(0, 15))
+        buttons_frame.columnconfigure(0, weight=1)
+
+        # Download Button
+        self.download_btn = tk.Button(
+            buttons_frame,
+            text="⬇️ Download Now!",
+            command=self.start_download,
+            font=("Arial", 12, "bold"),
+            bg=self.success_color,
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=10,
+            cursor="hand2",
+        )
+        self.download_btn.pack(pady=10)
+
+        # YouTube Button
+        youtube_btn = tk.Button(
+            buttons_frame,
+            text="🎬 YouTube Playlist Downloader",
+            command=self.open_youtube_downloader,
+            font=("Arial", 11, "bold"),
+            bg="#FF0000",
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=8,
+            cursor="hand2",
+        )
+        youtube_btn.pack(pady=(5, 10))
+
+        # Job Queue Section
+        jobs_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="📋 Download Queue", padding=15
+        )
+        jobs_frame.grid(row=5, column=0, sticky="ew", pady=(0, 15))
+        jobs_frame.columnconfigure(0, weight=1)
+
+        self.jobs_tree = ttk.Treeview(
+            jobs_frame,
+            columns=("platform", "state", "progress", "url"),
+            show="headings",
+            height=6,
+        )
+        for column, heading, width in (
+            ("platform", "Platform", 80),
+            ("state", "State", 70),
+            ("progress", "Progress", 70),
+            ("url", "URL", 300),
+        ):
+            self.jobs_tree.heading(column, text=heading)
+            self.jobs_tree.column(column, width=width, stretch=column == "url")
+        self.jobs_tree.pack(fill="x", expand=True)
+
+        clear_jobs_btn = tk.Button(
+            jobs_frame,
+            text="🧹 Clear Finished",
+            command=self.clear_finished_jobs,
+            font=("Arial", 9),
+            bg="#95a5a6",
+            fg="white",
+            relief="flat",
+            padx=10,
+            pady=5,
+        )
+        clear_jobs_btn.pack(pady=(10, 0))
+
+        # Progress Section
+        progress_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="📊 Download Progress", padding=15
+        )
+        progress_frame.grid(row=6, column=0, sticky="ew", pady=(0, 15))
+        progress_frame.columnconfigure(0, weight=1)
+
+        # Status label
+        self.status_label = tk.Label(
+            progress_frame,
+            textvariable=self.status_var,
+            font=("Arial", 10),
+            bg=self.bg_color,
+            fg="#333333",
+        )
+        self.status_label.pack(anchor="w", pady=(0, 5))
+
+        # Progress bar
+        self.progress_bar = ttk.Progressbar(
+            progress_frame,
+            variable=self.progress_var,
+            maximum=100,
+            style="TProgressbar",
+        )
+        self.progress_bar.pack(fill="x", pady=(0, 10))
+
+        # Download info
+        self.info_frame = ttk.Frame(progress_frame)
+        self.info_frame.pack(fill="x")
+
+        self.speed_label = tk.Label(
+            self.info_frame,
+            text="Speed: -- KB/s",
+            font=("Arial", 9),
+            bg=self.bg_color,
+            fg="#666666",
+        )
+        self.speed_label.pack(side="left")
+
+        self.bandwidth_label = tk.Label(
+            self.info_frame,
+            text="Bandwidth: --",
+            font=("Arial", 9),
+            bg=self.bg_color,
+            fg="#666666",
+        )
+        self.bandwidth_label.pack(side="left", padx=(15, 0))
+
+        self.filename_label = tk.Label(
+            self.info_frame,
+            text="File: --",
+            font=("Arial", 9),
+            bg=self.bg_color,
+            fg="#666666",
+        )
+        self.filename_label.pack(side="right")
+
+        # Log Section
+        log_frame = ttk.LabelFrame(
+            self.scrollable_frame, text="📝 Download Log", padding=15
+        )
+        log_frame.grid(row=7, column=0, sticky="nsew", pady=(0, 15))
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
+
+        self.log_text = scrolledtext.ScrolledText(
+            log_frame,
+            height=8,
+            font=("Consolas", 9),
+            wrap=tk.WORD,
+            relief="solid",
+            borderwidth=1,
+        )
+        self.log_text.pack(fill="both", expand=True)
+        self.ui = UIChannel(self.root, self.log_text, "social_media_downloader")
+
+        # Clear log button
+        clear_btn = tk.Button(
+            log_frame,
+            text="🗑️ Clear Log",
+            command=self.clear_log,
+            font=("Arial", 9),
+            bg="#95a5a6",
+            fg="white",
+            relief="flat",
+            padx=10,
+            pady=5,
+        )
+        clear_btn.pack(pady=(10, 0))
+
+        ticks_check = tk.Checkbutton(
+            log_frame,
+            text="Show per-tick progress lines",
+            variable=self.show_ticks_var,
+            command=self.toggle_ticks,
+            font=("Arial", 9),
+            bg=self.bg_color,
+        )
+        ticks_check.pack(pady=(5, 0))
+
+        # Configure grid weights for resizing
+        self.scrollable_frame.rowconfigure(7, weight=1)
+
+    def log_message(self, message, tick=False):
+        """Add message to log (safe from any thread)"""
+        self.ui.log(message, tick)
+
+    def clear_log(self):
+        """Clear the log text"""
+        self.ui.clear_log()
+
+    def toggle_ticks(self):
+        """Show or hide per-tick progress lines in the log"""
+        self.ui.show_ticks = self.show_ticks_var.get()
+
+    def set_status(self, text):
+        """Show text in the status label (safe from any thread)"""
+        self.ui.update("status", self.status_var.set, text)
+
+    def set_progress(self, value):
+        """Move the progress bar (safe from any thread)"""
+        self.ui.update("progress", self.progress_var.set, value)
+
+    def check_dependencies(self):
+        """Check for yt-dlp and ffmpeg without blocking the window"""
+        dependencies.probe_async(
+            lambda found: self.ui.call(self.dependencies_checked, found)
+        )
+
+    def dependencies_checked(self, found):
+        """Report the probe result, installing yt-dlp when it is missing"""
+        ytdlp_version = found["yt-dlp module"] or found["yt-dlp"]
+        if ytdlp_version:
+            self.log_message(f"✅ yt-dlp {ytdlp_version} is ready!")
+        else:
+            self.log_message("❌ yt-dlp not found!")
+            self.install_ytdlp()
+        if not found["ffmpeg"]:
+            self.log_message("⚠️ ffmpeg not found: MP3 conversion is unavailable")
+
+    def install_ytdlp(self):
+        """Install yt-dlp using pip in the background"""
+        self.log_message("Installing yt-dlp...")
+        self.set_status("📦 Installing yt-dlp...")
+        dependencies.install_ytdlp_async(
+            lambda line: self.log_message(f"pip: {line}"),
+            lambda success: self.ui.call(self.ytdlp_installed, success),
+        )
+
+    def ytdlp_installed(self, success):
+        if success:
+            self.log_message("✅ yt-dlp installed successfully!")
+            self.set_status("Ready to download 🚀")
+            warm_up()
+        else:
+            self.log_message("❌ Failed to install yt-dlp. Please install manually.")
+            self.set_status("❌ yt-dlp is not installed")
+            messagebox.showerror(
+                "Error", "Please install yt-dlp manually:\npip install yt-dlp"
+            )
+
+    def validate_url(self, url, platform):
+        """Validate if URL is from the given platform"""
+        return engine.validate_url(url, platform)
+
+    def detect_platform(self, url):
+        """Return the platform a URL belongs to, or None"""
+        return engine.detect_platform(url)
+
+    def import_urls(self):
+        """Append links from a text file to the URL box"""
+        path = filedialog.askopenfilename(
+            title="Import URLs",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not read file: {str(e)}")
+            return
+        self.url_text.insert(tk.END, content.strip() + "\n")
+
+    def start_download(self):
+        """Queue every pasted URL for download"""
+        urls = []
+        seen = set()
+        for line in self.url_text.get("1.0", tk.END).splitlines():
+            url = line.strip()
+            if not url or url.startswith("#"):
+                continue
+            # The same video pasted in two URL forms is queued once
+            platform, video_id = url_classifier.classify(url)
+            key = (platform, video_id) if video_id else url
+            if key not in seen:
+                seen.add(key)
+                urls.append(url)
+
+        if not urls:
+            messagebox.showerror("Error", "Please enter at least one video URL!")
+            return
+
+        priority = JobScheduler.PRIORITIES.get(
+            self.priority_var.get(), JobScheduler.NORMAL
+        )
+        kind = self.download_type_var.get()
+        job_limit = parse_rate(self.job_limit_var.get())
+        audio_format = "mp3" if self.audio_mp3_var.get() else "native"
+        rejected = []
+        playlists = 0
+        for url in urls:
+            if url_classifier.is_playlist(url):
+                playlists += 1
+                self.log_message(f"📋 Opening the playlist downloader for {url}")
+                self.open_youtube_downloader(url)
+                continue
+            platform = self.detect_platform(url)
+            if platform is None:
+                rejected.append(url)
+                continue
+            job = DownloadJob(next(self.job_counter), url, platform=platform, kind=kind)
+            job.rate_limit = job_limit
+            job.audio_format = audio_format
+            self.queue_job(job, priority)
+
+        self.url_text.delete("1.0", tk.END)
+        queued = len(urls) - len(rejected) - playlists
+        if queued:
+            self.set_status(f"Queued {queued} download(s)... 🚀")
+        if rejected:
+            self.url_text.insert(tk.END, "\n".join(rejected) + "\n")
+            messagebox.showerror(
+                "Error",
+                f"{len(rejected)} link(s) are not Facebook, Instagram, TikTok or "
+                "YouTube URLs and were left in the box.",
+            )
+
+    def daemon_connected(self, client):
+        """Set up a queue in the download service found (connect thread)"""
+        if client is None:
+            return
+        try:
+            scheduler = daemon_client.RemoteScheduler(
+                client,
+                self,
+                self.service_options,
+                on_update=self.job_updated,
+                on_idle=self.queue_finished,
+            )
+        except (OSError, RuntimeError):
+            return
+        self.ui.call(self.daemon_found, client, scheduler)
+
+    def daemon_found(self, client, scheduler):
+        """Hand downloads to the local download service from now on"""
+        if self.scheduler.busy():
+            return
+        self.daemon = client
+        self.scheduler = scheduler
+        self.concurrency_var.set(str(scheduler.max_concurrent))
+        self.log_message(
+            f"🛰️ Using the download service at {client.url}: "
+            "queue and bandwidth are shared with its other clients"
+        )
+
+    def service_options(self):
+        """Output folder sent with each job to the service"""
+        return {"output": str(self.download_dir.resolve())}
+
+    def queue_job(self, job, priority=JobScheduler.NORMAL):
+        """Journal job under this window's run and hand it to the queue.
+
+        Runs on the Tk thread: the form is read here, so workers only
+        read the job. The download service journals the jobs it is given
+        itself.
+        """
+        job.use_cache = self.use_cache_var.get()
+        job.connections = self.transfer_connections()
+        with self.batch_lock:
+            self.batch.append(job)
+        if self.daemon is not None:
+            self.scheduler.submit(job, priority)
+            return
+        if self.journal_run is None:
+            self.journal_run = default_journal().start(
+                "single",
+                {"output": str(self.download_dir.resolve())},
+                self.metrics_source,
+            )
+        job.run = self.journal_run
+        self.scheduler.submit(job, priority)
+
+    def offer_resume(self):
+        """Offer to finish the downloads an earlier session left unfinished"""
+        singles = []
+        playlists = []
+        for run in default_journal().unfinished(
+            [self.metrics_source, PlaylistDownloaderGUI.metrics_source]
+        ):
+            if run["kind"] == "playlist":
+                remaining = engine.resume_range(run)
+                if remaining:
+                    playlists.append((run, remaining))
+                    continue
+            else:
+                jobs = engine.resume_jobs(run)
+                if jobs:
+                    singles.append((run, jobs))
+                    continue
+            # Everything was done, the app just closed before noting it
+            default_journal().close(run["id"])
+        if not singles and not playlists:
+            return
+
+        lines = []
+        count = sum(len(jobs) for _, jobs in singles)
+        if count:
+            lines.append(f"• {count} video(s)")
+        for run, remaining in playlists:
+            lines.append(
+                f"• Playlist {run['options']['playlist_url']}, videos {remaining}"
+            )
+        resume = messagebox.askyesno(
+            "Resume downloads",
+            "The last session ended before these downloads finished:\n\n"
+            + "\n".join(lines)
+            + "\n\nResume them now? Partly downloaded files continue where "
+            "they stopped.",
+        )
+        for run, _ in singles + playlists:
+            default_journal().close(run["id"])
+        if not resume:
+            return
+
+        for run, _ in singles:
+            for job in engine.resume_jobs(run, self):
+                job.index = next(self.job_counter)
+                self.queue_job(job)
+        for run, remaining in playlists:
+            self.open_youtube_downloader().resume(run["options"], remaining)
+
+    def update_bandwidth(self):
+        """Apply the bandwidth limit to every running and future download"""
+        rate = parse_rate(self.bandwidth_var.get())
+        if self.daemon is None:
+            default_governor.set_rate(rate)
+            return
+        # Every keystroke lands here: only send the value typed last
+        if self.bandwidth_after is not None:
+            self.root.after_cancel(self.bandwidth_after)
+        self.bandwidth_after = self.root.after(500, self.send_bandwidth, rate)
+
+    def send_bandwidth(self, rate):
+        """Pass the bandwidth limit on to the download service"""
+        self.bandwidth_after = None
+        self.scheduler.update_settings(rate=rate)
+
+    def refresh_bandwidth(self):
+        """Show actual vs allocated throughput, once per second"""
+        if self.daemon is None:
+            allocated, actual = default_governor.snapshot()
+        else:
+            allocated, actual = self.daemon.bandwidth
+        try:
+            self.bandwidth_label.config(
+                text=f"Bandwidth: {format_rate(actual)} of {format_rate(allocated)}"
+            )
+        except tk.TclError:
+            return
+        self.root.after(1000, self.refresh_bandwidth)
+
+    def update_concurrency(self):
+        """Apply the parallel downloads setting to the queue"""
+        self.scheduler.set_concurrency(self.concurrency_var.get())
+
+    def job_updated(self, job):
+        """Reflect a job state change in the queue list and the log"""
+        self.ui.update(f"job-{job.index}", self.draw_job, job)
+
+        if job.state == DownloadJob.RUNNING:
+            self.log_message(f"🎯 Starting download from {job.platform.title()}...")
+            self.log_message(f"📥 URL: {job.url}")
+        elif job.state == DownloadJob.DONE:
+            self.log_message(f"🎉 Download completed: {job.title}")
+        elif job.state == DownloadJob.FAILED:
+            self.log_message(f"❌ Error: {job.error}")
+
+    def draw_job(self, job):
+        """Insert or refresh the queue list row of a job (main thread)"""
+        if job not in self.scheduler.jobs:
+            return
+        state = job.state
+        if job.retries and state == DownloadJob.RUNNING:
+            state = f"{state} (retry {job.retries})"
+        values = (
+            job.platform.title(),
+            state,
+            f"{job.progress:.0f}%",
+            job.url,
+        )
+        iid = str(job.index)
+        if self.jobs_tree.exists(iid):
+            self.jobs_tree.item(iid, values=values)
+        else:
+            self.jobs_tree.insert("", tk.END, iid=iid, values=values)
+
+    def queue_finished(self):
+        """Summarize the jobs finished since the queue was last idle"""
+        with self.batch_lock:
+            finished = [
+                job for job in self.batch if job.state in DownloadJob.FINAL_STATES
+            ]
+            self.batch = [job for job in self.batch if job not in finished]
+        summary = WorkerPool.summarize(finished)
+        self.log_message(default_cache.stats())
+        self.log_message(
+            f"📋 Summary: {summary['completed']} completed, "
+            f"{summary['failed']} failed, {summary['skipped']} skipped"
+        )
+        if summary["failed"]:
+            self.set_status("Some downloads failed! ❌")
+            self.ui.call(
+                messagebox.showerror,
+                "Error",
+                f"{summary['failed']} download(s) failed! Check the log for details.",
+            )
+        else:
+            self.set_progress(100)
+            self.set_status("Download completed! 🎉")
+            self.ui.call(
+                messagebox.showinfo,
+                "Success",
+                f"All videos downloaded successfully!\nSaved to: {self.download_dir}",
+            )
+
+    def clear_finished_jobs(self):
+        """Remove finished jobs from the queue list"""
+        for job in self.scheduler.clear_finished():
+            iid = str(job.index)
+            if self.jobs_tree.exists(iid):
+                self.jobs_tree.delete(iid)
+
+    def hook(self, d, job):
+        """Progress hook for the in-process yt-dlp engine"""
+        if d["status"] == "downloading":
+            filename = os.path.basename(d.get("filename") or "")
+            if filename:
+                self.ui.update(
+                    "filename", self.filename_label.config, text=f"File: {filename}"
+                )
+
+            progress = engine.progress_percent(d)
+            if progress is not None:
+                job.progress = progress
+                self.set_progress(progress)
+                self.set_status(f"Downloading... {progress:.1f}% 📥")
+                self.ui.update(f"job-{job.index}", self.draw_job, job)
+
+            if d.get("speed"):
+                speed = f"{d['speed'] / 1024:.1f} KB/s"
+            else:
+                speed = d.get("_speed_str")
+            if speed:
+                self.ui.update("speed", self.speed_label.config, text=f"Speed: {speed}")
+
+        elif d["status"] == "finished":
+            filename = os.path.basename(d.get("filename") or "")
+            self.log_message(f"✅ Download complete: {filename}")
+
+    def transfer_connections(self):
+        """Connections per download; 1 unless fast transfer is on"""
+        if not self.fast_transfer_var.get():
+            return 1
+        return engine.clamp_connections(self.connections_var.get())
+
+    def download_video(self, job):
+        """Download one queued job using yt-dlp"""
+        return engine.download_single(
+            job, self.download_dir, self, job.use_cache, job.connections
+        )
+
+    def open_youtube_downloader(self, playlist_url=None):
+        """Open YouTube Playlist Downloader in a new window"""
+        youtube_window = tk.Toplevel(self.root)
+        youtube_window.transient(self.root)
+        return PlaylistDownloaderGUI(youtube_window, playlist_url)
+
+
+def main():
+    root = tk.Tk()
+    app = SocialMediaDownloader(root)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
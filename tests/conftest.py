@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+import pytest
+
+# Caches of a test run go to a throwaway dir
+os.environ["SMD_DATA_DIR"] = tempfile.mkdtemp(prefix="smd-tests-")
+
+
+class Clock:
+    """Stands in for the time module: sleeping only moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """A Clock; test modules patch it over the time module they test"""
+    return Clock()
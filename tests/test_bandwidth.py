@@ -0,0 +1,91 @@
+import pytest
+
+from .. import bandwidth
+from ..bandwidth import MB, BandwidthGovernor, format_rate, parse_rate
+
+
+@pytest.fixture
+def clock(clock, monkeypatch):
+    monkeypatch.setattr(bandwidth, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize(
+    "value, rate",
+    [("2", 2 * MB), (0.5, MB / 2), ("0", None), ("", None), ("fast", None), (-1, None)],
+)
+def test_parse_rate(value, rate):
+    assert parse_rate(value) == rate
+
+
+def test_format_rate():
+    assert format_rate(None) == "unlimited"
+    assert format_rate(1.5 * MB) == "1.5 MB/s"
+    assert format_rate(300 * 1024) == "300 KB/s"
+
+
+def test_unlimited_jobs_keep_their_own_cap():
+    governor = BandwidthGovernor()
+    capped = governor.register(cap=MB)
+    free = governor.register()
+    assert (capped.allocated, free.allocated) == (MB, None)
+    assert capped.limit_rate_arg() == str(MB) and free.limit_rate_arg() is None
+    assert governor.snapshot()[0] is None
+
+
+def test_rate_is_shared_max_min_fairly():
+    governor = BandwidthGovernor(9 * MB)
+    small = governor.register(cap=1 * MB)
+    first = governor.register()
+    second = governor.register()
+    # The capped job keeps its cap, the others split what it leaves
+    assert small.allocated == 1 * MB
+    assert first.allocated == second.allocated == 4 * MB
+    assert governor.snapshot()[0] == 9 * MB
+
+    governor.unregister(first)
+    assert second.allocated == 8 * MB
+    governor.set_cap(small, 6 * MB)
+    assert small.allocated == second.allocated == 4.5 * MB
+    governor.set_rate(None)
+    assert (small.allocated, second.allocated) == (6 * MB, None)
+
+
+def test_fixed_jobs_keep_their_allocation():
+    governor = BandwidthGovernor(8 * MB)
+    fixed = governor.register(fixed=True)
+    assert fixed.allocated == 8 * MB
+    flexible = governor.register()
+    # The subprocess job got everything when it started and keeps it
+    assert fixed.allocated == 8 * MB
+    assert flexible.allocated == 16 * 1024
+    governor.unregister(fixed)
+    assert flexible.allocated == 8 * MB
+
+
+def test_no_job_is_stalled_completely():
+    governor = BandwidthGovernor(1024)
+    limiters = [governor.register() for _ in range(4)]
+    assert all(limiter.allocated == 16 * 1024 for limiter in limiters)
+
+
+def test_limiter_sleeps_when_ahead_of_its_rate(clock):
+    governor = BandwidthGovernor(MB)
+    limiter = governor.register()
+    limiter.consume(MB / 2)
+    assert clock.slept == [0.5]
+    # The hook counts the new bytes of each file, e.g. of each fragment
+    for name, downloaded in (("a", MB), ("b", MB), ("a", 1.5 * MB)):
+        limiter.hook(
+            {"status": "downloading", "downloaded_bytes": downloaded, "filename": name}
+        )
+    assert clock.slept == [0.5, 1.0, 1.0, 0.5]
+
+
+def test_limiter_never_throttles_unlimited_or_fixed_jobs(clock):
+    governor = BandwidthGovernor()
+    limiter = governor.register()
+    limiter.consume(10 * MB)
+    fixed = BandwidthGovernor(MB).register(fixed=True)
+    fixed.consume(10 * MB)
+    assert clock.slept == []
@@ -0,0 +1,32 @@
+import io
+import json
+
+from .. import cli
+from ..download_archive import default_archive
+from ..worker_pool import DownloadJob
+
+ARCHIVED_URL = "https://www.youtube.com/watch?v=archived001"
+
+
+def test_archived_url_is_counted_as_skipped(tmp_path):
+    saved = tmp_path / "archived.mp4"
+    saved.write_bytes(b"video")
+    default_archive.record("Youtube", "archived001", str(saved))
+    stream = io.StringIO()
+    job = DownloadJob(1, ARCHIVED_URL, platform="youtube")
+
+    summary = cli.download_jobs(
+        [job],
+        {"output": str(tmp_path), "use_cache": False, "connections": 1},
+        1,
+        cli.JSONReporter(stream),
+    )
+
+    assert job.state == DownloadJob.SKIPPED
+    assert summary == {"completed": 0, "failed": 0, "skipped": 1, "total": 1}
+    states = [
+        event["state"]
+        for event in map(json.loads, stream.getvalue().splitlines())
+        if event["event"] == "job"
+    ]
+    assert states[-1] == DownloadJob.SKIPPED
@@ -0,0 +1,122 @@
+import pytest
+
+from .. import engine, journal
+from ..journal import JobJournal
+from ..worker_pool import DownloadJob
+
+
+class Log(engine.Reporter):
+    def __init__(self):
+        self.lines = []
+
+    def log_message(self, message, tick=False):
+        self.lines.append(message)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "journal.sqlite"
+
+
+def journaled(store, run, index, state, **fields):
+    job = DownloadJob(index, f"https://youtu.be/video{index:06d}", f"Video {index}")
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.run = run
+    job.state = state
+    store.record(job)
+    return job
+
+
+def test_unfinished_runs_survive_a_restart(path):
+    before = JobJournal(path)
+    run = before.start("single", {"output": "out"}, "cli")
+    closed = before.start("single", {"output": "out"}, "cli")
+    gui = before.start("single", {"output": "out"}, "gui")
+    job = journaled(before, run, 1, DownloadJob.RUNNING)
+    journaled(before, run, 2, DownloadJob.DONE)
+    job.state = DownloadJob.FAILED
+    before.record(job)
+    before.close(closed)
+
+    [unfinished] = JobJournal(path).unfinished(["cli"])
+    assert unfinished["id"] == run and unfinished["options"] == {"output": "out"}
+    # The latest state of each item counts
+    assert [(item["item"], item["state"]) for item in unfinished["items"]] == [
+        (1, DownloadJob.FAILED),
+        (2, DownloadJob.DONE),
+    ]
+    assert [r["id"] for r in JobJournal(path).unfinished()] == [run, gui]
+
+
+def test_resume_jobs_redo_what_was_left(path, tmp_path):
+    store = JobJournal(path)
+    run = store.start("single", {}, "cli")
+    partial = tmp_path / "Video 1.mp4.part"
+    partial.write_bytes(b"x" * 3 * 1024**2)
+    started = journaled(store, run, 1, DownloadJob.RUNNING)
+    store.hook(started)({"status": "downloading", "tmpfilename": str(partial)})
+    journaled(
+        store,
+        run,
+        2,
+        DownloadJob.QUEUED,
+        kind="audio",
+        audio_format="mp3",
+        rate_limit=1024,
+    )
+    for index, state in enumerate(journal.FINISHED_STATES, 3):
+        journaled(store, run, index, state)
+
+    log = Log()
+    jobs = engine.resume_jobs(store.unfinished()[0], log)
+
+    assert [(job.index, job.state, job.title) for job in jobs] == [
+        (1, DownloadJob.QUEUED, "Video 1"),
+        (2, DownloadJob.QUEUED, "Video 2"),
+    ]
+    assert (jobs[1].kind, jobs[1].audio_format, jobs[1].rate_limit) == (
+        "audio",
+        "mp3",
+        1024,
+    )
+    assert log.lines == ["↩️ Continuing Video 1 from 3.0 MiB on disk"]
+
+
+def test_resume_range_skips_finished_items(path):
+    store = JobJournal(path)
+    run = store.start("playlist", {"range_str": "1-5,8-"}, "cli")
+    journaled(store, run, 1, DownloadJob.DONE)
+    journaled(store, run, 2, DownloadJob.FAILED)
+    journaled(store, run, 3, DownloadJob.SKIPPED)
+    journaled(store, run, 8, DownloadJob.CANCELLED)
+
+    assert engine.resume_range(store.unfinished()[0]) == "2,4-5,9-"
+
+
+def test_partial_path_is_kept_until_the_job_is_final(path):
+    store = JobJournal(path)
+    run = store.start("single", {}, "cli")
+    job = journaled(store, run, 1, DownloadJob.RUNNING)
+    hook = store.hook(job)
+    hook({"status": "downloading", "tmpfilename": "a.part"})
+    hook({"status": "downloading", "tmpfilename": "a.part"})
+    assert store.unfinished()[0]["items"][0]["partial"] == "a.part"
+
+    job.state = DownloadJob.DONE
+    store.record(job)
+    assert store._partials == {}
+
+
+def test_closed_runs_are_pruned_after_a_week(path, clock, monkeypatch):
+    monkeypatch.setattr(journal, "time", clock)
+    old = JobJournal(path)
+    run = old.start("single", {}, "cli")
+    journaled(old, run, 1, DownloadJob.DONE)
+    old.close(run)
+    clock.now += journal.KEEP_CLOSED + 1
+
+    reopened = JobJournal(path)
+    with reopened._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone() == (0,)
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone() == (0,)
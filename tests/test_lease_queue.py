@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from .. import batch, engine
+from ..download_archive import default_archive
+from ..lease_queue import DONE, MAX_ATTEMPTS, MemoryLeaseQueue
+
+
+def videos(count):
+    return [
+        {"url": f"https://youtu.be/video{i:06d}", "options": {"kind": "video"}}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def queue():
+    return MemoryLeaseQueue()
+
+
+def test_adding_an_item_twice_queues_it_once(queue):
+    assert queue.add(videos(3)) == 3
+    assert queue.add(videos(4)) == 1
+    assert queue.counts() == {"pending": 4}
+
+
+def test_each_item_is_leased_to_one_node(queue):
+    queue.add(videos(3))
+    claimed = [queue.claim("a", 60), queue.claim("b", 60), queue.claim("a", 60)]
+    assert len({item["id"] for item in claimed}) == 3
+    assert queue.claim("b", 60) is None
+    assert queue.counts() == {"leased": 3}
+
+
+def test_expired_lease_is_reclaimed_and_fenced(queue):
+    queue.add(videos(1))
+    lost = queue.claim("a", 0.05)
+    time.sleep(0.1)
+    assert queue.counts() == {"expired": 1}
+
+    taken = queue.claim("b", 60)
+    assert taken["id"] == lost["id"]
+    assert taken["token"] != lost["token"]
+    assert taken["attempts"] == 2
+    # The node that lost the lease can neither renew nor complete it
+    assert not queue.renew(lost["id"], lost["token"], 60)
+    assert not queue.complete(lost["id"], lost["token"], DONE)
+    assert queue.complete(taken["id"], taken["token"], DONE)
+    assert queue.counts() == {"done": 1}
+
+
+def test_renewed_lease_is_not_reclaimed(queue):
+    queue.add(videos(1))
+    item = queue.claim("a", 0.1)
+    time.sleep(0.06)
+    assert queue.renew(item["id"], item["token"], 0.1)
+    time.sleep(0.06)
+    assert queue.claim("b", 60) is None
+
+
+def test_item_fails_once_its_lease_expired_too_often(queue):
+    queue.add(videos(1))
+    for _ in range(MAX_ATTEMPTS):
+        assert queue.claim("a", 0) is not None
+        time.sleep(0.01)
+    assert queue.claim("b", 60) is None
+    assert queue.counts() == {"failed": 1}
+    assert queue.retry_failed() == 1
+    assert queue.claim("b", 60)["attempts"] == 1
+
+
+def test_heartbeat_keeps_items_with_their_node(queue, tmp_path, monkeypatch):
+    downloads = Counter()
+
+    def download_single(job, output_dir, reporter, use_cache, connections):
+        downloads[job.url] += 1
+        # Much longer than a lease: only the heartbeat keeps it
+        time.sleep(0.4)
+
+    monkeypatch.setattr(engine, "download_single", download_single)
+    queue.add(videos(6))
+    summaries = []
+    nodes = [
+        threading.Thread(
+            target=lambda node=node: summaries.append(
+                batch.work(
+                    queue, node, 2, tmp_path, engine.Reporter(), lease=0.15, poll=0.05
+                )
+            )
+        )
+        for node in ("a", "b")
+    ]
+    for thread in nodes:
+        thread.start()
+    for thread in nodes:
+        thread.join(30)
+
+    assert downloads == {item["url"]: 1 for item in videos(6)}
+    assert queue.counts() == {"done": 6}
+    assert sum(summary["completed"] for summary in summaries) == 6
+
+
+def test_archived_item_is_reported_as_skipped(queue, tmp_path):
+    saved = tmp_path / "saved.mp4"
+    saved.write_bytes(b"video")
+    default_archive.record("Youtube", "video000000", str(saved))
+    queue.add(videos(1))
+
+    summary = batch.work(queue, "a", 1, tmp_path, engine.Reporter(), poll=0.05)
+
+    assert summary["skipped"] == 1 and summary["completed"] == 0
+    assert queue.counts() == {"done": 1}
@@ -0,0 +1,124 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+
+from .. import engine, metrics
+from ..metrics import MetricsRecorder
+from ..worker_pool import DownloadJob
+
+
+class Collector(engine.Reporter):
+    metrics_source = "cli"
+
+    def __init__(self):
+        self.records = []
+
+    def job_metrics(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def clock(clock, monkeypatch):
+    monkeypatch.setattr(metrics, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    return MetricsRecorder(tmp_path / "metrics.jsonl", tmp_path / "metrics.prom")
+
+
+def job(index=1, platform="youtube"):
+    return DownloadJob(index, f"https://youtu.be/video{index:06d}", platform=platform)
+
+
+def records(recorder):
+    with open(recorder.jsonl_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def samples(recorder):
+    """Prometheus samples of the textfile by name and labels"""
+    values = {}
+    with open(recorder.textfile_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                values[name] = float(value)
+    return values
+
+
+def test_stages_follow_the_download(recorder, clock):
+    reporter = Collector()
+    with recorder.track(job(), reporter) as timer:
+        clock.now += 1
+        timer.enter("extract")
+        clock.now += 2
+        timer.hook({"status": "downloading", "filename": "a.part"})
+        clock.now += 0.5
+        timer.hook(
+            {"status": "downloading", "filename": "a.part", "downloaded_bytes": 10}
+        )
+        clock.now += 4
+        timer.hook({"status": "finished", "filename": "a.part", "total_bytes": 100})
+        timer.postprocessor_hook({"status": "started", "postprocessor": "Merger"})
+        clock.now += 3
+        timer.enter("finalize")
+
+    [record] = reporter.records
+    assert records(recorder) == [record | {"event": "metrics", "time": clock.now}]
+    assert record["state"] == DownloadJob.DONE and record["source"] == "cli"
+    assert record["bytes"] == 100 and record["seconds"] == 10.5
+    assert record["stages"] == dict.fromkeys(metrics.STAGES, 0.0) | {
+        "probe": 1,
+        "extract": 2,
+        "first_byte": 0.5,
+        "transfer": 4,
+        "postprocess": 3,
+    }
+
+
+def test_failed_skipped_and_processed_jobs(recorder):
+    reporter = Collector()
+    with pytest.raises(ValueError):
+        with recorder.track(job(1), reporter):
+            raise ValueError("No video formats found")
+    skipped = job(2)
+    with recorder.track(skipped, reporter):
+        skipped.state = DownloadJob.SKIPPED
+    with recorder.track(job(3), reporter) as timer:
+        timer.pending = Future()
+    # Recorded once post-processing is over
+    assert len(reporter.records) == 2
+    timer.pending.set_result(None)
+
+    assert [(r["job"], r["state"], r["error"]) for r in records(recorder)] == [
+        (1, "failed", "No video formats found"),
+        (2, "skipped", None),
+        (3, "done", None),
+    ]
+
+
+def test_textfile_adds_up_every_writer(recorder, tmp_path):
+    other = MetricsRecorder(recorder.jsonl_path, recorder.textfile_path)
+    with recorder.track(job(1), Collector()):
+        pass
+    with other.track(job(2, platform="tiktok"), engine.Reporter()):
+        pass
+    with recorder.track(job(3), Collector()):
+        pass
+
+    values = samples(recorder)
+    labels = 'source="cli",platform="youtube"'
+    assert values[f'smd_jobs_total{{{labels},state="done"}}'] == 2
+    assert values[f"smd_retries_total{{{labels}}}"] == 0
+    assert values['smd_jobs_total{source="engine",platform="tiktok",state="done"}'] == 1
+    assert f'smd_stage_seconds_total{{{labels},stage="backoff"}}' in values
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_label_values_are_escaped():
+    assert metrics.format_labels(('a"b', "c\\d\ne")) == (
+        '{source="a\\"b",platform="c\\\\d\\ne"}'
+    )
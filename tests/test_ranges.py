@@ -0,0 +1,116 @@
+import pytest
+
+from .. import engine
+
+
+class Pages:
+    """PagedList-like entries that remember which slices were fetched"""
+
+    def __init__(self, count):
+        self.entries = [f"video{i}" for i in range(1, count + 1)]
+        self.fetched = []
+
+    def getslice(self, start, end):
+        self.fetched.append((start, end))
+        return self.entries[start:end]
+
+
+def selected(entries, range_str, **kwargs):
+    listing = {}
+    indices = [
+        index
+        for index, entry in engine.iter_selected(
+            entries, engine.parse_ranges(range_str), listing, **kwargs
+        )
+    ]
+    return indices, listing.get("short", False)
+
+
+@pytest.mark.parametrize(
+    "range_str, intervals",
+    [
+        ("5", [(5, 5)]),
+        ("1-3,5,7-", [(1, 3), (5, 5), (7, None)]),
+        ("7-9, 1-3", [(1, 3), (7, 9)]),
+        ("1-3,4-6,7", [(1, 7)]),
+        ("1-2,,4", [(1, 2), (4, 4)]),
+        ("3-", [(3, None)]),
+    ],
+)
+def test_parse_ranges(range_str, intervals):
+    assert engine.parse_ranges(range_str) == intervals
+
+
+@pytest.mark.parametrize(
+    "range_str, message",
+    [
+        ("", "empty"),
+        (" , ", "empty"),
+        ("a-3", "not a number"),
+        ("1-3-5", "not a number"),
+        ("0-4", "numbered from 1"),
+        ("9-3", "did you mean 3-9"),
+        ("1-5,3-8", "overlaps"),
+        ("4-,8", "overlaps"),
+        ("2,2", "overlaps"),
+    ],
+)
+def test_parse_ranges_rejects(range_str, message):
+    with pytest.raises(ValueError, match=message):
+        engine.parse_ranges(range_str)
+
+
+@pytest.mark.parametrize(
+    "range_str, finished, remaining",
+    [
+        ("1-5", set(), "1-5"),
+        ("1-5", {1, 2, 3, 4, 5}, ""),
+        ("1-5", {3}, "1-2,4-5"),
+        ("1-5,8-", {1, 8, 9}, "2-5,10-"),
+        ("3-", {1, 2, 3}, "4-"),
+        ("2-4", {1, 6}, "2-4"),
+    ],
+)
+def test_remaining_range(range_str, finished, remaining):
+    assert engine.remaining_range(range_str, finished) == remaining
+
+
+def playlist(kind, count):
+    if kind == "paged":
+        return Pages(count)
+    entries = [f"video{i}" for i in range(1, count + 1)]
+    return iter(entries) if kind == "stream" else entries
+
+
+@pytest.mark.parametrize("kind", ["list", "stream", "paged"])
+def test_iter_selected(kind):
+    assert selected(playlist(kind, 10), "2-3,5,9-") == ([2, 3, 5, 9, 10], False)
+
+
+@pytest.mark.parametrize("kind", ["list", "stream", "paged"])
+def test_iter_selected_past_the_end(kind):
+    assert selected(playlist(kind, 5), "4-8,12") == ([4, 5], True)
+    assert selected(playlist(kind, 5), "7-9") == ([], True)
+    assert selected(playlist(kind, 5), "4-") == ([4, 5], False)
+
+
+def test_iter_selected_stops_reading_a_stream_after_the_last_interval():
+    read = []
+
+    def entries():
+        for index in range(1, 1000):
+            read.append(index)
+            yield f"video{index}"
+
+    assert selected(entries(), "2,4-5") == ([2, 4, 5], False)
+    assert read == [1, 2, 3, 4, 5]
+
+
+def test_iter_selected_fetches_only_pages_inside_the_intervals():
+    pages = Pages(500)
+    assert selected(pages, "3-4,250-260", page_size=50)[0] == [
+        3,
+        4,
+        *range(250, 261),
+    ]
+    assert pages.fetched == [(2, 4), (249, 260)]
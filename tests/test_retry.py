@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+
+from .. import engine, retry
+from ..retry import CircuitBreaker, RetryManager, RetryPolicy, is_transient
+from ..worker_pool import DownloadJob
+
+
+class Log(engine.Reporter):
+    def __init__(self):
+        self.lines = []
+
+    def log_message(self, message, tick=False):
+        self.lines.append(message)
+
+
+@pytest.fixture
+def clock(clock, monkeypatch):
+    monkeypatch.setattr(retry, "time", clock)
+    return clock
+
+
+def failing(errors, result="ok"):
+    """work() raising errors one by one, then returning result"""
+    errors = list(errors)
+    calls = []
+
+    def work():
+        calls.append(len(calls) + 1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    work.calls = calls
+    return work
+
+
+@pytest.mark.parametrize(
+    "error, transient",
+    [
+        (Exception("HTTP Error 429: Too Many Requests"), True),
+        (Exception("HTTP Error 503: Service Unavailable"), True),
+        (Exception("Read timed out"), True),
+        (ConnectionResetError("reset by peer"), True),
+        (TimeoutError(), True),
+        (Exception("HTTP Error 404: Not Found"), False),
+        (Exception("Private video. Sign in if you've been granted access"), False),
+        (ConnectionError("Video unavailable"), False),
+        (ValueError("No video formats found"), False),
+    ],
+)
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=2.0, max_delay=20.0)
+    assert [policy.delay(number) for number in range(1, 6)] == [4, 8, 16, 20, 20]
+
+
+def test_transient_errors_are_retried(clock):
+    manager = RetryManager(RetryPolicy(attempts=3, base_delay=1, max_delay=1))
+    job = DownloadJob(1, "https://youtu.be/dQw4w9WgXcQ", platform="youtube")
+    work = failing([TimeoutError("timed out"), TimeoutError("timed out")])
+    log = Log()
+
+    assert manager.run(job, work, log) == "ok"
+    assert work.calls == [1, 2, 3]
+    assert job.retries == 2 and len(clock.slept) == 2
+    assert sum("Retry" in line for line in log.lines) == 2
+
+
+def test_permanent_errors_and_the_last_attempt_raise(clock):
+    manager = RetryManager(RetryPolicy(attempts=3))
+    job = DownloadJob(1, "https://youtu.be/dQw4w9WgXcQ", platform="youtube")
+    work = failing([Exception("HTTP Error 404: Not Found")])
+    with pytest.raises(Exception, match="404"):
+        manager.run(job, work, Log())
+    assert work.calls == [1] and clock.slept == []
+
+    work = failing([TimeoutError("timed out")] * 3)
+    with pytest.raises(TimeoutError):
+        manager.run(job, work, Log())
+    assert work.calls == [1, 2, 3] and len(clock.slept) == 2
+
+
+def test_breaker_opens_after_threshold_and_probes_after_timeout(clock):
+    breaker = CircuitBreaker("youtube", threshold=3, reset_timeout=30)
+    changes = []
+
+    def on_change(breaker, state):
+        changes.append(state)
+
+    for _ in range(3):
+        breaker.acquire(on_change)
+        breaker.record_failure(on_change)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now += 30
+    breaker.acquire(on_change)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # The probe failed: open again for twice as long
+    breaker.record_failure(on_change)
+    assert breaker.state == CircuitBreaker.OPEN and breaker._timeout == 60
+
+    clock.now += 60
+    breaker.acquire(on_change)
+    breaker.record_success(on_change)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker._timeout == 30
+    assert changes == ["open", "half-open", "open", "half-open", "closed"]
+
+
+def test_breaker_timeout_doubles_up_to_the_maximum(clock):
+    breaker = CircuitBreaker("tiktok", threshold=1, reset_timeout=30, max_timeout=100)
+    breaker.acquire()
+    breaker.record_failure()
+    for timeout in (60, 100, 100):
+        clock.now += breaker._timeout
+        breaker.acquire()
+        breaker.record_failure()
+        assert breaker._timeout == timeout
+
+
+def test_only_one_job_probes_a_half_open_breaker(clock):
+    breaker = CircuitBreaker("instagram", threshold=1, reset_timeout=30)
+    breaker.acquire()
+    breaker.record_failure()
+    clock.now += 30
+    breaker.acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    waiting = threading.Thread(target=breaker.acquire)
+    waiting.start()
+    waiting.join(0.2)
+    assert waiting.is_alive()
+    breaker.record_success()
+    waiting.join(5)
+    assert not waiting.is_alive()
+
+
+def test_each_platform_has_its_own_breaker(clock):
+    manager = RetryManager(RetryPolicy(attempts=1), threshold=1)
+    broken = DownloadJob(1, "https://youtu.be/dQw4w9WgXcQ", platform="youtube")
+    with pytest.raises(TimeoutError):
+        manager.run(broken, failing([TimeoutError("timed out")]), Log())
+    assert manager.breaker("youtube").state == CircuitBreaker.OPEN
+
+    other = DownloadJob(2, "https://www.tiktok.com/@a/video/1", platform="tiktok")
+    assert manager.run(other, failing([]), Log()) == "ok"
+    assert manager.breaker("tiktok").state == CircuitBreaker.CLOSED
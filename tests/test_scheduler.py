@@ -0,0 +1,189 @@
+import threading
+from concurrent.futures import Future
+
+from .. import social_media_downloader
+from ..scheduler import JobScheduler
+from ..worker_pool import DownloadJob
+
+
+def jobs(count, start=1):
+    return [
+        DownloadJob(index, f"https://youtu.be/video{index:06d}")
+        for index in range(start, start + count)
+    ]
+
+
+class Gate:
+    """work() that records the start order and blocks until opened"""
+
+    def __init__(self):
+        self.started = []
+        self.opened = threading.Event()
+        self._changed = threading.Condition()
+
+    def __call__(self, job):
+        with self._changed:
+            self.started.append(job.index)
+            self._changed.notify_all()
+        assert self.opened.wait(5)
+
+    def running(self, count):
+        """Indices of the jobs started, once count of them have"""
+        with self._changed:
+            assert self._changed.wait_for(lambda: len(self.started) >= count, 5)
+            return sorted(self.started)
+
+
+def wait_idle(scheduler):
+    idle = threading.Event()
+    scheduler.on_idle = idle.set
+    if scheduler.busy():
+        assert idle.wait(5)
+
+
+def test_best_priority_starts_first_fifo_within_a_priority():
+    gate = Gate()
+    scheduler = JobScheduler(gate, max_concurrent=1)
+    first, low, normal1, high, normal2 = jobs(5)
+    scheduler.submit(first)
+    scheduler.submit(low, JobScheduler.LOW)
+    scheduler.submit(normal1)
+    scheduler.submit(high, JobScheduler.HIGH)
+    scheduler.submit(normal2, JobScheduler.NORMAL)
+    assert gate.running(1) == [1]
+
+    gate.opened.set()
+    wait_idle(scheduler)
+    assert gate.started == [1, 4, 3, 5, 2]
+
+
+def test_concurrency_limit_and_raising_it():
+    gate = Gate()
+    scheduler = JobScheduler(gate, max_concurrent=2)
+    for job in jobs(5):
+        scheduler.submit(job)
+    assert gate.running(2) == [1, 2]
+    scheduler.set_concurrency(4)
+    assert gate.running(4) == [1, 2, 3, 4]
+    gate.opened.set()
+    wait_idle(scheduler)
+    assert sorted(gate.started) == [1, 2, 3, 4, 5]
+
+
+def test_summary_counts_each_outcome():
+    processing = Future()
+
+    def work(job):
+        if job.index == 1:
+            raise ValueError("No video formats found")
+        if job.index == 2:
+            job.state = DownloadJob.SKIPPED
+        if job.index == 4:
+            return processing
+
+    scheduler = JobScheduler(work, max_concurrent=4)
+    first, second, third, fourth, fifth = jobs(5)
+    # Cancelled before it started: never runs
+    fifth.cancelled = True
+    states = []
+    in_ffmpeg = threading.Event()
+
+    def updated(job):
+        states.append(job.state)
+        if job.state == DownloadJob.PROCESSING:
+            in_ffmpeg.set()
+
+    for job in (first, second, third, fifth):
+        scheduler.submit(job)
+    scheduler.submit(fourth, on_update=updated)
+    # The download is over, post-processing still runs
+    assert in_ffmpeg.wait(5)
+    processing.set_result(None)
+    wait_idle(scheduler)
+
+    assert [job.state for job in (first, second, third, fourth, fifth)] == [
+        DownloadJob.FAILED,
+        DownloadJob.SKIPPED,
+        DownloadJob.DONE,
+        DownloadJob.DONE,
+        DownloadJob.CANCELLED,
+    ]
+    assert first.error == "No video formats found"
+    assert states[-2:] == [DownloadJob.PROCESSING, DownloadJob.DONE]
+    assert scheduler.summary() == {
+        "completed": 2,
+        "failed": 1,
+        "skipped": 1,
+        "total": 5,
+    }
+    assert len(scheduler.clear_finished()) == 5 and scheduler.jobs == []
+
+
+def test_cancelling_a_queued_job_drops_it():
+    gate = Gate()
+    scheduler = JobScheduler(gate, max_concurrent=1)
+    running, queued = jobs(2)
+    scheduler.submit(running)
+    scheduler.submit(queued)
+    scheduler.cancel(queued)
+    gate.opened.set()
+    wait_idle(scheduler)
+    assert gate.started == [1]
+    assert queued.state == DownloadJob.CANCELLED
+
+
+def test_run_summarizes_only_its_own_jobs():
+    scheduler = JobScheduler(lambda job: None, max_concurrent=2)
+    other = jobs(1, start=10)[0]
+    scheduler.submit(other, work=lambda job: 1 / 0)
+    batch = jobs(3)
+    batch[1].state = DownloadJob.SKIPPED
+
+    summary = scheduler.run(iter(batch), lambda job: None)
+
+    assert summary == {"completed": 2, "failed": 0, "skipped": 1, "total": 3}
+    wait_idle(scheduler)
+    assert scheduler.summary()["failed"] == 1
+
+
+class Window:
+    """What queue_finished uses of the GUI, without a Tk window"""
+
+    queue_finished = social_media_downloader.SocialMediaDownloader.queue_finished
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.batch_lock = threading.Lock()
+        self.download_dir = "downloads"
+        self.ui = self
+        self.log = []
+        self.shown = []
+
+    def call(self, func, title, message):
+        self.shown.append(title)
+
+    def log_message(self, message):
+        self.log.append(message)
+
+    def set_status(self, text):
+        pass
+
+    def set_progress(self, value):
+        pass
+
+
+def test_gui_summarizes_only_the_batch_that_finished():
+    done, failed, running = jobs(3)
+    done.state = DownloadJob.DONE
+    failed.state = DownloadJob.FAILED
+    running.state = DownloadJob.RUNNING
+    window = Window([done, failed, running])
+
+    window.queue_finished()
+    assert window.log[-1] == "📋 Summary: 1 completed, 1 failed, 0 skipped"
+    assert window.shown == ["Error"] and window.batch == [running]
+
+    running.state = DownloadJob.DONE
+    window.queue_finished()
+    assert window.log[-1] == "📋 Summary: 1 completed, 0 failed, 0 skipped"
+    assert window.shown == ["Error", "Success"] and window.batch == []
@@ -0,0 +1,50 @@
+"""A playlist item is extracted once: its extraction downloads it too"""
+
+from collections import Counter
+
+import pytest
+import yt_dlp
+
+from .. import engine
+
+PLAYLIST_URL = "https://www.youtube.com/playlist?list=PLsinglepass"
+VIDEO_URLS = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(1, 7)]
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """extract_info calls per URL, answered without going online"""
+    counts = Counter()
+
+    class CountingYoutubeDL(yt_dlp.YoutubeDL):
+        def extract_info(self, url, download=True, *args, **kwargs):
+            counts[url] += 1
+            if url == PLAYLIST_URL:
+                entries = [
+                    {"url": video, "title": f"Video {i}"}
+                    for i, video in enumerate(VIDEO_URLS, 1)
+                ]
+                return {"id": "PLsinglepass", "title": "Playlist", "entries": entries}
+            return {"id": url[-11:], "title": f"Video {url[-6:]}", "webpage_url": url}
+
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", CountingYoutubeDL)
+    return counts
+
+
+class Log(engine.Reporter):
+    def __init__(self):
+        self.lines = []
+
+    def log_message(self, message, tick=False):
+        self.lines.append(message)
+
+
+def test_playlist_items_are_extracted_once(tmp_path, extractions):
+    log = Log()
+    # No cache: a cached listing would hide the extraction being counted
+    summary = engine.download_playlist(
+        PLAYLIST_URL, str(tmp_path), "1-6", "video", "720", log, use_cache=False
+    )
+
+    assert summary["completed"] == len(VIDEO_URLS), log.lines
+    assert extractions == Counter({url: 1 for url in [PLAYLIST_URL, *VIDEO_URLS]})
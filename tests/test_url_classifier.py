@@ -0,0 +1,80 @@
+import pytest
+
+from .. import url_classifier
+from ..url_classifier import FACEBOOK, INSTAGRAM, TIKTOK, YOUTUBE
+
+
+@pytest.mark.parametrize(
+    "url, platform, video_id",
+    [
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", YOUTUBE, "dQw4w9WgXcQ"),
+        (
+            "https://youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+            YOUTUBE,
+            "dQw4w9WgXcQ",
+        ),
+        ("youtube.com/shorts/dQw4w9WgXcQ", YOUTUBE, "dQw4w9WgXcQ"),
+        ("https://music.youtube.com/watch?v=dQw4w9WgXcQ", YOUTUBE, "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ?t=42", YOUTUBE, "dQw4w9WgXcQ"),
+        ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ", YOUTUBE, "dQw4w9WgXcQ"),
+        ("  HTTPS://WWW.YOUTUBE.COM/watch?v=dQw4w9WgXcQ", YOUTUBE, "dQw4w9WgXcQ"),
+        ("https://www.youtube.com/watch?v=tooshort", YOUTUBE, None),
+        ("https://www.youtube.com/@somechannel", YOUTUBE, None),
+        (
+            "https://www.tiktok.com/@user/video/7234567890123456789",
+            TIKTOK,
+            "7234567890123456789",
+        ),
+        ("https://vm.tiktok.com/ZMabc123/", TIKTOK, None),
+        ("https://www.instagram.com/reel/Cx1-Ab_2/", INSTAGRAM, "Cx1-Ab_2"),
+        ("https://instagr.am/p/Cx1Ab2/", INSTAGRAM, "Cx1Ab2"),
+        ("https://www.facebook.com/page/videos/1234567890/", FACEBOOK, "1234567890"),
+        ("https://m.facebook.com/watch/?v=1234567890", FACEBOOK, "1234567890"),
+        ("https://fb.watch/abcDEF/", FACEBOOK, None),
+        ("https://user@www.facebook.com/reel/1234567890", FACEBOOK, "1234567890"),
+        ("https://notyoutube.com/watch?v=dQw4w9WgXcQ", None, None),
+        ("https://youtube.com.evil.example/watch?v=dQw4w9WgXcQ", None, None),
+        ("https://vimeo.com/123456", None, None),
+        ("not a url", None, None),
+        ("", None, None),
+    ],
+)
+def test_classify(url, platform, video_id):
+    assert url_classifier.classify(url) == (platform, video_id)
+
+
+@pytest.mark.parametrize(
+    "url, playlist",
+    [
+        ("https://www.youtube.com/playlist?list=PLabc_123", True),
+        ("https://www.youtube.com/@somechannel", True),
+        ("https://www.youtube.com/@somechannel/videos", True),
+        ("https://www.youtube.com/channel/UCabc123", True),
+        ("https://www.youtube.com/c/SomeName", True),
+        ("https://www.youtube.com/user/someone", True),
+        ("https://www.youtube.com:443/@somechannel", True),
+        # A watch link with a list= parameter is one video
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc_123", False),
+        ("https://youtu.be/dQw4w9WgXcQ?list=PLabc_123", False),
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", False),
+        ("https://www.youtube.com/feed/subscriptions", False),
+        ("https://www.tiktok.com/@user", False),
+        ("https://example.com/playlist?list=PLabc_123", False),
+    ],
+)
+def test_is_playlist(url, playlist):
+    assert url_classifier.is_playlist(url) is playlist
+
+
+def test_archive_key_uses_the_extractor_key():
+    assert url_classifier.archive_key("https://youtu.be/dQw4w9WgXcQ") == (
+        "Youtube",
+        "dQw4w9WgXcQ",
+    )
+    assert url_classifier.archive_key(
+        "https://www.tiktok.com/@user/video/7234567890123456789"
+    ) == ("TikTok", "7234567890123456789")
+    assert url_classifier.archive_key("https://vm.tiktok.com/ZMabc123/") == (
+        None,
+        None,
+    )
@@ -0,0 +1,114 @@
+import logging
+import threading
+import tkinter as tk
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from .paths import data_dir
+
+
+def file_logger(name, max_bytes=5 * 1024 * 1024, backups=5):
+    """Logger streaming every log line to a rotating file in the data dir"""
+    logger = logging.getLogger(f"smd.{name}")
+    if not logger.handlers:
+        log_dir = data_dir() / "logs"
+        log_dir.mkdir(exist_ok=True)
+        handler = RotatingFileHandler(
+            log_dir / f"{name}.log",
+            maxBytes=max_bytes,
+            backupCount=backups,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class UIChannel:
+    """Thread-safe bridge from download threads to the Tk main loop.
+
+    Worker threads only append to in-memory buffers; a fixed-rate after()
+    timer on the main thread drains them. Updates posted under the same key
+    are coalesced so only the latest value is drawn, and log lines are
+    inserted into the widget in one batch per tick.
+
+    The widget only keeps the last max_lines lines; the full log goes to a
+    rotating file. Per-tick progress lines are only shown in the widget
+    when show_ticks is set; they are always written to disk.
+    """
+
+    def __init__(self, root, log_widget, log_name, max_lines=2000, interval_ms=66):
+        self.root = root
+        self.log_widget = log_widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.show_ticks = False
+        self.logger = file_logger(log_name)
+        self._lines = deque(maxlen=max_lines)
+        self._updates = {}
+        self._calls = []
+        self._lock = threading.Lock()
+        self.root.after(self.interval_ms, self._drain)
+
+    def log(self, message, tick=False):
+        """Append a line to the log; tick marks per-progress-tick lines"""
+        self.logger.info(message)
+        if tick and not self.show_ticks:
+            return
+        with self._lock:
+            self._lines.append(message)
+
+    def update(self, key, func, *args, **kwargs):
+        """Run func on the next tick; later updates for key replace it"""
+        with self._lock:
+            self._updates[key] = (func, args, kwargs)
+
+    def call(self, func, *args, **kwargs):
+        """Run func on the next tick, in posting order"""
+        with self._lock:
+            self._calls.append((func, args, kwargs))
+
+    def clear_log(self):
+        """Drop pending lines and empty the log widget (main thread only)"""
+        with self._lock:
+            self._lines.clear()
+        self.log_widget.delete(1.0, tk.END)
+
+    def _drain(self):
+        try:
+            # Reschedule first: neither a failing update nor a modal dialog
+            # below may stop the updates of later ticks
+            self.root.after(self.interval_ms, self._drain)
+        except tk.TclError:
+            # The window was closed, stop draining
+            return
+
+        with self._lock:
+            lines, self._lines = self._lines, deque(maxlen=self.max_lines)
+            updates, self._updates = self._updates, {}
+            calls, self._calls = self._calls, []
+
+        if lines:
+            self._run(self._insert_lines, (lines,), {})
+        for func, args, kwargs in updates.values():
+            self._run(func, args, kwargs)
+        for func, args, kwargs in calls:
+            self._run(func, args, kwargs)
+
+    def _insert_lines(self, lines):
+        self.log_widget.insert(tk.END, "\n".join(lines) + "\n")
+        # Keep only the newest max_lines lines on screen
+        line_count = int(self.log_widget.index("end-1c").split(".")[0])
+        if line_count > self.max_lines + 1:
+            excess = line_count - self.max_lines - 1
+            self.log_widget.delete("1.0", f"{excess + 1}.0")
+        self.log_widget.see(tk.END)
+
+    def _run(self, func, args, kwargs):
+        """Run one update; one that fails is logged to disk and skipped"""
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            self.logger.exception(f"UI update {func!r} failed")
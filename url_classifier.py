@@ -0,0 +1,107 @@
+"""Classify pasted URLs by platform without any network request.
+
+The host is matched against a suffix table and the id is pulled out with
+one precompiled pattern per platform, so classifying a URL is a dict
+lookup or two plus a single regex search.
+"""
+
+import re
+
+FACEBOOK = "facebook"
+INSTAGRAM = "instagram"
+TIKTOK = "tiktok"
+YOUTUBE = "youtube"
+
+# Registered domain -> platform; subdomains (m., www., vm., music., ...)
+# are matched by walking up the host labels
+HOST_PLATFORMS = {
+    "facebook.com": FACEBOOK,
+    "fb.com": FACEBOOK,
+    "fb.watch": FACEBOOK,
+    "instagram.com": INSTAGRAM,
+    "instagr.am": INSTAGRAM,
+    "tiktok.com": TIKTOK,
+    "youtube.com": YOUTUBE,
+    "youtu.be": YOUTUBE,
+    "youtube-nocookie.com": YOUTUBE,
+}
+
+# yt-dlp extractor key of the ids below, used as the download archive key
+EXTRACTOR_KEYS = {
+    FACEBOOK: "Facebook",
+    INSTAGRAM: "Instagram",
+    TIKTOK: "TikTok",
+    YOUTUBE: "Youtube",
+}
+
+HOST_RE = re.compile(r"^\s*(?:[a-z][a-z0-9+.-]*://)?(?:[^@/?#]*@)?([^/:?#\s]+)", re.I)
+
+ID_PATTERNS = {
+    FACEBOOK: re.compile(r"(?:/videos/(?:[^/?#]+/)?|[?&]v=|/reel/)(\d+)"),
+    INSTAGRAM: re.compile(r"/(?:p|reels?|tv)/([\w-]+)"),
+    TIKTOK: re.compile(r"/(?:video|v)/(\d+)"),
+    YOUTUBE: re.compile(r"(?:[?&]v=|/(?:shorts|embed|live|v)/)([\w-]{11})(?![\w-])"),
+}
+
+# youtu.be/<id>: the id is the whole first path segment
+SHORT_LINK_RE = re.compile(r"/([\w-]{11})(?![\w-])")
+
+PLAYLIST_RE = re.compile(r"[?&]list=([\w-]+)")
+
+# Channel pages: /@handle, /channel/<id>, /c/<name>, /user/<name>
+CHANNEL_RE = re.compile(r"(?::\d+)?/(?:@[^/?#]+|(?:channel|c|user)/[^/?#]+)", re.I)
+
+
+def host_platform(host):
+    """Platform of a lower-case host name, or None"""
+    while True:
+        platform = HOST_PLATFORMS.get(host)
+        if platform is not None:
+            return platform
+        dot = host.find(".")
+        if dot < 0:
+            return None
+        host = host[dot + 1 :]
+
+
+def classify(url):
+    """Return (platform, video id) for url.
+
+    The platform is None for unsupported hosts; the id is None when it can
+    not be read from the URL itself (short links, profiles, playlists).
+    """
+    match = HOST_RE.match(url)
+    if match is None:
+        return None, None
+    host = match.group(1).lower()
+    platform = host_platform(host)
+    if platform is None:
+        return None, None
+    if host == "youtu.be":
+        id_match = SHORT_LINK_RE.match(url, match.end())
+    else:
+        id_match = ID_PATTERNS[platform].search(url, match.end())
+    return platform, id_match.group(1) if id_match else None
+
+
+def is_playlist(url):
+    """True for a YouTube playlist or channel link that names no video.
+
+    A watch link carrying a list= parameter is one video; it is downloaded
+    without its playlist.
+    """
+    platform, video_id = classify(url)
+    if platform != YOUTUBE or video_id is not None:
+        return False
+    if PLAYLIST_RE.search(url):
+        return True
+    match = HOST_RE.match(url)
+    return bool(CHANNEL_RE.match(url, match.end()))
+
+
+def archive_key(url):
+    """(yt-dlp extractor key, video id) when the URL names one video"""
+    platform, video_id = classify(url)
+    if video_id is None:
+        return None, None
+    return EXTRACTOR_KEYS[platform], video_id
@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class DownloadJob:
+    """A single download tracked by the worker pool or the scheduler"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    # Downloaded, ffmpeg still working on it
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+    # States a job never leaves
+    FINAL_STATES = (DONE, FAILED, SKIPPED, CANCELLED)
+
+    def __init__(self, index, url, title=None, platform=None, kind="video"):
+        self.index = index
+        self.url = url
+        self.title = title or url
+        self.platform = platform
+        self.kind = kind
+        self.state = self.QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.retries = 0
+        # Bandwidth cap in bytes per second, None for the fair share only
+        self.rate_limit = None
+        # Audio jobs: "native" keeps the source codec, "mp3" re-encodes
+        self.audio_format = "native"
+        # Transfer settings, read from the form when the job is queued
+        self.use_cache = True
+        self.connections = 1
+        # Journal run the job is recorded under, None when not journaled
+        self.run = None
+        # Set to stop the download at its next progress update
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"<DownloadJob #{self.index} {self.state} {self.title!r}>"
+
+
+class WorkerPool:
+    """Run download jobs on a bounded pool of worker threads"""
+
+    MIN_WORKERS = 1
+    MAX_WORKERS = 16
+
+    def __init__(self, max_workers=4):
+        self.max_workers = self.clamp(max_workers)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def clamp(cls, value):
+        """Keep the concurrency level inside the supported range"""
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = cls.MIN_WORKERS
+        return max(cls.MIN_WORKERS, min(cls.MAX_WORKERS, value))
+
+    def run(self, jobs, work, on_update=None):
+        """Run work(job) for every queued job and return a summary.
+
+        jobs may be any iterable, including a generator that is still
+        listing a playlist: each job starts as soon as it is yielded and a
+        worker is free, and at most two jobs per worker wait for a slot.
+        Jobs that are not queued (e.g. already marked as skipped) are left
+        untouched. A job succeeds when work returns normally and fails when
+        it raises, unless work already moved it out of running, e.g. to
+        skipped; on_update(job) is called after every state change.
+
+        When work returns a Future (post-processing still running), the
+        worker moves on and the job stays processing until it resolves.
+        """
+        seen = []
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        processing = []
+        processed = threading.Semaphore(0)
+
+        def _finish(job, future):
+            error = future.exception()
+            if error:
+                job.error = str(error)
+                self._set_state(job, DownloadJob.FAILED, on_update)
+            else:
+                self._set_state(job, DownloadJob.DONE, on_update)
+            processed.release()
+
+        def _run_one(job):
+            try:
+                self._set_state(job, DownloadJob.RUNNING, on_update)
+                try:
+                    result = work(job)
+                except Exception as e:
+                    job.error = str(e)
+                    state = (
+                        DownloadJob.CANCELLED if job.cancelled else DownloadJob.FAILED
+                    )
+                    self._set_state(job, state, on_update)
+                else:
+                    if job.state != DownloadJob.RUNNING:
+                        # work settled the job itself, e.g. skipped it
+                        self._set_state(job, job.state, on_update)
+                        return
+                    job.progress = 100.0
+                    if isinstance(result, Future):
+                        processing.append(job)
+                        self._set_state(job, DownloadJob.PROCESSING, on_update)
+                        result.add_done_callback(lambda future: _finish(job, future))
+                    else:
+                        self._set_state(job, DownloadJob.DONE, on_update)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="download"
+        ) as executor:
+            futures = []
+            for job in jobs:
+                seen.append(job)
+                if job.state != DownloadJob.QUEUED:
+                    continue
+                slots.acquire()
+                futures.append(executor.submit(_run_one, job))
+            # Surface unexpected errors instead of swallowing them
+            for future in futures:
+                future.result()
+        for _ in processing:
+            processed.acquire()
+
+        return self.summarize(seen)
+
+    def _set_state(self, job, state, on_update):
+        with self._lock:
+            job.state = state
+        if on_update:
+            on_update(job)
+
+    @staticmethod
+    def summarize(jobs):
+        """Count jobs per final state"""
+        summary = {
+            "completed": 0,
+            "failed": 0,
+            "skipped": 0,
+            "total": len(jobs),
+        }
+        for job in jobs:
+            if job.state == DownloadJob.DONE:
+                summary["completed"] += 1
+            elif job.state == DownloadJob.FAILED:
+                summary["failed"] += 1
+            elif job.state == DownloadJob.SKIPPED:
+                summary["skipped"] += 1
+        return summary